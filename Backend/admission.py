@@ -0,0 +1,251 @@
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, jsonify
+from flask_login import current_user
+import metrics
+import deadlines
+import breakers
+
+# --- ADMISSION CONTROL FOR EXPENSIVE ROUTES ---
+# Routes that wait on Gemini / AssemblyAI / Judge0 are wrapped in @admit(...).
+# Each gets its own concurrency limit, and all of them together share a
+# smaller pool than the worker has connections, so cheap routes (ping, login,
+# static files, check_session) always find capacity. On top of that every
+# client has a token bucket, and a request whose predicted wait + service time
+# would blow its deadline is shed up front with 503 + Retry-After instead of
+# tying up a connection until gunicorn kills it.
+# Admitted requests then run under their route's deadline (deadlines.py).
+# All state is per worker; effective limits scale with WEB_CONCURRENCY.
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+# Shared cap on expensive requests in flight (gunicorn worker_connections is 500).
+EXPENSIVE_MAX_CONCURRENT = int(os.getenv("EXPENSIVE_MAX_CONCURRENT", "64"))
+# Requests allowed to wait for a slot per route, and how long they may wait.
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "16"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+# Per-client token bucket across all expensive routes.
+CLIENT_RATE_PER_MINUTE = float(os.getenv("CLIENT_RATE_PER_MINUTE", "30"))
+CLIENT_BURST = int(os.getenv("CLIENT_BURST", "10"))
+MAX_TRACKED_CLIENTS = 10000
+# Smoothing for the per-route service-time estimate used to shed early.
+LATENCY_EWMA_ALPHA = 0.2
+
+# route name -> (max concurrent, deadline seconds). Deadlines stay under gunicorn's 120 s timeout.
+ROUTE_LIMITS = {
+    "interview": (8, 90),
+    "communication-feedback": (8, 90),
+    "managerial-conversation": (12, 60),
+    "hr-conversation": (12, 60),
+    "resume-conversation": (12, 60),
+    "generate-final-report": (6, 100),
+    "aptitude-feedback": (12, 60),
+    "run-code": (16, 60),
+    "technical-question": (16, 45),
+    "aptitude-question": (16, 45),
+    "generate-question": (16, 45),
+    "communication-topic": (16, 45),
+    "mock-test-start": (8, 30),
+    "mock-test-item": (16, 60),
+}
+
+
+class Rejected(Exception):
+    def __init__(self, status, reason, retry_after):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RouteGate:
+    def __init__(self, name, max_concurrent, deadline):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.deadline = deadline
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.in_flight = 0
+        self.queued = 0
+        self.latency = None   # EWMA of service time in seconds
+        self.lock = threading.Lock()
+
+    def predicted_seconds(self):
+        """
+        Expected queue wait + service time for a request arriving now, or 0
+        when a slot is free. A free slot always admits, so the latency
+        estimate keeps updating and recovers after an upstream slowdown.
+        """
+        with self.lock:
+            busy = self.in_flight + self.queued
+        if self.latency is None or busy < self.max_concurrent:
+            return 0.0
+        waves = busy // self.max_concurrent   # full batches ahead of us
+        return self.latency * (waves + 1)
+
+    def record_latency(self, seconds):
+        with self.lock:
+            if self.latency is None:
+                self.latency = seconds
+            else:
+                self.latency += LATENCY_EWMA_ALPHA * (seconds - self.latency)
+
+    def _publish(self):
+        metrics.set_gauge("admission_in_flight", self.in_flight, route=self.name)
+        metrics.set_gauge("admission_queued", self.queued, route=self.name)
+
+    def state(self):
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "limit": self.max_concurrent,
+            "deadline_seconds": self.deadline,
+            "latency_ewma_seconds": round(self.latency, 3) if self.latency is not None else None,
+        }
+
+
+_gates = {name: RouteGate(name, limit, deadline) for name, (limit, deadline) in ROUTE_LIMITS.items()}
+_expensive_slots = threading.BoundedSemaphore(EXPENSIVE_MAX_CONCURRENT)
+_buckets = OrderedDict()   # client key -> (tokens, last_refill)
+_buckets_lock = threading.Lock()
+
+
+def client_key():
+    """Logged-in user id, else the client address the proxy appended to X-Forwarded-For."""
+    if current_user.is_authenticated:
+        return f"user:{current_user.id}"
+    route = request.access_route
+    return f"ip:{route[-1] if route else request.remote_addr}"
+
+
+def take_token(key):
+    """Spend one token from the client's bucket. Returns 0 if allowed, else seconds until the next token."""
+    rate = CLIENT_RATE_PER_MINUTE / 60.0
+    now = time.monotonic()
+    with _buckets_lock:
+        tokens, last = _buckets.pop(key, (float(CLIENT_BURST), now))
+        tokens = min(float(CLIENT_BURST), tokens + (now - last) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        _buckets[key] = (tokens, now)
+        while len(_buckets) > MAX_TRACKED_CLIENTS:
+            _buckets.popitem(last=False)
+    return wait
+
+
+def _retry_after(seconds):
+    return max(1, min(60, math.ceil(seconds)))
+
+
+def _acquire(gate):
+    """Wait (bounded) for a route slot and a shared expensive slot, or raise Rejected."""
+    predicted = gate.predicted_seconds()
+    if predicted > gate.deadline:
+        raise Rejected(503, "deadline", _retry_after(predicted - gate.deadline))
+
+    with gate.lock:
+        if gate.queued >= ADMISSION_MAX_QUEUE:
+            raise Rejected(503, "queue_full", _retry_after(gate.latency or 1))
+        gate.queued += 1
+        gate._publish()
+
+    # Never wait so long that the request can no longer finish in time.
+    budget = min(ADMISSION_QUEUE_TIMEOUT, gate.deadline - (gate.latency or 0))
+    start = time.monotonic()
+    got_route = got_shared = False
+    try:
+        got_route = budget > 0 and gate.slots.acquire(timeout=budget)
+        remaining = budget - (time.monotonic() - start)
+        got_shared = got_route and remaining > 0 and _expensive_slots.acquire(timeout=remaining)
+    finally:
+        with gate.lock:
+            gate.queued -= 1
+            if got_shared:
+                gate.in_flight += 1
+            gate._publish()
+        if got_route and not got_shared:
+            gate.slots.release()
+    metrics.observe("admission_wait_seconds", time.monotonic() - start, route=gate.name)
+    if not got_shared:
+        raise Rejected(503, "queue_timeout", _retry_after(gate.latency or 1))
+
+
+def _release(gate):
+    _expensive_slots.release()
+    gate.slots.release()
+    with gate.lock:
+        gate.in_flight -= 1
+        gate._publish()
+
+
+def _rejected_response(route, rejected):
+    metrics.incr("admission_shed", route=route, reason=rejected.reason)
+    if rejected.status == 429:
+        message = "You're sending requests too quickly. Please wait a moment and try again."
+    else:
+        message = "The server is busy right now. Please try again in a moment."
+    response = jsonify({"error": message})
+    response.headers['Retry-After'] = str(rejected.retry_after)
+    return response, rejected.status
+
+
+def _run_with_deadline(gate, arrived, view, args, kwargs):
+    try:
+        with deadlines.scope(gate.name, gate.deadline, started=arrived):
+            return view(*args, **kwargs)
+    except deadlines.DeadlineExceeded:
+        return jsonify({"error": "This is taking longer than expected and was cancelled. Please try again."}), 504
+
+
+def _did_work(status):
+    """
+    Whether a response reflects the route's real service time. Fast 4xx
+    answers (validation, missing fields) would drag the estimate down and let
+    through requests that then blow their deadline, so only 2xx and 5xx
+    responses are counted (admit() also skips fail-fast CircuitOpen).
+    """
+    return 200 <= status < 300 or status >= 500
+
+
+def admit(route):
+    """Decorator: apply the route's concurrency limit, client rate limit and deadline shedding."""
+    gate = _gates[route]
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            arrived = time.monotonic()
+            if not ADMISSION_ENABLED:
+                return _run_with_deadline(gate, arrived, view, args, kwargs)
+            try:
+                wait = take_token(client_key())
+                if wait:
+                    raise Rejected(429, "rate_limited", _retry_after(wait))
+                _acquire(gate)
+            except Rejected as rejected:
+                return _rejected_response(route, rejected)
+
+            metrics.incr("admission_admitted", route=route)
+            start = time.monotonic()
+            did_work = True   # an unexpected exception still cost the slot its time
+            try:
+                response = current_app.make_response(_run_with_deadline(gate, arrived, view, args, kwargs))
+                did_work = _did_work(response.status_code)
+                return response
+            except breakers.CircuitOpen:
+                did_work = False
+                raise
+            finally:
+                if did_work:
+                    gate.record_latency(time.monotonic() - start)
+                _release(gate)
+        return wrapper
+    return decorator
+
+
+def stats():
+    return {name: gate.state() for name, gate in _gates.items()}
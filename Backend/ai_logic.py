@@ -1,17 +1,26 @@
+import logging
 import os
-from google import genai
-from google.genai import types
 from dotenv import load_dotenv
 import json
 import io
-import requests
 import traceback  # Make sure this is imported
 from collections import Counter
-import pdfplumber
 import re 
 import time
 from functools import wraps
-from huggingface_hub import InferenceClient # Make sure this is imported
+import providers
+import http_client
+import metrics
+import deadlines
+import breakers
+import question_pool
+import llm
+import prompt_cache
+import history_manager
+import structured_output
+from schemas import AptitudeQuestion, TechnicalQuestion, CommunicationTopic
+
+logger = logging.getLogger(__name__)
 
 # --- Load API Keys ---
 load_dotenv()
@@ -19,22 +28,43 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 JUDGE0_API_KEY = os.getenv("JUDGE0_API_KEY")
 HF_API_KEY = os.getenv("HF_API_KEY")
 
-# ⭐️ --- REMOVED THE OLD/DEAD API URL --- ⭐️
-# The new InferenceClient handles routing automatically.
-
-client = genai.Client(api_key=GEMINI_API_KEY)
-
-# --- HUGGING FACE API CLIENT ---
-try:
-    if not HF_API_KEY:
-        print("⚠️ WARNING: HF_API_KEY not set. Transcription will fail.")
-        hf_client = None
-    else:
-        hf_client = InferenceClient(token=HF_API_KEY)
-        print("✅ Hugging Face InferenceClient configured.")
-except Exception as e:
-    print(f"❌ ERROR: Failed to initialize Hugging Face client: {e}")
-    hf_client = None
+# Provider endpoints can be pointed at local stand-ins for benchmarks.
+ASSEMBLYAI_BASE_URL = os.getenv("ASSEMBLYAI_BASE_URL", "https://api.assemblyai.com")
+JUDGE0_BASE_URL = os.getenv("JUDGE0_BASE_URL", "https://judge0-ce.p.rapidapi.com")
+
+# Upper bounds per outbound step; inside a request each is further capped
+# by the time left in the route's deadline (deadlines.timeout). REST calls
+# get theirs from http_client (HTTP_TIMEOUT_SECONDS).
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+FFMPEG_TIMEOUT_SECONDS = float(os.getenv("FFMPEG_TIMEOUT_SECONDS", "30"))
+# How long Judge0 submissions are polled before the rest are reported as not finished.
+JUDGE0_MAX_WAIT_SECONDS = float(os.getenv("JUDGE0_MAX_WAIT_SECONDS", "40"))
+JUDGE0_POLL_SECONDS = 1
+
+# Fallbacks while the AssemblyAI / Judge0 breakers are open (breakers.py).
+# The local ASR model is configured in providers.py (LOCAL_ASR_MODEL). The
+# local runner executes user code on this host, so only enable it where the
+# backend itself runs sandboxed.
+LOCAL_RUNNER_ENABLED = os.getenv("LOCAL_RUNNER_ENABLED", "0") == "1"
+LOCAL_RUNNER_TIMEOUT_SECONDS = float(os.getenv("LOCAL_RUNNER_TIMEOUT_SECONDS", "5"))
+
+# Provider SDKs (google-genai, huggingface_hub), httpx and pdfplumber are
+# imported on first use so a cold start only pays for what it serves.
+def gemini_client():
+    return providers.get("gemini")
+
+# Thinking settings for the feedback/report models (a plain dict, so building
+# it doesn't import the SDK's type module).
+THINKING = {"include_thoughts": True}
+
+# Aptitude feedback and the mock-test report are scored locally (scoring.py).
+# "llm": the model writes the narrative around those numbers, falling back to
+# the template whenever it fails or every provider is cooling down.
+# "template": never call the model for them (e.g. during an overload).
+SCORING_NARRATIVE_MODE = os.getenv("SCORING_NARRATIVE_MODE", "llm")
+
+def _use_template_narrative():
+    return SCORING_NARRATIVE_MODE == "template" or llm.overloaded()
 
 
 # --- ERROR HANDLING WRAPPER ---
@@ -48,12 +78,13 @@ def handle_gemini_errors(func):
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
+        except (deadlines.DeadlineExceeded, breakers.CircuitOpen):
+            # Not an AI error: the route's budget is spent (admission answers 504)
+            # or a dependency is failing fast (the app answers 503).
+            raise
         except Exception as e:
             # Log the full, detailed error to the Python terminal
-            print(f"!!!!!!!!!!!!!! ERROR IN {func.__name__} !!!!!!!!!!!!!!")
-            print(f"Exception type: {type(e)}")
-            print(f"Error details: {e}")
-            print(f"!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+            logger.error("Error in %s (%s): %s", func.__name__, type(e).__name__, e)
             
             # Return a user-friendly JSON error to the frontend
             if "500 An internal error" in str(e):
@@ -65,18 +96,61 @@ def handle_gemini_errors(func):
             return {"error": f"An unexpected error occurred in the AI logic: {str(e)}"}
     return wrapper
 
+# --- PROMPT PREFIX CACHING ---
+def call_with_cached_prefix(model, prefix_text, call, **config_kwargs):
+    """
+    Run `call(config)` with `prefix_text` registered as Gemini cached content.
+    If the cached content is gone (expired, deleted), retry once with the
+    prefix sent inline so the user never sees the difference. Other errors
+    (429, timeouts) are not retried: that would double the load on Gemini
+    exactly when it is struggling.
+    """
+    with deadlines.stage("gemini"), breakers.get("gemini").guard():
+        config_kwargs["http_options"] = deadlines.http_options("gemini", GEMINI_TIMEOUT_SECONDS)
+        config = prompt_cache.build_config(gemini_client(), model, prefix_text, **config_kwargs)
+        try:
+            return call(config)
+        except Exception as e:
+            if not config.get("cached_content") or not prompt_cache.is_cache_miss(e):
+                raise
+            logger.warning("Cached prompt prefix failed (%s). Retrying with inline prompt.", e)
+            prompt_cache.invalidate(gemini_client(), model, prefix_text)
+            config_kwargs["http_options"] = deadlines.http_options("gemini", GEMINI_TIMEOUT_SECONDS)
+            return call(prompt_cache.inline_config(prefix_text, **config_kwargs))
+
+
+def send_chat_turn(model, prefix_text, history, prompt, **config_kwargs):
+    """Replay `history` in a chat whose persona/context prefix is cached, then send `prompt`."""
+    return call_with_cached_prefix(
+        model,
+        prefix_text,
+        lambda config: gemini_client().chats.create(model=model, config=config, history=history).send_message(prompt),
+        **config_kwargs
+    )
+
+
+def generate_with_cached_prefix(model, prefix_text, contents, **config_kwargs):
+    """generate_content() with a cached (or inline) instruction prefix."""
+    return call_with_cached_prefix(
+        model,
+        prefix_text,
+        lambda config: gemini_client().models.generate_content(model=model, config=config, contents=contents),
+        **config_kwargs
+    )
+
 # --- (Other functions are unchanged) ---
 
 def extract_text_from_pdf(pdf_file_path):
+    import pdfplumber
     try:
-        with pdfplumber.open(pdf_file_path) as pdf:
+        with deadlines.stage("pdf"), pdfplumber.open(pdf_file_path) as pdf:
             full_text = ""
             for page in pdf.pages:
                 full_text += page.extract_text() + "\n"
-        print("Resume text extracted successfully.")
+        logger.info("Resume text extracted successfully.")
         return full_text
     except Exception as e:
-        print(f"Error extracting PDF text: {e}")
+        logger.error("Error extracting PDF text: %s", e)
         return None
 
 # ⭐️ --- FINAL, CORRECT TRANSCRIBE FUNCTION --- ⭐️
@@ -89,99 +163,124 @@ def transcribe_audio_to_text(audio_file_path):
         import subprocess
         import tempfile
         import time
-        import requests
         import os
 
         ASSEMBLY_API_KEY = os.getenv("ASSEMBLYAI_API_KEY")
+        breaker = breakers.get("assemblyai")
+        if (not ASSEMBLY_API_KEY or breaker.is_open()) and providers.get("local_asr") is not None:
+            return _transcribe_locally(audio_file_path)
         if not ASSEMBLY_API_KEY:
-            print("❌ Missing ASSEMBLYAI_API_KEY")
+            logger.error("Missing ASSEMBLYAI_API_KEY")
             return "Error: AssemblyAI API key missing.", 0
+        # Fail fast (CircuitOpen) before converting anything.
+        breaker.check()
 
-        print("⚙️ Converting WEBM → WAV using ffmpeg...")
+        logger.debug("Converting WEBM → WAV using ffmpeg")
         wav_path = tempfile.mktemp(suffix=".wav")
-        subprocess.run([
-            "ffmpeg", "-i", audio_file_path,
-            "-ac", "1", "-ar", "16000",
-            wav_path
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        with deadlines.stage("ffmpeg"):
+            subprocess.run([
+                "ffmpeg", "-i", audio_file_path,
+                "-ac", "1", "-ar", "16000",
+                wav_path
+            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+               timeout=deadlines.timeout("ffmpeg", FFMPEG_TIMEOUT_SECONDS))
 
         # Read WAV bytes for upload
         with open(wav_path, "rb") as f:
             wav_bytes = f.read()
 
         if not wav_bytes:
-            print("❌ WAV conversion produced empty file")
+            logger.warning("WAV conversion produced empty file")
             return "Error: The recorded audio file was empty.", 0
 
-        print("📤 Uploading audio to AssemblyAI...")
-        upload_url = "https://api.assemblyai.com/v2/upload"
-        headers = {"authorization": ASSEMBLY_API_KEY}
-
-        # streaming upload (recommended)
-        upload_resp = requests.post(upload_url, headers=headers, data=wav_bytes)
-        if upload_resp.status_code != 200:
-            print("❌ AssemblyAI upload error:", upload_resp.status_code, upload_resp.text)
-            return f"Error: ASR failed -> upload error: {upload_resp.text}", 0
-
-        audio_url = upload_resp.json().get("upload_url")
-        if not audio_url:
-            print("❌ Upload response missing upload_url:", upload_resp.text)
-            return f"Error: ASR failed -> upload response invalid", 0
-
-        print("▶️ Requesting transcription...")
-        transcript_url = "https://api.assemblyai.com/v2/transcript"
-        json_payload = {
-            "audio_url": audio_url,
-            # optional: add "language_code": "en" or other params if needed
-            # "language_code": "en"
-        }
-        trans_resp = requests.post(transcript_url, json=json_payload, headers=headers)
-        if trans_resp.status_code != 200 and trans_resp.status_code != 201:
-            print("❌ AssemblyAI transcription request error:", trans_resp.status_code, trans_resp.text)
-            return f"Error: ASR failed -> transcript request error: {trans_resp.text}", 0
-
-        transcript_id = trans_resp.json().get("id")
-        if not transcript_id:
-            print("❌ No transcript id returned:", trans_resp.text)
-            return f"Error: ASR failed -> no transcript id", 0
-
-        # Polling for completion (timeout after e.g. 60 seconds)
-        poll_url = f"https://api.assemblyai.com/v2/transcript/{transcript_id}"
-        timeout_seconds = 60
-        poll_interval = 1.5
-        elapsed = 0.0
-
-        print("⏳ Waiting for transcription to complete...")
-        while elapsed < timeout_seconds:
-            status_resp = requests.get(poll_url, headers=headers)
-            if status_resp.status_code != 200:
-                print("❌ AssemblyAI status error:", status_resp.status_code, status_resp.text)
-                return f"Error: ASR failed -> status error: {status_resp.text}", 0
-
-            status_json = status_resp.json()
-            status = status_json.get("status")
-            if status == "completed":
-                transcript_text = status_json.get("text", "").strip()
-                print("✅ Transcription completed.")
-                # optional: get audio duration from status_json.get("audio_duration")
-                duration_seconds = status_json.get("audio_duration", 0)
-                return transcript_text, duration_seconds or 0
-            if status == "error":
-                err = status_json.get("error", "unknown error")
-                print("❌ AssemblyAI returned error:", err)
-                return f"Error: ASR failed -> {err}", 0
-
-            time.sleep(poll_interval)
-            elapsed += poll_interval
-
-        # timeout
-        print("❌ Transcription polling timed out.")
-        return "Error: ASR failed -> transcription timed out", 0
+        # The whole upload -> poll sequence is one call for the breaker.
+        with breaker.guard():
+            return _transcribe_with_assemblyai(wav_bytes, {"authorization": ASSEMBLY_API_KEY})
 
+    except (deadlines.DeadlineExceeded, breakers.CircuitOpen):
+        raise
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("ASR failed")
         return f"Error: ASR failed -> {str(e)}", 0
+
+
+def _transcribe_with_assemblyai(wav_bytes, headers):
+    """Upload, request and poll one transcription. Upstream failures raise; a per-audio error is returned."""
+    logger.debug("Uploading audio to AssemblyAI")
+    upload_url = f"{ASSEMBLYAI_BASE_URL}/v2/upload"
+
+    # streaming upload (recommended)
+    upload_resp = http_client.post(upload_url, "assemblyai", headers=headers, content=wav_bytes)
+    if upload_resp.status_code != 200:
+        logger.error("AssemblyAI upload error %s: %s", upload_resp.status_code, upload_resp.text)
+        raise RuntimeError(f"upload error: {upload_resp.text}")
+
+    audio_url = upload_resp.json().get("upload_url")
+    if not audio_url:
+        logger.error("AssemblyAI upload response missing upload_url: %s", upload_resp.text)
+        raise RuntimeError("upload response invalid")
+
+    logger.debug("Requesting transcription")
+    transcript_url = f"{ASSEMBLYAI_BASE_URL}/v2/transcript"
+    json_payload = {
+        "audio_url": audio_url,
+        # optional: add "language_code": "en" or other params if needed
+        # "language_code": "en"
+    }
+    trans_resp = http_client.post(transcript_url, "assemblyai", json=json_payload, headers=headers)
+    if trans_resp.status_code != 200 and trans_resp.status_code != 201:
+        logger.error("AssemblyAI transcription request error %s: %s", trans_resp.status_code, trans_resp.text)
+        raise RuntimeError(f"transcript request error: {trans_resp.text}")
+
+    transcript_id = trans_resp.json().get("id")
+    if not transcript_id:
+        logger.error("AssemblyAI returned no transcript id: %s", trans_resp.text)
+        raise RuntimeError("no transcript id")
+
+    # Polling for completion (timeout after e.g. 60 seconds)
+    poll_url = f"{ASSEMBLYAI_BASE_URL}/v2/transcript/{transcript_id}"
+    timeout_seconds = 60
+    poll_interval = 1.5
+    elapsed = 0.0
+
+    logger.debug("Waiting for transcription to complete")
+    while elapsed < timeout_seconds:
+        status_resp = http_client.get(poll_url, "assemblyai", headers=headers)
+        if status_resp.status_code != 200:
+            logger.error("AssemblyAI status error %s: %s", status_resp.status_code, status_resp.text)
+            raise RuntimeError(f"status error: {status_resp.text}")
+
+        status_json = status_resp.json()
+        status = status_json.get("status")
+        if status == "completed":
+            transcript_text = status_json.get("text", "").strip()
+            logger.info("Transcription completed")
+            # optional: get audio duration from status_json.get("audio_duration")
+            duration_seconds = status_json.get("audio_duration", 0)
+            return transcript_text, duration_seconds or 0
+        if status == "error":
+            err = status_json.get("error", "unknown error")
+            logger.warning("AssemblyAI returned error: %s", err)
+            return f"Error: ASR failed -> {err}", 0
+
+        # Don't sleep past the deadline; timeout() raises once it's spent.
+        with deadlines.stage("assemblyai"):
+            time.sleep(deadlines.timeout("assemblyai", poll_interval))
+        elapsed += poll_interval
+
+    # timeout
+    logger.error("Transcription polling timed out")
+    raise TimeoutError("transcription timed out")
+
+
+def _transcribe_locally(audio_file_path):
+    """Fallback ASR with the local model (providers 'local_asr'); same return shape."""
+    logger.info("Transcribing with the local ASR model")
+    with deadlines.stage("local_asr"):
+        segments, info = providers.get("local_asr").transcribe(audio_file_path)
+        transcript_text = " ".join(segment.text.strip() for segment in segments).strip()
+    metrics.incr("fallback_served", dependency="assemblyai", fallback="local_asr")
+    return transcript_text, info.duration or 0
 # ⭐️ --- END FINAL TRANSCRIBE FUNCTION --- ⭐️
 
 
@@ -214,15 +313,12 @@ def generate_ai_question(topic, resume_text=None):
         
         Question:
         """
-    response = client.models.generate_content(
-        model="gemini-2.5-flash", 
-        contents=prompt
-    )
-    if not response.text:
-        print("Error: Gemini returned an empty response.")
+    text = llm.generate(prompt, gemini_model="gemini-2.5-flash")
+    if not text:
+        logger.warning("Gemini returned an empty response")
         return "Error: The AI failed to generate a question."
     
-    return response.text.strip()
+    return text.strip()
 
 @handle_gemini_errors
 def get_ai_response(interview_question, user_answer, expression_data_json, duration_seconds):
@@ -252,7 +348,7 @@ def get_ai_response(interview_question, user_answer, expression_data_json, durat
             f"- **Filler Words:** Found {filler_count} filler words (e.g., 'um', 'like', 'so')."
         )
     except Exception as e:
-        print(f"Error during audio analysis: {e}")
+        logger.warning("Error during audio analysis: %s", e)
         audio_analysis_summary = "Note: Audio analysis failed."
     
     expression_summary = "No facial expression data was provided."
@@ -267,7 +363,7 @@ def get_ai_response(interview_question, user_answer, expression_data_json, durat
                 summary_lines.append(f"- {expr}: {percentage:.0f}%")
             expression_summary = "\n".join(summary_lines)
         except Exception as e:
-            print(f"Error processing expressions: {e}")
+            logger.warning("Error processing expressions: %s", e)
             expression_summary = "Note: Facial data was received but could not be processed."
 
     prompt = f"""
@@ -309,17 +405,15 @@ def get_ai_response(interview_question, user_answer, expression_data_json, durat
     **3. "Better Answer" Example:**
     [Provide a concise, strong example answer that follows the STAR method for the original question. Make it a general example, not a rewrite of their answer.]
     """
-    response = client.models.generate_content(
-        model="gemini-2.5-flash", 
-        contents=[prompt]
-    )
+    text = llm.generate(prompt, gemini_model="gemini-2.5-flash")
 
-    if not response.text:
-        print("Error: Gemini returned an empty response.")
+    if not text:
+        logger.warning("Gemini returned an empty response")
         return "Error: The AI failed to generate a question."
     
-    return response.text
+    return text
 
+@question_pool.pooled("aptitude")
 @handle_gemini_errors 
 def get_aptitude_question(topic):
     time.sleep(1) 
@@ -329,7 +423,7 @@ def get_aptitude_question(topic):
     prompt = f"""
     Generate one medium-difficulty aptitude question {topic_instruction}.
     
-    Your response **MUST** be a JSON object inside a markdown code block.
+    Your response **MUST** be a single JSON object.
     **DO NOT** use LaTeX. Use plain text for math (e.g., 'x^2', '3/4').
     
     The JSON must contain these exact keys: "question", "options", "correct_answer", "solution".
@@ -351,35 +445,30 @@ def get_aptitude_question(topic):
     }}
     ```
     """
-    response = client.models.generate_content(
-        model="gemini-2.5-flash-lite",
-        contents=prompt
+    data = structured_output.generate_structured(
+        "gemini-2.5-flash-lite", prompt, AptitudeQuestion, "aptitude_question"
     )
-    if not response.text:
-        print("Error: Gemini returned an empty response.")
-        return {"error": "The AI failed to generate a question."}
-    try:
-        json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
-        if not json_match:
-            print(f"Error: No JSON object found in Gemini response. Response was: {response.text}")
-            raise json.JSONDecodeError("No JSON object found in response", response.text, 0)
-        json_text = json_match.group(0)
-        data = json.loads(json_text) 
-        return data
-    except json.JSONDecodeError as e:
-        print(f"Error: Failed to decode JSON from Gemini. Response was: {response.text}")
-        print(f"JSONDecodeError: {e}")
+    if data is None:
         return {"error": "The AI returned an invalid response. Please try again."}
+    return data
 
 
 @handle_gemini_errors
 def get_aptitude_feedback(results):
-    results_json = json.dumps(results, indent=2)
+    import scoring
+    summary = scoring.aptitude_summary(results)
+    if _use_template_narrative():
+        return scoring.render_aptitude_report(summary)
+
+    # The scores are computed locally; the model only writes the narrative.
+    summary_json = json.dumps(summary, separators=(",", ":"))
     prompt = f"""
     You are an expert aptitude test coach. A user has just completed a practice session.
-    Their results are provided in this JSON list:
-    {results_json}
+    Their scores were computed exactly and are summarized in this JSON
+    (accuracy in %, times in seconds, topics sorted from strongest to weakest):
+    {summary_json}
 
+    Use these numbers as given; do not recount anything.
     Provide a report in EXACTLY this format:
 
     ### OVERALL SUMMARY
@@ -396,20 +485,18 @@ def get_aptitude_feedback(results):
     
     Keep the feedback encouraging and brief.
     """
-    response = client.models.generate_content(
-        model="gemini-3-flash-preview",
-        config=types.GenerateContentConfig(
-            thinking_config=types.ThinkingConfig(include_thoughts=True)
-        ),
-        contents=prompt
-    )
+    try:
+        text = llm.generate(prompt, gemini_model="gemini-3-flash-preview", thinking=True)
+    except Exception as e:
+        logger.warning("Aptitude feedback model call failed (%s). Using the template report.", e)
+        text = ""
 
-    if not response.text:
-        print("Error: Gemini returned an empty response.")
-        return "Error: The AI failed to generate feedback."
+    if not text:
+        return scoring.render_aptitude_report(summary)
         
-    return response.text.strip()
+    return text.strip()
 
+@question_pool.pooled("technical")
 @handle_gemini_errors
 def get_technical_question(topic, language):
     time.sleep(1) 
@@ -427,7 +514,7 @@ def get_technical_question(topic, language):
     
     prompt = f"""
     Generate one medium-difficulty technical coding problem {topic_instruction} for {lang_name}.
-    Your response **MUST** be a JSON object inside a markdown code block.
+    Your response **MUST** be a single JSON object.
     
     Your JSON object must contain these exact keys:
     - "question_title": A short title.
@@ -441,29 +528,18 @@ def get_technical_question(topic, language):
     {python_example}
     ```
     """ 
-    response = client.models.generate_content(
-        model="gemini-2.5-flash-lite",
-        contents=prompt
+    data = structured_output.generate_structured(
+        "gemini-2.5-flash-lite", prompt, TechnicalQuestion, "technical_question"
     )
-
-    if not response.text:
-        print("Error: Gemini returned an empty response.")
-        return {"error": "The AI failed to generate a question."}
-    try:
-        json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
-        if not json_match:
-            print(f"Error: No JSON object found in Gemini response. Response was: {response.text}")
-            raise json.JSONDecodeError("No JSON object found in response", response.text, 0)
-        json_text = json_match.group(0)
-        data = json.loads(json_text)
-        return data
-    except json.JSONDecodeError as e:
-        print(f"Error: Failed to decode JSON from Gemini. Response was: {response.text}")
-        print(f"JSONDecodeError: {e}")
+    if data is None:
         return {"error": "The AI returned an invalid response. Please try again."}
+    return data
 
 def run_code_with_judge0(user_code, language, test_cases):
-    print(f"Sending {language} code to Judge0 for batch processing...")
+    breaker = breakers.get("judge0")
+    if (not JUDGE0_API_KEY or breaker.is_open()) and _local_runner_command(language):
+        return _run_code_locally(user_code, language, test_cases)
+    logger.debug("Sending %s code to Judge0 for batch processing", language)
     language_id = 92
     if language == "java":
         language_id = 91
@@ -475,7 +551,7 @@ def run_code_with_judge0(user_code, language, test_cases):
             "stdin": case["stdin"],
             "expected_output": case["expected_output"]
         })
-    url = "https://judge0-ce.p.rapidapi.com/submissions/batch"
+    url = f"{JUDGE0_BASE_URL}/submissions/batch"
     headers = {
         "content-type": "application/json",
         "Content-Type": "application/json",
@@ -483,34 +559,90 @@ def run_code_with_judge0(user_code, language, test_cases):
         "X-RapidAPI-Host": "judge0-ce.p.rapidapi.com"
     }
     try:
-        response = requests.post(url, json={"submissions": submissions}, headers=headers)
-        tokens = response.json()
-        if not isinstance(tokens, list) or 'token' not in tokens[0]:
-             return { "error": f"Failed to create submission. Check your Judge0 API key. API response: {response.text}" }
-        submission_tokens = [t['token'] for t in tokens]
-        results = []
-        for i, token in enumerate(submission_tokens):
-            status = "Processing"
-            while status == "Processing" or status == "In Queue":
-                time.sleep(1)
-                result_url = f"https://judge0-ce.p.rapidapi.com/submissions/{token}"
-                response = requests.get(result_url, headers=headers)
-                result_data = response.json()
-                status = result_data.get('status', {}).get('description')
-            if status == "Accepted":
-                results.append(f"Test Case {i+1}: PASSED")
-            else:
-                expected = test_cases[i]['expected_output']
-                got = result_data.get('stdout', 'N/A')
-                if status == "Wrong Answer":
-                    results.append(f"Test Case {i+1}: FAILED (Expected: {expected}, Got: {got})")
+        # Submission plus polling is one call for the breaker (slow if it drags on).
+        with breaker.guard():
+            response = http_client.post(url, "judge0", json={"submissions": submissions}, headers=headers)
+            tokens = response.json()
+            if not isinstance(tokens, list) or 'token' not in tokens[0]:
+                raise RuntimeError(f"Failed to create submission. Check your Judge0 API key. API response: {response.text}")
+            submission_tokens = [t['token'] for t in tokens]
+            results = []
+            give_up_at = time.monotonic() + JUDGE0_MAX_WAIT_SECONDS
+            for i, token in enumerate(submission_tokens):
+                status = "Processing"
+                result_data = {}
+                while status == "Processing" or status == "In Queue":
+                    if time.monotonic() > give_up_at:
+                        status = "Still running after the time limit"
+                        break
+                    with deadlines.stage("judge0"):
+                        time.sleep(deadlines.timeout("judge0", JUDGE0_POLL_SECONDS))
+                    result_url = f"{JUDGE0_BASE_URL}/submissions/{token}"
+                    response = http_client.get(result_url, "judge0", headers=headers)
+                    result_data = response.json()
+                    status = result_data.get('status', {}).get('description')
+                if status == "Accepted":
+                    results.append(f"Test Case {i+1}: PASSED")
                 else:
-                    results.append(f"Test Case {i+1}: ERROR ({status})")
+                    expected = test_cases[i]['expected_output']
+                    got = result_data.get('stdout', 'N/A')
+                    if status == "Wrong Answer":
+                        results.append(f"Test Case {i+1}: FAILED (Expected: {expected}, Got: {got})")
+                    else:
+                        results.append(f"Test Case {i+1}: ERROR ({status})")
         return { "results": results }
+    except (deadlines.DeadlineExceeded, breakers.CircuitOpen):
+        raise
     except Exception as e:
-        print(f"Error calling Judge0: {e}")
+        logger.error("Error calling Judge0: %s", e)
         return {"error": str(e)}
 
+
+def _local_runner_command(language):
+    """argv prefix that runs a source file locally, or None when the local runner can't handle it."""
+    import shutil
+    import sys
+    if not LOCAL_RUNNER_ENABLED:
+        return None
+    if language == "python":
+        return [sys.executable, "-I"]
+    if language == "java" and shutil.which("java"):
+        return ["java"]   # single-file source launcher (Java 11+)
+    return None
+
+
+def _run_code_locally(user_code, language, test_cases):
+    """Fallback runner with Judge0's result format; each case gets LOCAL_RUNNER_TIMEOUT_SECONDS."""
+    import subprocess
+    import tempfile
+    logger.info("Running %s code with the local runner", language)
+    command = _local_runner_command(language)
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, "Main.java" if language == "java" else "main.py")
+        with open(source, "w") as f:
+            f.write(user_code)
+        for i, case in enumerate(test_cases):
+            try:
+                with deadlines.stage("local_runner"):
+                    run = subprocess.run(
+                        command + [source], input=case["stdin"], capture_output=True, text=True, cwd=workdir,
+                        timeout=deadlines.timeout("local_runner", LOCAL_RUNNER_TIMEOUT_SECONDS)
+                    )
+            except subprocess.TimeoutExpired:
+                results.append(f"Test Case {i+1}: ERROR (Time Limit Exceeded)")
+                continue
+            got = run.stdout.strip()
+            expected = case["expected_output"]
+            if run.returncode != 0:
+                results.append(f"Test Case {i+1}: ERROR (Runtime Error)")
+            elif got == expected.strip():
+                results.append(f"Test Case {i+1}: PASSED")
+            else:
+                results.append(f"Test Case {i+1}: FAILED (Expected: {expected}, Got: {got})")
+    metrics.incr("fallback_served", dependency="judge0", fallback="local_runner")
+    return {"results": results}
+
 @handle_gemini_errors
 def get_communication_feedback(topic, user_answer, expression_data_json, duration_seconds):
     
@@ -538,7 +670,7 @@ def get_communication_feedback(topic, user_answer, expression_data_json, duratio
             f"- **Filler Words:** Found {filler_count} filler words (e.g., 'um', 'like', 'so')."
         )
     except Exception as e:
-        print(f"Error during audio analysis: {e}")
+        logger.warning("Error during audio analysis: %s", e)
         audio_analysis_summary = "Note: Audio analysis failed."
     
     expression_summary = "No facial expression data was provided."
@@ -553,7 +685,7 @@ def get_communication_feedback(topic, user_answer, expression_data_json, duratio
                 summary_lines.append(f"- {expr}: {percentage:.0f}%")
             expression_summary = "\n".join(summary_lines)
         except Exception as e:
-            print(f"Error processing expressions: {e}")
+            logger.warning("Error processing expressions: %s", e)
             expression_summary = "Note: Facial data was received but could not be processed."
 
     prompt = f"""
@@ -582,27 +714,21 @@ def get_communication_feedback(topic, user_answer, expression_data_json, duratio
     ### KEY TAKEAWAY
     [One actionable piece of advice]
     """
-    response = client.models.generate_content(
-        model="gemini-3-flash-preview",
-        config=types.GenerateContentConfig(
-            thinking_config=types.ThinkingConfig(include_thoughts=True)
-        ),
-        contents=[prompt]
-    )
+    text = llm.generate(prompt, gemini_model="gemini-3-flash-preview", thinking=True)
 
-    if not response.text:
-        print("Error: Gemini returned an empty response.")
+    if not text:
+        logger.warning("Gemini returned an empty response")
         return "Error: The AI failed to generate feedback."
         
-    return response.text.strip()
+    return text.strip()
 
+@question_pool.pooled("communication_topic")
 @handle_gemini_errors
 def generate_communication_topic():
     time.sleep(1) 
     prompt = """
     Generate one, single, simple, general-purpose topic for a 1-minute communication assessment.
-    Your response **MUST** be a JSON object inside a markdown code block.
-    Return the response as a JSON object with one key: "topic".
+    Return the response as a single JSON object with one key: "topic".
     
     Example of a valid response:
     ```json
@@ -611,26 +737,33 @@ def generate_communication_topic():
     }
     ```
     """
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt
+    data = structured_output.generate_structured(
+        "gemini-2.5-flash", prompt, CommunicationTopic, "communication_topic"
     )
-
-    if not response.text:
-        print("Error: Gemini returned an empty response.")
-        return {"error": "The AI failed to generate a topic."}
-    try:
-        json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
-        if not json_match:
-            print(f"Error: No JSON object found in Gemini response. Response was: {response.text}")
-            raise json.JSONDecodeError("No JSON object found in response", response.text, 0)
-        json_text = json_match.group(0)
-        data = json.loads(json_text)
-        return data
-    except json.JSONDecodeError as e:
-        print(f"Error: Failed to decode JSON from Gemini. Response was: {response.text}")
-        print(f"JSONDecodeError: {e}")
+    if data is None:
         return {"error": "The AI returned an invalid response. Please try again."}
+    return data
+
+MANAGERIAL_PERSONA = "You are Prepmate, an AI interview architect conducting a managerial interview."
+
+MANAGERIAL_DEBRIEF_RUBRIC = """
+## Role: AI Interview Coach
+## IMPORTANT: Start your response with "SCORE: [X]%" where X is a number from 0-100 based on STAR structure, confidence, and clarity.
+## Task: Provide a final debrief for a 4-question managerial interview. The interview transcript is provided by the user.
+## Output Format: Markdown
+
+---
+### **Final Debrief:**
+
+**1. Overall Performance:**
+[Provide 2-3 sentences on their overall performance. Comment on their ability to handle follow-up questions and their use of examples.]
+
+**2. Strengths:**
+- [List 1-2 key strengths, e.g., "Good use of the STAR method," "Clear communication."]
+
+**3. Areas for Improvement:**
+- [List 1-2 specific, actionable areas for improvement, e.g., "Try to provide more detail on the 'Result' of your stories," "Answers could be more concise."]
+"""
 
 @handle_gemini_errors 
 def get_managerial_response(conversation_history, user_answer, expression_data_json, audio_file_path, duration_seconds=0):
@@ -654,15 +787,15 @@ def get_managerial_response(conversation_history, user_answer, expression_data_j
     
 
     if custom_prompt:
-            prompt = f"You are Prepmate, an AI interview architect. {custom_prompt}"
+            prompt = custom_prompt
     elif question_count == 0:
-        prompt = "You are Prepmate, an AI interview architect. Ask your first managerial question (e.g., 'Tell me about a time you had to lead a project.')."
+        prompt = "Ask your first managerial question (e.g., 'Tell me about a time you had to lead a project.')."
     elif question_count == 1:
-        prompt = "You are Prepmate, an AI interview architect. Ask one, smart, relevant follow-up question based *only* on the user's last answer."
+        prompt = "Ask one, smart, relevant follow-up question based *only* on the user's last answer."
     elif question_count == 2:
-        prompt = "You are Prepmate, an AI interview architect. Ask your *second* main managerial question (e.g., 'Describe a situation where you had a conflict with a coworker.')."
+        prompt = "Ask your *second* main managerial question (e.g., 'Describe a situation where you had a conflict with a coworker.')."
     elif question_count == 3:
-        prompt = "You are Prepmate, an AI interview architect. Ask one, smart, relevant follow-up question based *only* on the user's last answer."
+        prompt = "Ask one, smart, relevant follow-up question based *only* on the user's last answer."
     else:
         session_complete = True
         ai_response = "This concludes the managerial round. Generating your final debrief..."
@@ -686,35 +819,13 @@ def get_managerial_response(conversation_history, user_answer, expression_data_j
         final_fillers = len(re.findall(filler_pattern, user_answer.lower())) if user_answer else 0
 
 
-        # Create the report prompt
-        history_text = "\n".join([f"{msg['role']}: {msg['parts'][0]['text']}" for msg in history if 'parts' in msg])
-        report_prompt = f"""
-        ## Role: AI Interview Coach
-        ## IMPORTANT: Start your response with "SCORE: [X]%" where X is a number from 0-100 based on STAR structure, confidence, and clarity.
-        ## Task: Provide a final debrief for a 4-question managerial interview.
-        ## Output Format: Markdown
-        
-        **Interview Transcript:**
-        {history_text}
-
-        ---
-        ### **Final Debrief:**
-
-        **1. Overall Performance:**
-        [Provide 2-3 sentences on their overall performance. Comment on their ability to handle follow-up questions and their use of examples.]
-
-        **2. Strengths:**
-        - [List 1-2 key strengths, e.g., "Good use of the STAR method," "Clear communication."]
-
-        **3. Areas for Improvement:**
-        - [List 1-2 specific, actionable areas for improvement, e.g., "Try to provide more detail on the 'Result' of your stories," "Answers could be more concise."]
-        """
-        final_report_response = client.models.generate_content(
-            model="gemini-3-flash-preview",
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(include_thoughts=True)
-            ),
-            contents=report_prompt
+        # Create the report prompt (the rubric is the cached prefix, the transcript varies)
+        history_text = history_manager.transcript_text(gemini_client(), history)
+        final_report_response = generate_with_cached_prefix(
+            "gemini-3-flash-preview",
+            MANAGERIAL_DEBRIEF_RUBRIC,
+            f"**Interview Transcript:**\n{history_text}",
+            thinking_config=THINKING
         )
         final_report = final_report_response.text or "Error: The AI failed to generate your final report."
         
@@ -728,12 +839,13 @@ def get_managerial_response(conversation_history, user_answer, expression_data_j
             "final_fillers": final_fillers
         }
     
-    chat_session = client.chats.create(
-        model="gemini-2.5-flash",
-        config=types.GenerateContentConfig(temperature=0.7),
-        history=history
+    response = send_chat_turn(
+        "gemini-2.5-flash",
+        MANAGERIAL_PERSONA,
+        history_manager.window_history(gemini_client(), history),
+        prompt,
+        temperature=0.7
     )
-    response = chat_session.send_message(prompt)
     
     ai_response = response.text or "I'm sorry, I seem to have lost my train of thought. Could you please repeat your last answer?"
     
@@ -747,6 +859,27 @@ def get_managerial_response(conversation_history, user_answer, expression_data_j
     }
 
 
+HR_PERSONA = "You are Prepmate, an AI interview architect conducting an HR personal interview."
+
+HR_DEBRIEF_RUBRIC = """
+## Role: AI Interview Coach
+## Task: Provide a final debrief for a 4-question HR interview. The interview transcript is provided by the user.
+## IMPORTANT: Start your response with "SCORE: [X]%" where X is a number from 0-100 based on STAR structure, confidence, and clarity.
+## Output Format: Markdown
+
+---
+### **Final Debrief:**
+
+**1. Overall Performance:**
+[Provide 2-3 sentences on their overall performance. Comment on their personality, clarity, and how well they articulated their motivations.]
+
+**2. Strengths:**
+- [List 1-2 key strengths, e.g., "Appeared positive and enthusiastic," "Clearly explained their motivations."]
+
+**3. Areas for Improvement:**
+- [List 1-2 specific, actionable areas for improvement, e.g., "Try to provide more specific examples to back up your claims," "Connect your 5-year plan more directly to this role."]
+"""
+
 @handle_gemini_errors 
 def get_hr_response(conversation_history, user_answer, expression_data_json, audio_file_path, duration_seconds=0):
     history = json.loads(conversation_history)
@@ -767,15 +900,15 @@ def get_hr_response(conversation_history, user_answer, expression_data_json, aud
     
 
     if custom_prompt:
-            prompt = f"You are Prepmate, an AI interview architect. {custom_prompt}"
+            prompt = custom_prompt
     elif question_count == 0:
-        prompt = "You are Prepmate, an AI interview architect. Ask your first HR personal interview question (e.g., 'Tell me about yourself' or 'What is your greatest strength?')."
+        prompt = "Ask your first HR personal interview question (e.g., 'Tell me about yourself' or 'What is your greatest strength?')."
     elif question_count == 1:
-        prompt = "You are Prepmate, an AI interview architect. Ask one, smart, relevant follow-up question based *only* on the user's last answer."
+        prompt = "Ask one, smart, relevant follow-up question based *only* on the user's last answer."
     elif question_count == 2:
-        prompt = "You are Prepmate, an AI interview architect. Ask your *second* main HR question (e.g., 'Why do you want to work for this company?' or 'Where do you see yourself in 5 years?')."
+        prompt = "Ask your *second* main HR question (e.g., 'Why do you want to work for this company?' or 'Where do you see yourself in 5 years?')."
     elif question_count == 3:
-        prompt = "You are Prepmate, an AI interview architect. Ask one, smart, relevant follow-up question based *only* on the user's. last answer."
+        prompt = "Ask one, smart, relevant follow-up question based *only* on the user's last answer."
     else:
         session_complete = True
         ai_response = "This concludes the HR interview. Generating your final debrief..."
@@ -798,36 +931,13 @@ def get_hr_response(conversation_history, user_answer, expression_data_json, aud
         final_fillers = len(re.findall(filler_pattern, user_answer.lower())) if user_answer else 0
 
 
-        # Create the report prompt
-        history_text = "\n".join([f"{msg['role']}: {msg['parts'][0]['text']}" for msg in history if 'parts' in msg])
-        report_prompt = f"""
-        ## Role: AI Interview Coach
-        ## Task: Provide a final debrief for a 4-question HR interview.
-        ## IMPORTANT: Start your response with "SCORE: [X]%" where X is a number from 0-100 based on STAR structure, confidence, and clarity.
-        ## Output Format: Markdown
-        
-        **Interview Transcript:**
-        {history_text}
-
-        ---
-        ### **Final Debrief:**
-
-        **1. Overall Performance:**
-        [Provide 2-3 sentences on their overall performance. Comment on their personality, clarity, and how well they articulated their motivations.]
-
-        **2. Strengths:**
-        - [List 1-2 key strengths, e.g., "Appeared positive and enthusiastic," "Clearly explained their motivations."]
-
-        **3. Areas for Improvement:**
-        - [List 1-2 specific, actionable areas for improvement, e.g., "Try to provide more specific examples to back up your claims," "Connect your 5-year plan more directly to this role."]
-        """
-        # Using the new client to generate the final report
-        final_report_response = client.models.generate_content(
-            model="gemini-3-flash-preview",
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(include_thoughts=True)
-            ),
-            contents=report_prompt
+        # Create the report prompt (the rubric is the cached prefix, the transcript varies)
+        history_text = history_manager.transcript_text(gemini_client(), history)
+        final_report_response = generate_with_cached_prefix(
+            "gemini-3-flash-preview",
+            HR_DEBRIEF_RUBRIC,
+            f"**Interview Transcript:**\n{history_text}",
+            thinking_config=THINKING
         )
         final_report = final_report_response.text or "Error: The AI failed to generate your final report."
         
@@ -841,14 +951,13 @@ def get_hr_response(conversation_history, user_answer, expression_data_json, aud
             "final_fillers": final_fillers
         }
     
-    # New way to start a chat session
-    chat_session = client.chats.create(
-        model="gemini-2.5-flash",
-        config=types.GenerateContentConfig(temperature=0.7),
-        history=history
+    response = send_chat_turn(
+        "gemini-2.5-flash",
+        HR_PERSONA,
+        history_manager.window_history(gemini_client(), history),
+        prompt,
+        temperature=0.7
     )
-    # New way to send the message
-    response = chat_session.send_message(prompt)
     
     ai_response = response.text or "I'm sorry, I seem to have lost my train of thought. Could you please repeat your last answer?"
     
@@ -862,6 +971,33 @@ def get_hr_response(conversation_history, user_answer, expression_data_json, aud
     }
 
 
+RESUME_DEBRIEF_RUBRIC = """
+## Role: AI Interview Coach
+## Task: Provide a final debrief for a 6-question resume-based interview. The interview transcript is provided by the user.
+## IMPORTANT: Start your response with "SCORE: [X]%" where X is a number from 0-100 based on STAR structure, confidence, and clarity.
+## Output Format: Markdown
+
+---
+### **Final Debrief:**
+
+**1. Overall Performance:**
+[Provide 2-3 sentences on their overall performance. Comment on how well they discussed their resume projects and experiences.]
+
+**2. Strengths:**
+- [List 1-2 key strengths, e.g., "Detailed explanations of resume projects," "Confidently handled follow-up questions."]
+
+**3. Areas for Improvement:**
+- [List 1-2 specific, actionable areas for improvement, e.g., "Try to quantify the results of your projects more (e.g., 'improved performance by 20%')."]
+"""
+
+def build_resume_persona(resume_text):
+    """The persona + resume prefix. It is identical on every turn, so it is cached once per resume."""
+    return (
+        "You are Prepmate, an AI hiring manager conducting a resume-based interview. "
+        "Every question must be grounded in the user's resume below.\n\n"
+        f"THE USER'S RESUME:\n---\n{resume_text}\n---"
+    )
+
 @handle_gemini_errors
 def get_resume_response(resume_text, conversation_history, user_answer, expression_data_json, audio_file_path, duration_seconds=0):
     history = json.loads(conversation_history)
@@ -876,7 +1012,7 @@ def get_resume_response(resume_text, conversation_history, user_answer, expressi
     session_complete = False
     final_report = None
     
-    resume_context = f"THE USER'S RESUME:\n---\n{resume_text}\n---"
+    resume_persona = build_resume_persona(resume_text)
 
     if user_answer is not None:
         history.append({
@@ -886,19 +1022,19 @@ def get_resume_response(resume_text, conversation_history, user_answer, expressi
 
 
     if custom_prompt:
-        prompt = f"You are Prepmate, an AI interview architect. The user's resume is below. {custom_prompt}\n\n{resume_context}"
+        prompt = custom_prompt
     elif question_count == 0:
-        prompt = f"You are Prepmate, an AI hiring manager. Ask your first question based *only* on a specific project, skill, or experience from their resume.\n\n{resume_context}"
+        prompt = "Ask your first question based *only* on a specific project, skill, or experience from their resume."
     elif question_count == 1:
-        prompt = f"You are Prepmate. Ask one, smart, relevant follow-up question based *only* on the user's last answer and their resume.\n\n{resume_context}"
+        prompt = "Ask one, smart, relevant follow-up question based *only* on the user's last answer and their resume."
     elif question_count == 2:
-        prompt = f"You are Prepmate. Ask your *second* main question, based on a *different* part of their resume.\n\n{resume_context}"
+        prompt = "Ask your *second* main question, based on a *different* part of their resume."
     elif question_count == 3:
-        prompt = "You are Prepmate. Ask a smart follow-up question based *only* on the user's last answer.\n\n{resume_context}"
+        prompt = "Ask a smart follow-up question based *only* on the user's last answer."
     elif question_count == 4:
-        prompt = f"You are Prepmate. Ask your *third* main question, based on yet another part of their resume (e.g., education or skills section).\n\n{resume_context}"
+        prompt = "Ask your *third* main question, based on yet another part of their resume (e.g., education or skills section)."
     elif question_count == 5:
-        prompt = f"You are Prepmate. Ask one final, smart follow-up question based *only* on the user's last answer.\n\n{resume_context}"
+        prompt = "Ask one final, smart follow-up question based *only* on the user's last answer."
     else:
         session_complete = True
         ai_response = "This concludes the Resume-Based interview. Generating your final debrief..."
@@ -921,36 +1057,13 @@ def get_resume_response(resume_text, conversation_history, user_answer, expressi
         final_fillers = len(re.findall(filler_pattern, user_answer.lower())) if user_answer else 0
 
 
-        # Create the report prompt
-        history_text = "\n".join([f"{msg['role']}: {msg['parts'][0]['text']}" for msg in history if 'parts' in msg])
-        report_prompt = f"""
-        ## Role: AI Interview Coach
-        ## Task: Provide a final debrief for a 6-question resume-based interview.
-        ## IMPORTANT: Start your response with "SCORE: [X]%" where X is a number from 0-100 based on STAR structure, confidence, and clarity.
-        ## Output Format: Markdown
-        
-        **Interview Transcript:**
-        {history_text}
-
-        ---
-        ### **Final Debrief:**
-
-        **1. Overall Performance:**
-        [Provide 2-3 sentences on their overall performance. Comment on how well they discussed their resume projects and experiences.]
-
-        **2. Strengths:**
-        - [List 1-2 key strengths, e.g., "Detailed explanations of resume projects," "Confidently handled follow-up questions."]
-
-        **3. Areas for Improvement:**
-        - [List 1-2 specific, actionable areas for improvement, e.g., "Try to quantify the results of your projects more (e.g., 'improved performance by 20%')."]
-        """
-        # Using the new client to generate the final report
-        final_report_response = client.models.generate_content(
-            model="gemini-3-flash-preview",
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(include_thoughts=True)
-            ),
-            contents=report_prompt
+        # Create the report prompt (the rubric is the cached prefix, the transcript varies)
+        history_text = history_manager.transcript_text(gemini_client(), history)
+        final_report_response = generate_with_cached_prefix(
+            "gemini-3-flash-preview",
+            RESUME_DEBRIEF_RUBRIC,
+            f"**Interview Transcript:**\n{history_text}",
+            thinking_config=THINKING
         )
         final_report = final_report_response.text or "Error: The AI failed to generate your final report."
         
@@ -964,14 +1077,14 @@ def get_resume_response(resume_text, conversation_history, user_answer, expressi
             "final_fillers": final_fillers
         }
 
-    chat_session = client.chats.create(
-        model="gemini-2.5-flash",
-        config=types.GenerateContentConfig(temperature=0.7),
-        history=history
+    response = send_chat_turn(
+        "gemini-2.5-flash",
+        resume_persona,
+        history_manager.window_history(gemini_client(), history),
+        prompt,
+        temperature=0.7
     )
 
-    response = chat_session.send_message(prompt)
-
     ai_response = response.text or "I'm sorry, I seem to have lost my train of thought. Could you please repeat your last answer?"
     
     history.append({
@@ -984,45 +1097,75 @@ def get_resume_response(resume_text, conversation_history, user_answer, expressi
     }
 
 
+FINAL_REPORT_RUBRIC = """
+You are 'Prepmate', an AI career coach.
+A user has just completed a full mock test. A summary of their results from all rounds is provided by the user in JSON format.
+Every score and count in it was computed exactly; quote those numbers as given and never recount them.
+
+Your task is to generate a comprehensive, professional, and encouraging final report in **Markdown format**.
+
+The report MUST have the following structure:
+1.  **Overall Summary:** A brief, high-level overview of their performance.
+2.  **Round-by-Round Breakdown:**
+    * **Aptitude Test:** State their score from `aptitude` (e.g., "15/20 Correct", with the accuracy). Mention the per-topic results in `topics`.
+    * **Communication Test:** Summarize the `communication_feedback` text on their pace, clarity, and confidence.
+    * **Coding Test:** Using `coding`, comment on which questions they passed, failed, or left incomplete.
+    * **Live Interview:** Using `interview` (answer statistics plus the user's answers in `answer_texts`), give feedback on their answer quality, structure (like STAR method), and conciseness.
+3.  **Key Strengths:** 2-3 bullet points highlighting what they did well across all rounds.
+4.  **Top Areas for Improvement:** 2-3 specific, actionable bullet points on what to focus on next.
+5.  **Final Encouragement:** A concluding sentence to motivate them.
+
+Generate the report. Start with "Here is your comprehensive mock test report:"
+"""
+
 # ⭐️ --- THIS IS THE FIXED FUNCTION --- ⭐️
 @handle_gemini_errors
 def get_final_report(all_round_results):
-    
-    results_json = json.dumps(all_round_results, indent=2)
+    import scoring
+    summary = scoring.mock_test_summary(all_round_results)
+    if _use_template_narrative():
+        return scoring.render_final_report(summary)
+
+    summary_json = json.dumps(summary, separators=(",", ":"))
     prompt = f"""
-    You are 'Prepmate', an AI career coach.
-    A user has just completed a full mock test. Their results from all rounds are provided below in JSON format.
-
-    Your task is to generate a comprehensive, professional, and encouraging final report in **Markdown format**.
-
-    The report MUST have the following structure:
-    1.  **Overall Summary:** A brief, high-level overview of their performance.
-    2.  **Round-by-Round Breakdown:**
-        * **Aptitude Test:** Analyze their `aptitude` results. Calculate their score (e.g., "15/20 Correct"). Identify strong and weak topics.
-        * **Communication Test:** Analyze the feedback from the `communication` section (which is a string of text feedback). Summarize the feedback on their pace, clarity, and confidence.
-        * **Coding Test:** Analyze their `coding` results. Comment on which questions they passed, failed, or left incomplete.
-        * **Live Interview:** Analyze the `interview` conversation history (a list of 'ai' and 'user' messages). Give feedback on their answer quality, structure (like STAR method), and conciseness.
-    3.  **Key Strengths:** 2-3 bullet points highlighting what they did well across all rounds.
-    4.  **Top Areas for Improvement:** 2-3 specific, actionable bullet points on what to focus on next.
-    5.  **Final Encouragement:** A concluding sentence to motivate them.
-
-    Here are the user's test results:
+    Here is the summary of the user's test results:
     ```json
-    {results_json}
+    {summary_json}
     ```
-
-    Generate the report. Start with "Here is your comprehensive mock test report:"
     """
-    response = client.models.generate_content(
-        model="gemini-3-flash-preview",
-        config=types.GenerateContentConfig(
+    try:
+        response = generate_with_cached_prefix(
+            "gemini-3-flash-preview",
+            FINAL_REPORT_RUBRIC,
+            [prompt],
             # Higher thinking level allows for better cross-round analysis
-            thinking_config=types.ThinkingConfig(include_thoughts=True)
-        ),
-        contents=[prompt]
-    )
+            thinking_config=THINKING
+        )
+        text = response.text
+    except Exception as e:
+        logger.warning("Final report model call failed (%s). Using the template report.", e)
+        text = ""
 
-    if not response.text:
-        return "Error: The AI Career Architect could not generate the final report."
+    if not text:
+        return scoring.render_final_report(summary)
         
-    return response.text
+    return text
+
+
+# --- WARM-UP ---
+# Questions generated at warm-up, so the pool can answer them in an outage
+# from the start: the mock test's items (its coding problems in Python).
+WARM_QUESTIONS = [
+    (get_aptitude_question, ("Mix",), ("aptitude", "Mix")),
+    (get_technical_question, ("Basic", "python"), ("technical", "Basic", "python")),
+    (get_technical_question, ("Mix (DSA)", "python"), ("technical", "Mix (DSA)", "python")),
+    (generate_communication_topic, (), ("communication_topic",)),
+]
+
+def warm_question_pools():
+    """Generate one question for each WARM_QUESTIONS pool that is still empty. Returns (filled, total)."""
+    for generate, args, key in WARM_QUESTIONS:
+        if not question_pool.size(key):
+            generate(*args)
+    filled = sum(1 for _, _, key in WARM_QUESTIONS if question_pool.size(key))
+    return filled, len(WARM_QUESTIONS)
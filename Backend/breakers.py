@@ -0,0 +1,214 @@
+import logging
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+import metrics
+import deadlines
+
+logger = logging.getLogger(__name__)
+
+# --- CIRCUIT BREAKERS PER DEPENDENCY ---
+# Every call to Gemini, AssemblyAI, Judge0 and the database is recorded in
+# its breaker's rolling window. A call counts as failed if it errors or takes
+# longer than that dependency's slow threshold. Once enough of the window has
+# failed the breaker opens. While it's open, calls raise CircuitOpen at once
+# instead of waiting out the failure path, and callers use their fast
+# fallback (local ASR / runner, pooled questions, or a "temporarily
+# unavailable" 503). After BREAKER_OPEN_SECONDS one probe call is let
+# through (half-open): success closes the breaker, failure reopens it.
+BREAKER_ENABLED = os.getenv("BREAKER_ENABLED", "1") == "1"
+BREAKER_WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", "60"))
+# Calls needed in the window before the failure rate is trusted.
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+
+# dependency -> seconds after which a call counts as failed (whole transcription / Judge0 run, one DB statement)
+SLOW_CALL_SECONDS = {
+    "gemini": 45,
+    "assemblyai": 30,
+    "judge0": 20,
+    "database": 2,
+}
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpen(Exception):
+    def __init__(self, dependency, retry_after):
+        super().__init__(f"{dependency} is temporarily unavailable")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+class Breaker:
+    def __init__(self, name, slow_seconds):
+        self.name = name
+        self.slow_seconds = slow_seconds
+        self.state = CLOSED
+        self.calls = deque()   # (monotonic time, failed)
+        self.opened_at = 0.0
+        self.probing = False
+        self.times_opened = 0
+        self.rejected = 0
+        self.last_failure = None
+        self.lock = threading.Lock()
+
+    def _set_state(self, state):
+        self.state = state
+        metrics.set_gauge("breaker_state", _STATE_GAUGE[state], dependency=self.name)
+
+    def _open(self, now):
+        self._set_state(OPEN)
+        self.opened_at = now
+        self.calls.clear()
+        self.times_opened += 1
+        metrics.incr("breaker_opened", dependency=self.name)
+        logger.warning("Circuit breaker for %s opened (%s)", self.name, self.last_failure)
+
+    def _reject(self, retry_after):
+        self.rejected += 1
+        metrics.incr("breaker_rejected", dependency=self.name)
+        raise CircuitOpen(self.name, max(1, int(retry_after + 0.999)))
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may go out now. Returns True if this call is the half-open probe."""
+        if not BREAKER_ENABLED:
+            return
+        with self.lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                wait = self.opened_at + BREAKER_OPEN_SECONDS - now
+                if wait > 0:
+                    self._reject(wait)
+                self._set_state(HALF_OPEN)
+                self.probing = False
+            if self.state == HALF_OPEN:
+                if self.probing:
+                    self._reject(1)
+                self.probing = True
+                return True
+        return False
+
+    def check(self):
+        """Raise CircuitOpen while open, without taking the half-open probe."""
+        if not BREAKER_ENABLED:
+            return
+        with self.lock:
+            wait = self.opened_at + BREAKER_OPEN_SECONDS - time.monotonic()
+            if self.state == OPEN and wait > 0:
+                self._reject(wait)
+
+    def is_open(self):
+        """Non-consuming check used to pick a fallback up front."""
+        with self.lock:
+            return self.state == OPEN and time.monotonic() - self.opened_at < BREAKER_OPEN_SECONDS
+
+    def record(self, seconds, error=None):
+        failed = error is not None or seconds > self.slow_seconds
+        with self.lock:
+            now = time.monotonic()
+            if failed:
+                self.last_failure = f"{type(error).__name__}: {error}"[:200] if error is not None \
+                    else f"slow call: {seconds:.1f}s"
+            if self.state == HALF_OPEN:
+                self.probing = False
+                if failed:
+                    self._open(now)
+                else:
+                    self._set_state(CLOSED)
+                    logger.info("Circuit breaker for %s closed again", self.name)
+                return
+            if self.state == OPEN:
+                return   # a call that started before the breaker opened
+            self.calls.append((now, failed))
+            while self.calls and now - self.calls[0][0] > BREAKER_WINDOW_SECONDS:
+                self.calls.popleft()
+            failures = sum(1 for _, f in self.calls if f)
+            if len(self.calls) >= BREAKER_MIN_CALLS and failures / len(self.calls) >= BREAKER_FAILURE_RATE:
+                self._open(now)
+
+    @contextmanager
+    def guard(self):
+        """Run the block as one call to the dependency: fail fast if open, record outcome and latency."""
+        probe = self.before_call()
+        start = time.monotonic()
+        try:
+            yield
+        except deadlines.DeadlineExceeded:
+            # Our budget ran out, not necessarily their fault: only the time spent counts.
+            self.record(time.monotonic() - start)
+            raise
+        except BaseException as e:
+            # Includes GeneratorExit (client left mid-stream) and gevent.Timeout:
+            # the call didn't complete, and a half-open probe must not stay taken.
+            self.record(time.monotonic() - start, e)
+            raise
+        else:
+            self.record(time.monotonic() - start)
+        finally:
+            if probe:
+                with self.lock:
+                    self.probing = False
+
+    def stats(self):
+        with self.lock:
+            failures = sum(1 for _, f in self.calls if f)
+            return {
+                "state": self.state,
+                "window_calls": len(self.calls),
+                "window_failures": failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "last_failure": self.last_failure,
+            }
+
+
+_breakers = {name: Breaker(name, slow) for name, slow in SLOW_CALL_SECONDS.items()}
+_watching_database = False
+
+
+def get(name):
+    return _breakers[name]
+
+
+def stats():
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
+
+
+# --- database ---
+def watch_database():
+    """Feed every SQL statement into the 'database' breaker and refuse statements while it's open."""
+    from sqlalchemy import event, exc
+    from sqlalchemy.engine import Engine
+    global _watching_database
+    if _watching_database:
+        return
+    _watching_database = True
+    breaker = _breakers["database"]
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        breaker.before_call()
+        conn.info.setdefault("breaker_started", []).append(time.monotonic())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        breaker.record(time.monotonic() - conn.info["breaker_started"].pop())
+
+    @event.listens_for(Engine, "handle_error")
+    def _error(context):
+        info = context.connection.info if context.connection is not None else {}
+        started = info.get("breaker_started")
+        seconds = time.monotonic() - started.pop() if started else 0.0
+        if isinstance(context.original_exception, CircuitOpen):
+            return
+        # Constraint violations and bad SQL mean the database answered; only
+        # connection loss, timeouts and lock waits count against it.
+        unavailable = context.is_disconnect or isinstance(
+            context.sqlalchemy_exception, (exc.OperationalError, exc.InterfaceError, exc.TimeoutError)
+        )
+        breaker.record(seconds, context.original_exception if unavailable else None)
@@ -0,0 +1,148 @@
+import logging
+import os
+import json
+import time
+import hashlib
+import threading
+import metrics
+import shared_store
+
+logger = logging.getLogger(__name__)
+
+# --- SINGLE-FLIGHT COALESCING OF DUPLICATE REQUESTS ---
+# Double-clicks and front-end retries send the same payload while the first
+# copy is still waiting on Gemini / Judge0. The first request for a
+# (route, owner, payload) key becomes the leader; identical requests in the
+# same worker wait on its in-memory flight, and requests on other workers or
+# instances find the leader's lock in the shared store and poll for the
+# result it publishes. If a leader dies, its lock expires and the waiter
+# runs the call itself.
+COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "1") == "1"
+# Longest a duplicate waits for the leader (route deadlines are <= 100 s).
+COALESCE_WAIT_SECONDS = float(os.getenv("COALESCE_WAIT_SECONDS", "100"))
+# Shared lock lifetime; matches gunicorn's timeout so a killed leader can't block forever.
+COALESCE_LOCK_TTL = int(os.getenv("COALESCE_LOCK_TTL", "120"))
+# How long a finished result stays available to duplicates that arrive just after it.
+COALESCE_RESULT_TTL = int(os.getenv("COALESCE_RESULT_TTL", "10"))
+COALESCE_POLL_SECONDS = 0.25
+
+_MISSING = object()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights = {}   # key -> _Flight led by a request in this worker
+_lock = threading.Lock()
+
+
+def payload_key(route, payload):
+    """Hash of the route, the requesting user/session and the canonical JSON payload."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    raw = f"{route}\n{shared_store.owner_key()}\n{canonical}"
+    return f"{route}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+
+def _is_error(value):
+    # Failures are never shared after the fact; a retry should really retry.
+    if isinstance(value, dict):
+        return "error" in value
+    return isinstance(value, str) and "Error:" in value
+
+
+def _quietly(fn, *args):
+    try:
+        return fn(*args)
+    except Exception as e:
+        logger.warning("Shared store unavailable for coalescing: %s", e)
+        return None
+
+
+def _wait_for_remote(route, lock_key, result_key):
+    deadline = time.monotonic() + COALESCE_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(COALESCE_POLL_SECONDS)
+        found = _quietly(shared_store.get, result_key)
+        if found is not None:
+            return found["value"]
+        if _quietly(shared_store.get, lock_key) is None:
+            # Leader finished without publishing (error) or died.
+            found = _quietly(shared_store.get, result_key)
+            return found["value"] if found is not None else _MISSING
+    metrics.incr("coalesce_wait_timeout", route=route, scope="shared")
+    return _MISSING
+
+
+def _run_shared(route, key, fn):
+    lock_key, result_key = f"flight:{key}", f"flight-result:{key}"
+    try:
+        found = shared_store.get(result_key)
+        if found is not None:
+            metrics.incr("coalesce_joined", route=route, scope="recent")
+            return found["value"]
+        acquired = shared_store.add(lock_key, os.getpid(), COALESCE_LOCK_TTL)
+    except Exception as e:
+        logger.warning("Shared store unavailable for coalescing: %s", e)
+        return fn()
+
+    if not acquired:
+        metrics.incr("coalesce_joined", route=route, scope="shared")
+        value = _wait_for_remote(route, lock_key, result_key)
+        if value is not _MISSING:
+            return value
+        metrics.incr("coalesce_leader_lost", route=route)
+        return fn()
+
+    metrics.incr("coalesce_leader", route=route)
+    try:
+        value = fn()
+        if not _is_error(value):
+            _quietly(shared_store.put, result_key, {"value": value}, COALESCE_RESULT_TTL)
+        return value
+    finally:
+        _quietly(shared_store.delete, lock_key)
+
+
+def run(route, payload, fn):
+    """
+    Return fn()'s result, sharing one call between identical concurrent requests.
+    fn must return a JSON-serialisable value; it runs in the leader's request context.
+    """
+    if not COALESCE_ENABLED:
+        return fn()
+    key = payload_key(route, payload)
+
+    with _lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        metrics.incr("coalesce_joined", route=route, scope="local")
+        if not flight.done.wait(COALESCE_WAIT_SECONDS):
+            metrics.incr("coalesce_wait_timeout", route=route, scope="local")
+            return fn()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = _run_shared(route, key, fn)
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+def stats():
+    with _lock:
+        return {"in_flight": len(_flights)}
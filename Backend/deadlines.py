@@ -0,0 +1,113 @@
+import logging
+import contextvars
+import time
+from contextlib import contextmanager
+import metrics
+import profiling
+
+logger = logging.getLogger(__name__)
+
+# --- REQUEST DEADLINES ---
+# Every admitted route runs under a deadline taken from its budget in
+# admission.ROUTE_LIMITS, counted from when the request arrived (so time spent
+# queueing for a slot is already spent). Outbound calls ask timeout() for their
+# timeout: the remaining budget, capped by the call's own limit. Poll loops and
+# subprocesses do the same on every step. When too little time is left a call
+# isn't started at all, and a call that fails because it hit the deadline is
+# reported as DeadlineExceeded. admission turns that into a 504.
+# Each stage's time is recorded, and so is the stage that ran out of budget.
+# Code with no deadline set (background prefetch, scripts) just gets the caps.
+
+# Don't start an upstream call with less time than this; it could not finish.
+MIN_CALL_SECONDS = 0.5
+
+_current = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, route, stage):
+        super().__init__(f"'{route}' ran out of time during {stage}")
+        self.route = route
+        self.stage = stage
+
+
+class Deadline:
+    def __init__(self, route, budget, started=None):
+        self.route = route
+        self.budget = budget
+        self.expires_at = (time.monotonic() if started is None else started) + budget
+        self.stages = {}   # stage -> seconds spent
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def exceeded(self, stage):
+        metrics.incr("deadline_exceeded", route=self.route, stage=stage)
+        spent = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in self.stages.items()) or "nothing yet"
+        logger.warning("Deadline of %.0fs exceeded for '%s' in %s (spent: %s)", self.budget, self.route, stage, spent)
+        return DeadlineExceeded(self.route, stage)
+
+
+@contextmanager
+def scope(route, budget, started=None):
+    """Run the block under a `budget`-second deadline counted from `started` (monotonic; default now)."""
+    token = _current.set(Deadline(route, budget, started))
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def remaining():
+    """Seconds left for the current request, or None outside a deadline."""
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining()
+
+
+def timeout(stage, cap):
+    """Timeout for the next call in `stage`: at most `cap` and the remaining budget. Raises if the budget is spent."""
+    deadline = _current.get()
+    if deadline is None:
+        return cap
+    left = deadline.remaining()
+    if left < MIN_CALL_SECONDS:
+        raise deadline.exceeded(stage)
+    return min(cap, left)
+
+
+def http_options(stage, cap):
+    """google-genai `http_options` carrying timeout(stage, cap) (the SDK takes milliseconds)."""
+    return {"timeout": int(timeout(stage, cap) * 1000)}
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a stage of the request (metrics + the Server-Timing breakdown); an
+    error raised after the budget ran out becomes DeadlineExceeded.
+    """
+    deadline = _current.get()
+    start = time.monotonic()
+    error = None
+    try:
+        yield
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        error = e
+    finally:
+        elapsed = time.monotonic() - start
+        route = deadline.route if deadline is not None else "none"
+        metrics.observe("deadline_stage_seconds", elapsed, route=route, stage=name)
+        profiling.record(name, elapsed)
+        if deadline is not None:
+            deadline.stages[name] = deadline.stages.get(name, 0.0) + elapsed
+    if error is not None:
+        # The upstream timeout fired (or the call failed) because the budget was used up.
+        if deadline is not None and deadline.remaining() < MIN_CALL_SECONDS:
+            raise deadline.exceeded(name) from error
+        raise error
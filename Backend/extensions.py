@@ -0,0 +1,8 @@
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import LoginManager
+
+# --- SHARED FLASK EXTENSIONS ---
+# Created unbound here and attached to the app in create_app(), so models and
+# helper modules can import them without importing the app itself.
+db = SQLAlchemy()
+login_manager = LoginManager()
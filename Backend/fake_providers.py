@@ -0,0 +1,322 @@
+"""
+Local stand-ins for Gemini, AssemblyAI and Judge0, for benchmarks and load tests.
+
+One threaded HTTP server answers all three APIs, each on the paths the real
+service uses:
+    Gemini      /v1beta/models/<model>:generateContent, :streamGenerateContent
+                (SSE), :countTokens, /v1beta/cachedContents
+    AssemblyAI  /v2/upload, /v2/transcript, /v2/transcript/<id>
+    Judge0      /submissions/batch, /submissions/<token>, /about
+Point the app at it with GEMINI_BASE_URL, ASSEMBLYAI_BASE_URL and
+JUDGE0_BASE_URL, all set to the server's URL.
+
+Each provider has a latency distribution (log-normal, given as median and
+p95 in seconds) and an error rate. Gemini replies are shaped to the request's
+response schema, so structured-output routes validate. Streamed replies
+arrive in --stream-chunks chunks, --stream-chunk-delay seconds apart.
+AssemblyAI transcripts and Judge0 submissions only complete after their
+latency has passed, so the app's polling loops run as they do in production.
+
+Usage (from Backend/):
+    python fake_providers.py [--port 9100] [--gemini-latency 0.8:2.5] [--gemini-errors 0.01] ...
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+REPLY_TEXT = (
+    "Thanks, that answer shows a clear structure. You described the situation and your own "
+    "actions well; next time quantify the result and say what you would do differently. "
+    "Can you walk me through a time you had to make a decision with incomplete information?"
+)
+TRANSCRIPT_TEXT = (
+    "So in my last project I led a team of four and we had to migrate the reporting service "
+    "under a tight deadline, I split the work into milestones and we shipped a week early."
+)
+# Field values that keep the app's schema validators happy (see schemas.py).
+CANNED_FIELDS = {
+    "options": ["A) 12", "B) 15", "C) 18", "D) 21"],
+    "correct_answer": "B) 15",
+    "test_cases": [{"stdin": "", "expected_output": "15"}, {"stdin": "", "expected_output": "15"}],
+    "starter_code": "print(15)",
+    "model_solution": "print(15)",
+}
+
+
+class Latency:
+    """Log-normal latency given as "median:p95" seconds ("0" means none)."""
+
+    def __init__(self, spec):
+        median, _, p95 = str(spec).partition(":")
+        self.median = float(median)
+        p95 = float(p95 or median)
+        self.sigma = math.log(p95 / self.median) / 1.645 if self.median > 0 and p95 > self.median else 0.0
+
+    def sample(self, rng):
+        if self.median <= 0:
+            return 0.0
+        return self.median * math.exp(rng.gauss(0, self.sigma))
+
+    def __repr__(self):
+        return f"{self.median:g}s median"
+
+
+class Settings:
+    def __init__(self, **overrides):
+        self.gemini_latency = Latency("0.8:2.5")
+        self.gemini_errors = 0.0
+        self.stream_chunks = 8
+        self.stream_chunk_delay = 0.05
+        self.assemblyai_latency = Latency("2:5")
+        self.assemblyai_errors = 0.0
+        self.judge0_latency = Latency("1:3")
+        self.judge0_errors = 0.0
+        self.seed = None
+        for name, value in overrides.items():
+            setattr(self, name, Latency(value) if name.endswith("_latency") and not isinstance(value, Latency) else value)
+        self.rng = random.Random(self.seed)
+        self.lock = threading.Lock()
+
+    def latency(self, provider):
+        with self.lock:
+            return getattr(self, f"{provider}_latency").sample(self.rng)
+
+    def fails(self, provider):
+        with self.lock:
+            return self.rng.random() < getattr(self, f"{provider}_errors")
+
+
+def _fill_schema(schema, name=None):
+    """A value matching a Gemini Schema / JSON schema dict, using CANNED_FIELDS where they apply."""
+    if name in CANNED_FIELDS:
+        return CANNED_FIELDS[name]
+    schema = schema or {}
+    for key in ("anyOf", "any_of"):
+        if schema.get(key):
+            return _fill_schema(schema[key][0], name)
+    kind = str(schema.get("type", "string")).lower()
+    if kind == "object":
+        return {prop: _fill_schema(sub, prop) for prop, sub in (schema.get("properties") or {}).items()}
+    if kind == "array":
+        count = int(schema.get("minItems") or schema.get("min_items") or 1)
+        return [_fill_schema(schema.get("items"), None) for _ in range(count)]
+    if kind in ("integer", "number"):
+        return 1
+    if kind == "boolean":
+        return True
+    return f"Sample {name.replace('_', ' ')}" if name else "Sample text"
+
+
+def _gemini_reply(body):
+    config = body.get("generationConfig") or {}
+    schema = config.get("responseJsonSchema") or config.get("responseSchema")
+    if schema:
+        return json.dumps(_fill_schema(schema))
+    if config.get("responseMimeType") == "application/json":
+        return "{}"
+    return REPLY_TEXT
+
+
+def _candidate(text):
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {"promptTokenCount": 100, "candidatesTokenCount": len(text) // 4}}
+
+
+class FakeProviders(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    settings = Settings()
+    transcripts = {}    # id -> ready_at
+    submissions = {}    # token -> (ready_at, expected_output)
+    counts = {}
+    counts_lock = threading.Lock()
+
+    # --- plumbing ---
+    def _count(self, provider):
+        with self.counts_lock:
+            self.counts[provider] = self.counts.get(provider, 0) + 1
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _json_body(self):
+        raw = self._body()
+        return json.loads(raw) if raw else {}
+
+    def _send(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, method):
+        path = urlsplit(self.path).path
+        if path.startswith("/v1beta/"):
+            return self._gemini(method, path)
+        if path.startswith("/v2/"):
+            return self._assemblyai(method, path)
+        if path.startswith("/submissions") or path == "/about":
+            return self._judge0(method, path)
+        self._send({"error": f"no stand-in for {method} {path}"}, 404)
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_PATCH(self):
+        self._route("PATCH")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+    def log_message(self, *args):
+        pass
+
+    # --- Gemini ---
+    def _gemini(self, method, path):
+        self._count("gemini")
+        if path.startswith("/v1beta/cachedContents"):
+            body = self._json_body() if method in ("POST", "PATCH") else {}
+            name = path[len("/v1beta/"):] if method != "POST" else f"cachedContents/{uuid.uuid4().hex[:12]}"
+            return self._send({} if method == "DELETE" else {"name": name, "model": body.get("model", ""), "expireTime": "2099-01-01T00:00:00Z"})
+
+        body = self._json_body()
+        if path.endswith(":countTokens"):
+            return self._send({"totalTokens": len(json.dumps(body)) // 4})
+        time.sleep(self.settings.latency("gemini"))
+        if self.settings.fails("gemini"):
+            return self._send({"error": {"code": 503, "message": "The model is overloaded.", "status": "UNAVAILABLE"}}, 503)
+        text = _gemini_reply(body)
+        if ":streamGenerateContent" in path:
+            return self._stream(text)
+        self._send(_candidate(text))
+
+    def _stream(self, text):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        chunks = max(1, self.settings.stream_chunks)
+        words = text.split(" ")
+        size = math.ceil(len(words) / chunks)
+        for i in range(0, len(words), size):
+            piece = " ".join(words[i:i + size]) + (" " if i + size < len(words) else "")
+            self.wfile.write(f"data: {json.dumps(_candidate(piece))}\r\n\r\n".encode())
+            self.wfile.flush()
+            time.sleep(self.settings.stream_chunk_delay)
+
+    # --- AssemblyAI ---
+    def _assemblyai(self, method, path):
+        self._count("assemblyai")
+        if method == "POST" and path == "/v2/upload":
+            self._body()
+            if self.settings.fails("assemblyai"):
+                return self._send({"error": "upload failed"}, 500)
+            return self._send({"upload_url": f"http://{self.headers.get('Host')}/files/{uuid.uuid4().hex}"})
+        if method == "POST" and path == "/v2/transcript":
+            self._json_body()
+            transcript_id = uuid.uuid4().hex
+            self.transcripts[transcript_id] = time.monotonic() + self.settings.latency("assemblyai")
+            return self._send({"id": transcript_id, "status": "queued"})
+        if path == "/v2/transcript":
+            return self._send({"transcripts": []})
+        ready_at = self.transcripts.get(path.rsplit("/", 1)[-1])
+        if ready_at is None:
+            return self._send({"error": "transcript not found"}, 404)
+        if time.monotonic() < ready_at:
+            return self._send({"status": "processing"})
+        return self._send({"status": "completed", "text": TRANSCRIPT_TEXT, "audio_duration": 20})
+
+    # --- Judge0 ---
+    def _judge0(self, method, path):
+        self._count("judge0")
+        if path == "/about":
+            return self._send({"version": "fake"})
+        if self.settings.fails("judge0"):
+            self._body()
+            return self._send({"error": "service unavailable"}, 503)
+        if method == "POST":
+            tokens = []
+            for submission in self._json_body().get("submissions", []):
+                token = uuid.uuid4().hex
+                self.submissions[token] = (time.monotonic() + self.settings.latency("judge0"), submission.get("expected_output"))
+                tokens.append({"token": token})
+            return self._send(tokens)
+        ready_at, expected = self.submissions.get(path.rsplit("/", 1)[-1], (0, None))
+        if time.monotonic() < ready_at:
+            return self._send({"status": {"id": 2, "description": "Processing"}})
+        return self._send({"status": {"id": 3, "description": "Accepted"}, "stdout": expected})
+
+
+def start(port=0, **settings):
+    """Serve the stand-ins on a background thread; returns (server, base_url). Call server.shutdown() to stop."""
+    FakeProviders.settings = Settings(**settings)
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeProviders)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def provider_env(base_url):
+    """Environment that points the app at the stand-ins."""
+    return {
+        "GEMINI_BASE_URL": base_url, "GEMINI_API_KEY": "bench",
+        "ASSEMBLYAI_BASE_URL": base_url, "ASSEMBLYAI_API_KEY": "bench",
+        "JUDGE0_BASE_URL": base_url, "JUDGE0_API_KEY": "bench",
+    }
+
+
+def call_counts():
+    with FakeProviders.counts_lock:
+        return dict(FakeProviders.counts)
+
+
+def add_arguments(parser):
+    """The stand-in settings as command line options (shared with the bench and replay tools)."""
+    group = parser.add_argument_group("provider stand-ins")
+    group.add_argument("--gemini-latency", default="0.8:2.5", help="median:p95 seconds")
+    group.add_argument("--gemini-errors", type=float, default=0.0, help="fraction of calls answered with 503")
+    group.add_argument("--stream-chunks", type=int, default=8)
+    group.add_argument("--stream-chunk-delay", type=float, default=0.05)
+    group.add_argument("--assemblyai-latency", default="2:5", help="median:p95 seconds until a transcript completes")
+    group.add_argument("--assemblyai-errors", type=float, default=0.0)
+    group.add_argument("--judge0-latency", default="1:3", help="median:p95 seconds until a submission completes")
+    group.add_argument("--judge0-errors", type=float, default=0.0)
+    group.add_argument("--seed", type=int, default=None)
+
+
+def settings_from(args):
+    names = ["gemini_latency", "gemini_errors", "stream_chunks", "stream_chunk_delay", "assemblyai_latency",
+             "assemblyai_errors", "judge0_latency", "judge0_errors", "seed"]
+    return {name: getattr(args, name) for name in names}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    server, base_url = start(args.port, **settings_from(args))
+    print(f"Provider stand-ins on {base_url}; for the app:")
+    for name, value in provider_env(base_url).items():
+        print(f"    export {name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
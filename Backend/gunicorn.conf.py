@@ -0,0 +1,14 @@
+import os
+
+# --- GUNICORN SETTINGS ---
+# Default: cooperative gevent workers serving wsgi:app.
+# Set GUNICORN_WORKER_CLASS=sync (and serve app:app) to get the old behaviour.
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gevent")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# Max simultaneous requests per gevent worker (ignored by sync workers).
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "500"))
+# Final reports and transcription polling can legitimately take ~60 s.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
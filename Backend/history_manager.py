@@ -0,0 +1,135 @@
+import logging
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import deadlines
+
+logger = logging.getLogger(__name__)
+
+# --- HISTORY WINDOW CONFIGURATION ---
+# Conversation rounds replay the whole history on every turn. Once the history
+# goes over budget we keep the most recent turns verbatim and replace the older
+# ones with a rolling summary written by a cheap model tier.
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2500"))
+DEBRIEF_TOKEN_BUDGET = int(os.getenv("DEBRIEF_TOKEN_BUDGET", "6000"))
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "2"))   # one turn = AI question + user answer
+SUMMARY_MODEL = os.getenv("HISTORY_SUMMARY_MODEL", "gemini-2.5-flash-lite")
+# Cap on one summary call; the request's remaining deadline may cut it shorter.
+SUMMARY_TIMEOUT_SECONDS = float(os.getenv("HISTORY_SUMMARY_TIMEOUT_SECONDS", "15"))
+SUMMARY_CACHE_MAX_ENTRIES = 512
+
+SUMMARY_HEADER = "Summary of the earlier part of this interview:"
+
+_summaries = OrderedDict()   # prefix hash -> summary text
+_lock = threading.Lock()
+
+
+def count_tokens(message):
+    """Local token estimate for one history message (~4 characters per token)."""
+    text = "".join(part.get("text", "") for part in message.get("parts", []))
+    return len(text) // 4 + 1
+
+
+def _message_text(message):
+    return " ".join(part.get("text", "") for part in message.get("parts", []))
+
+
+def _prefix_hashes(messages):
+    """Rolling hash of every prefix, so an older summary can be found and extended."""
+    hashes = []
+    h = hashlib.sha256()
+    for msg in messages:
+        h.update(msg.get("role", "").encode("utf-8"))
+        h.update(_message_text(msg).encode("utf-8"))
+        hashes.append(h.copy().hexdigest())
+    return hashes
+
+
+def _split_point(history):
+    """Index where the verbatim tail starts. The tail always opens with a model question."""
+    start = max(0, len(history) - HISTORY_KEEP_TURNS * 2)
+    while start < len(history) and history[start].get("role") != "model":
+        start += 1
+    return start
+
+
+def summarize(client, older):
+    """
+    Summary of `older` messages. Reuses the longest previously summarized prefix
+    and only sends the new turns to the summary model.
+    """
+    hashes = _prefix_hashes(older)
+    previous, covered = None, 0
+    with _lock:
+        for i in range(len(hashes) - 1, -1, -1):
+            if hashes[i] in _summaries:
+                previous, covered = _summaries[hashes[i]], i + 1
+                _summaries.move_to_end(hashes[i])
+                break
+
+    if covered == len(older):
+        return previous
+
+    new_turns = "\n".join(f"{msg['role']}: {_message_text(msg)}" for msg in older[covered:])
+    prompt = f"""
+    You maintain a running summary of a mock job interview between an AI interviewer ('model') and a candidate ('user').
+    Update the summary with the new turns below. Keep every question asked, the key facts, examples and
+    claims from the candidate's answers, and any notable weaknesses. Write at most 150 words of plain text.
+
+    Current summary:
+    {previous or "(none yet)"}
+
+    New turns:
+    {new_turns}
+    """
+    with deadlines.stage("summary"):
+        response = client.models.generate_content(
+            model=SUMMARY_MODEL,
+            contents=prompt,
+            config={"http_options": deadlines.http_options("summary", SUMMARY_TIMEOUT_SECONDS)}
+        )
+    summary = (response.text or "").strip()
+    if not summary:
+        raise ValueError("Summary model returned an empty response.")
+
+    with _lock:
+        _summaries[hashes[-1]] = summary
+        while len(_summaries) > SUMMARY_CACHE_MAX_ENTRIES:
+            _summaries.popitem(last=False)
+    return summary
+
+
+def _compact(client, history, budget):
+    """Return (summary or None, verbatim tail) for `history` under `budget` tokens."""
+    if sum(count_tokens(msg) for msg in history) <= budget:
+        return None, history
+
+    split = _split_point(history)
+    if split == 0:
+        return None, history
+    older, recent = history[:split], history[split:]
+    try:
+        return summarize(client, older), recent
+    except deadlines.DeadlineExceeded:
+        raise   # no time left for the turn itself either
+    except Exception as e:
+        logger.warning("History summary failed, dropping %d older messages instead: %s", len(older), e)
+        return "(Earlier turns omitted.)", recent
+
+
+def window_history(client, history, budget=HISTORY_TOKEN_BUDGET):
+    """History to replay in the chat: unchanged if it fits, else summary + last N turns."""
+    summary, recent = _compact(client, history, budget)
+    if summary is None:
+        return history
+    return [{"role": "user", "parts": [{"text": f"{SUMMARY_HEADER}\n{summary}"}]}] + recent
+
+
+def transcript_text(client, history, budget=DEBRIEF_TOKEN_BUDGET):
+    """Plain-text transcript for debrief prompts, bounded the same way as the chat window."""
+    summary, recent = _compact(client, [msg for msg in history if 'parts' in msg], budget)
+    lines = [f"{msg['role']}: {msg['parts'][0]['text']}" for msg in recent]
+    if summary is not None:
+        lines.insert(0, f"{SUMMARY_HEADER}\n{summary}\n")
+    return "\n".join(lines)
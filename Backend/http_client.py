@@ -0,0 +1,161 @@
+import logging
+import os
+import time
+import threading
+from collections import defaultdict
+from urllib.parse import urlsplit
+import metrics
+import deadlines
+import providers
+
+logger = logging.getLogger(__name__)
+
+# --- SHARED HTTP CLIENT (AssemblyAI, Judge0) ---
+# One httpx client per worker for every outbound REST call. It keeps a
+# keep-alive connection pool sized for the worker (HTTP_POOL_MAXSIZE
+# connections in total) and negotiates HTTP/2 where the host supports it and
+# the h2 package is installed, so a whole upload/transcribe/poll sequence or a
+# batch of Judge0 status checks reuses one or two connections. Every request
+# also gets the same policy:
+# - a timeout taken from the request deadline (deadlines.timeout)
+# - retries with backoff: any method on a connect failure (nothing was sent),
+#   idempotent methods also on 502/503/504 and dropped connections
+# - per-host counters and pool utilization for /api/metrics
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_RETRY_BACKOFF_SECONDS = 0.25
+RETRY_STATUSES = {502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+_hosts = defaultdict(lambda: {"requests": 0, "errors": 0, "retries": 0, "in_flight": 0, "seconds": 0.0})
+_lock = threading.Lock()
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _build_client():
+    import httpx
+    http2 = _http2_available()
+    limits = httpx.Limits(
+        max_connections=HTTP_POOL_MAXSIZE,
+        max_keepalive_connections=HTTP_POOL_MAXSIZE,
+        keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+    )
+    logger.info("HTTP client: pool of %d connections, HTTP/2 %s", HTTP_POOL_MAXSIZE, "on" if http2 else "off (h2 not installed)")
+    return httpx.Client(http2=http2, limits=limits)
+
+
+providers.register("http", _build_client)
+
+
+def client():
+    return providers.get("http")
+
+
+def _should_retry(method, error, response):
+    import httpx
+    if error is not None:
+        # A failed connect never reached the server, so even a POST is safe to repeat.
+        return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)) or \
+            (method in IDEMPOTENT_METHODS and isinstance(error, httpx.TransportError))
+    return method in IDEMPOTENT_METHODS and response.status_code in RETRY_STATUSES
+
+
+def request(method, url, stage, timeout=HTTP_TIMEOUT_SECONDS, **kwargs):
+    """
+    Send one request through the shared client under the current deadline.
+    `stage` names the dependency for deadline metrics ("assemblyai", "judge0").
+    Returns the httpx.Response (any status); raises after the last failed retry.
+    """
+    import httpx
+    method = method.upper()
+    host = urlsplit(url).netloc
+    if kwargs.get("headers"):
+        # Like requests, leave out headers whose value is None (e.g. an unset API key).
+        kwargs["headers"] = {k: v for k, v in kwargs["headers"].items() if v is not None}
+    with _lock:
+        stats = _hosts[host]
+    for attempt in range(HTTP_RETRIES + 1):
+        error = response = None
+        start = time.perf_counter()
+        with _lock:
+            stats["requests"] += 1
+            stats["in_flight"] += 1
+        try:
+            with deadlines.stage(stage):
+                seconds = deadlines.timeout(stage, timeout)
+                response = client().request(
+                    method, url, timeout=httpx.Timeout(seconds, connect=min(seconds, HTTP_CONNECT_TIMEOUT_SECONDS)),
+                    **kwargs
+                )
+        except httpx.HTTPError as e:
+            error = e
+        finally:
+            elapsed = time.perf_counter() - start
+            with _lock:
+                stats["in_flight"] -= 1
+                stats["seconds"] += elapsed
+                if error is not None:
+                    stats["errors"] += 1
+            metrics.observe("http_request_seconds", elapsed, host=host)
+
+        if attempt == HTTP_RETRIES or not _should_retry(method, error, response):
+            break
+        backoff = HTTP_RETRY_BACKOFF_SECONDS * 2 ** attempt
+        remaining = deadlines.remaining()
+        if remaining is not None and remaining < backoff + deadlines.MIN_CALL_SECONDS:
+            break
+        with _lock:
+            stats["retries"] += 1
+        metrics.incr("http_retries", host=host)
+        time.sleep(backoff)
+
+    if error is not None:
+        raise error
+    return response
+
+
+def get(url, stage, **kwargs):
+    return request("GET", url, stage, **kwargs)
+
+
+def post(url, stage, **kwargs):
+    return request("POST", url, stage, **kwargs)
+
+
+def _pool_stats():
+    """Connection counts from httpx's transport pool (internal API, so best effort)."""
+    pool = getattr(getattr(client(), "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    idle = sum(1 for c in connections if c.is_idle())
+    http2 = sum(1 for c in connections if "HTTP2" in type(getattr(c, "_connection", None)).__name__)
+    return {
+        "limit": HTTP_POOL_MAXSIZE,
+        "open": len(connections),
+        "idle": idle,
+        "active": len(connections) - idle,
+        "http2": http2,
+        "utilization": round((len(connections) - idle) / HTTP_POOL_MAXSIZE, 3),
+    }
+
+
+def stats():
+    with _lock:
+        hosts = {
+            host: dict(s, seconds=round(s["seconds"], 3),
+                       avg_seconds=round(s["seconds"] / s["requests"], 3) if s["requests"] else None)
+            for host, s in _hosts.items()
+        }
+    data = {"hosts": hosts}
+    if providers.is_loaded("http"):
+        data["pool"] = _pool_stats()
+    return data
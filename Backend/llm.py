@@ -0,0 +1,231 @@
+import logging
+import os
+import json
+import time
+import threading
+import metrics
+import providers
+import deadlines
+import breakers
+
+logger = logging.getLogger(__name__)
+
+# --- TEXT GENERATION WITH PROVIDER FAILOVER ---
+# Single-shot generation (questions, feedback, structured JSON) goes through
+# generate(), which tries the configured providers in order of live health
+# and latency. Each provider keeps an EWMA of its call latency and a cooldown
+# after errors; a provider that errors, times out, or returns nothing is
+# skipped for the rest of the request and the next one answers instead.
+# Attempts share the request's deadline: each gets at most what is left of
+# it, and once it is spent generate() raises DeadlineExceeded instead of
+# failing over (and doesn't hold the cut-short attempt against the provider).
+# Chat rounds with cached prefixes stay on Gemini (see ai_logic.send_chat_turn).
+
+# Provider order = preference. 'local' is a deterministic stand-in for tests and benchmarks.
+LLM_PROVIDERS = [p.strip() for p in os.getenv("LLM_PROVIDERS", "gemini,huggingface").split(",") if p.strip()]
+# Per-attempt timeout; a slower call counts as a failure and fails over.
+LLM_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "40"))
+# Providers whose latency EWMA is above this are tried after faster ones.
+LLM_SLOW_THRESHOLD_SECONDS = float(os.getenv("LLM_SLOW_THRESHOLD_SECONDS", "15"))
+LLM_LATENCY_EWMA_ALPHA = 0.2
+# Cooldown after consecutive failures doubles from the base up to the max.
+LLM_COOLDOWN_BASE_SECONDS = 5
+LLM_COOLDOWN_MAX_SECONDS = 120
+LLM_RATE_LIMIT_COOLDOWN_SECONDS = 30
+
+HF_TEXT_MODEL = os.getenv("HF_TEXT_MODEL", "meta-llama/Llama-3.1-8B-Instruct")
+HF_MAX_TOKENS = int(os.getenv("HF_MAX_TOKENS", "1500"))
+
+
+class EmptyResponse(Exception):
+    pass
+
+
+class NoProviderAvailable(Exception):
+    pass
+
+
+def _is_rate_limit(error):
+    text = str(error).lower()
+    return "429" in text or "rate limit" in text or "resource_exhausted" in text
+
+
+# --- providers ---
+class GeminiText:
+    name = "gemini"
+
+    def generate(self, prompt, gemini_model, system=None, schema=None, thinking=False, temperature=None):
+        config = {"http_options": deadlines.http_options(self.name, LLM_ATTEMPT_TIMEOUT_SECONDS)}
+        if system:
+            config["system_instruction"] = system
+        if schema is not None:
+            config["response_mime_type"] = "application/json"
+            config["response_schema"] = schema
+        if thinking:
+            config["thinking_config"] = {"include_thoughts": True}
+        if temperature is not None:
+            config["temperature"] = temperature
+        with breakers.get("gemini").guard():
+            response = providers.get("gemini").models.generate_content(model=gemini_model, contents=prompt, config=config)
+        return response.text or ""
+
+
+class HuggingFaceText:
+    name = "huggingface"
+
+    def generate(self, prompt, gemini_model=None, system=None, schema=None, thinking=False, temperature=None):
+        client = providers.get("huggingface")
+        if client is None:
+            raise NoProviderAvailable("HF_API_KEY not set")
+        # The client's timeout is fixed when it's built; just don't start without enough budget.
+        deadlines.timeout(self.name, LLM_ATTEMPT_TIMEOUT_SECONDS)
+        if schema is not None:
+            # No schema-constrained decoding here; describe the schema and let
+            # structured_output validate / repair what comes back.
+            prompt = (f"{prompt}\n\nRespond with only a JSON object matching this JSON schema:\n"
+                      f"{json.dumps(schema.model_json_schema())}")
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": prompt})
+        output = client.chat_completion(
+            messages=messages, model=HF_TEXT_MODEL, max_tokens=HF_MAX_TOKENS, temperature=temperature
+        )
+        return output.choices[0].message.content or ""
+
+
+class LocalText:
+    """Deterministic stand-in: answers with `responder(prompt, schema)` without any network."""
+    name = "local"
+
+    def __init__(self, responder=None):
+        self.responder = responder or (lambda prompt, schema: "This is a local stand-in response.")
+
+    def generate(self, prompt, gemini_model=None, system=None, schema=None, thinking=False, temperature=None):
+        return self.responder(prompt, schema)
+
+
+_PROVIDER_TYPES = {"gemini": GeminiText, "huggingface": HuggingFaceText, "local": LocalText}
+
+
+class ProviderHealth:
+    def __init__(self, provider):
+        self.provider = provider
+        self.latency = None        # EWMA seconds
+        self.failures = 0          # consecutive
+        self.cooldown_until = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.last_error = None
+        self.lock = threading.Lock()
+
+    def available(self, now):
+        return now >= self.cooldown_until
+
+    def slow(self):
+        return self.latency is not None and self.latency > LLM_SLOW_THRESHOLD_SECONDS
+
+    def record_success(self, seconds):
+        with self.lock:
+            self.calls += 1
+            self.failures = 0
+            self.cooldown_until = 0.0
+            self.latency = seconds if self.latency is None else \
+                self.latency + LLM_LATENCY_EWMA_ALPHA * (seconds - self.latency)
+
+    def record_failure(self, error, seconds):
+        with self.lock:
+            self.calls += 1
+            self.errors += 1
+            self.failures += 1
+            self.last_error = f"{type(error).__name__}: {error}"[:200]
+            # A slow failure (timeout) is a lower bound on latency; fast
+            # failures (rate limits, auth) say nothing about it.
+            if self.latency is None or seconds > self.latency:
+                self.latency = seconds if self.latency is None else \
+                    self.latency + LLM_LATENCY_EWMA_ALPHA * (seconds - self.latency)
+            if _is_rate_limit(error):
+                cooldown = LLM_RATE_LIMIT_COOLDOWN_SECONDS
+            else:
+                cooldown = min(LLM_COOLDOWN_MAX_SECONDS, LLM_COOLDOWN_BASE_SECONDS * 2 ** (self.failures - 1))
+            self.cooldown_until = time.time() + cooldown
+
+    def state(self):
+        remaining = self.cooldown_until - time.time()
+        return {
+            "latency_ewma_seconds": round(self.latency, 3) if self.latency is not None else None,
+            "consecutive_failures": self.failures,
+            "cooldown_seconds": round(remaining, 1) if remaining > 0 else 0,
+            "calls": self.calls,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+
+_health = {}
+
+
+def configure(names=None, local_responder=None):
+    """(Re)build the provider chain; tests call this with ['local'] and a responder."""
+    chain = {}
+    for name in names or LLM_PROVIDERS:
+        if name == "huggingface" and not os.getenv("HF_API_KEY"):
+            continue
+        provider = LocalText(local_responder) if name == "local" else _PROVIDER_TYPES[name]()
+        chain[name] = ProviderHealth(provider)
+    _health.clear()
+    _health.update(chain)
+
+
+def _ordered():
+    """Available providers in preference order, slow ones last; everything if all are cooling down."""
+    now = time.time()
+    candidates = [h for h in _health.values() if h.available(now)] or list(_health.values())
+    return sorted(candidates, key=lambda h: h.slow())   # stable: keeps preference order
+
+
+def overloaded():
+    """True when every configured provider is cooling down after failures."""
+    now = time.time()
+    return bool(_health) and not any(h.available(now) for h in _health.values())
+
+
+def generate(prompt, gemini_model="gemini-2.5-flash", **options):
+    """
+    Generate text with the first healthy provider, failing over on errors,
+    timeouts and empty responses. `options`: system, schema, thinking, temperature.
+    Returns "" if every provider answered empty; raises the last error otherwise.
+    """
+    last_error = None
+    for attempt, health in enumerate(_ordered()):
+        name = health.provider.name
+        start = time.perf_counter()
+        try:
+            with deadlines.stage(name):
+                text = health.provider.generate(prompt, gemini_model=gemini_model, **options)
+            if not text.strip():
+                raise EmptyResponse(f"{name} returned an empty response")
+        except deadlines.DeadlineExceeded:
+            raise
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            health.record_failure(e, elapsed)
+            metrics.incr("llm_errors", provider=name)
+            logger.warning("LLM provider '%s' failed after %.1fs, failing over: %s", name, elapsed, e)
+            last_error = e
+            continue
+        elapsed = time.perf_counter() - start
+        health.record_success(elapsed)
+        metrics.observe("llm_call_seconds", elapsed, provider=name)
+        if attempt:
+            metrics.incr("llm_failover", provider=name)
+        return text
+
+    if isinstance(last_error, EmptyResponse):
+        return ""
+    raise last_error or NoProviderAvailable("No LLM provider is configured.")
+
+
+def stats():
+    return {name: health.state() for name, health in _health.items()}
+
+
+configure()
@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+import logging.handlers
+
+# --- STRUCTURED, NON-BLOCKING LOGGING ---
+# Modules log through logging.getLogger(__name__). configure() points the root
+# logger at a bounded in-memory queue, and a background thread drains that
+# queue to stdout, so a slow log shipper backs up the queue rather than the
+# request threads. When the queue is full, records are dropped and counted
+# instead of blocking.
+# Each record carries the request ID (from X-Request-ID or generated per
+# request, echoed back in the response). Long messages are truncated.
+# Repetitive messages below ERROR are rate-limited per call site.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Per-module overrides, e.g. "prompt_cache=WARNING,llm=DEBUG".
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")   # "json" | "text"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "2000"))
+# Per call site: at most LOG_SAMPLE_BURST records per LOG_SAMPLE_WINDOW_SECONDS below ERROR.
+LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "20"))
+LOG_SAMPLE_WINDOW_SECONDS = float(os.getenv("LOG_SAMPLE_WINDOW_SECONDS", "60"))
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+stats = {"queued": 0, "dropped": 0, "sampled_out": 0, "truncated": 0}
+_listener = None
+
+
+def set_request_id(request_id):
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+class _ContextFilter(logging.Filter):
+    """Attach the request ID and truncate oversized messages (on the caller's thread, before queueing)."""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        try:
+            message = record.getMessage()
+        except Exception as e:
+            # A bad format string must never fail the request that logged it.
+            message = f"{record.msg!r} (unformattable args {record.args!r}: {e})"
+        if len(message) > LOG_MAX_MESSAGE_CHARS:
+            stats["truncated"] += 1
+            message = f"{message[:LOG_MAX_MESSAGE_CHARS]}... [{len(message) - LOG_MAX_MESSAGE_CHARS} chars truncated]"
+        record.msg, record.args = message, None
+        return True
+
+
+class _SamplingFilter(logging.Filter):
+    """Let through LOG_SAMPLE_BURST records per call site and window; report how many were skipped."""
+
+    def __init__(self):
+        super().__init__()
+        self.windows = {}   # (pathname, lineno) -> [window start, count]
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            return True
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(site)
+            if window is None or now - window[0] > LOG_SAMPLE_WINDOW_SECONDS:
+                skipped = max(0, window[1] - LOG_SAMPLE_BURST) if window else 0
+                window = self.windows[site] = [now, 0]
+                if skipped:
+                    record.sampled_out = skipped
+            window[1] += 1
+            if window[1] <= LOG_SAMPLE_BURST:
+                return True
+        stats["sampled_out"] += 1
+        return False
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            stats["queued"] += 1
+        except queue.Full:
+            stats["dropped"] += 1
+
+    def prepare(self, record):
+        # The filters already merged args into msg; keep the record (and its extras) as is.
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.msg,
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "sampled_out", None):
+            entry["sampled_out"] = record.sampled_out
+        if record.exc_text:
+            entry["exc"] = record.exc_text[-LOG_MAX_MESSAGE_CHARS:]
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        request_id = getattr(record, "request_id", None)
+        text = f"{record.levelname:<7} {record.name}{f' [{request_id}]' if request_id else ''}: {record.msg}"
+        if getattr(record, "sampled_out", None):
+            text += f" ({record.sampled_out} similar messages skipped)"
+        if record.exc_text:
+            text += "\n" + record.exc_text
+        return text
+
+
+def _apply_levels():
+    logging.getLogger().setLevel(LOG_LEVEL)
+    for item in LOG_LEVELS.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+
+def configure():
+    """Install the queue handler and start the writer thread (once per process)."""
+    global _listener
+    if _listener is not None:
+        return
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = _DroppingQueueHandler(log_queue)
+    handler.addFilter(_SamplingFilter())
+    handler.addFilter(_ContextFilter())
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    _apply_levels()
+
+
+def queue_stats():
+    return dict(stats, pending=_listener.queue.qsize() if _listener is not None else 0)
@@ -0,0 +1,64 @@
+import threading
+from collections import defaultdict
+
+# --- IN-PROCESS METRICS REGISTRY ---
+# A tiny counter/gauge/timing registry. Every worker keeps its own numbers;
+# /api/metrics returns a JSON snapshot of the worker that served the request
+# (admin token or METRICS_ALLOWED_IPS only, see app.py).
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_gauges = {}
+_timings = {}
+_collectors = {}
+
+
+def _key(name, labels):
+    if not labels:
+        return name
+    label_text = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{label_text}}}"
+
+
+def incr(name, value=1, **labels):
+    """Increase a counter, e.g. incr("structured_output_retry", schema="aptitude")."""
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name, value, **labels):
+    """Record one timing/size sample (count, total, max)."""
+    key = _key(name, labels)
+    with _lock:
+        t = _timings.setdefault(key, {"count": 0, "total": 0.0, "max": 0.0})
+        t["count"] += 1
+        t["total"] += value
+        t["max"] = max(t["max"], value)
+
+
+def register_collector(name, fn):
+    """Register a callable whose dict result is included in every snapshot."""
+    _collectors[name] = fn
+
+
+def snapshot():
+    with _lock:
+        data = {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "timings": {
+                k: dict(v, avg=(v["total"] / v["count"]) if v["count"] else 0.0)
+                for k, v in _timings.items()
+            },
+        }
+    for name, fn in _collectors.items():
+        try:
+            data[name] = fn()
+        except Exception as e:
+            data[name] = {"error": str(e)}
+    return data
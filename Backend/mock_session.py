@@ -0,0 +1,204 @@
+import logging
+import os
+import time
+import uuid
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+import deadlines
+import shared_store
+from ai_logic import get_aptitude_question, get_technical_question, generate_communication_topic
+
+logger = logging.getLogger(__name__)
+
+# --- SERVER-SIDE MOCK TEST SESSIONS ---
+# A mock test shows 20 aptitude questions, the communication topic and two
+# coding problems, in that order. Starting a session queues background
+# generation of the first MOCK_PREFETCH_AHEAD of them, and every item served
+# queues the next MOCK_PREFETCH_AHEAD that are still missing, so one session
+# never holds more than that many slots in the shared prefetch queue (a whole
+# class starting at once would otherwise queue 23 items each). Items land in
+# the shared store, so any worker can serve them; a per-item lock keeps two
+# workers from generating the same item. If an item is not ready in time it
+# is generated inline, and a prefetch of it still waiting in this worker's
+# queue is cancelled rather than waited for.
+MOCK_SESSION_TTL_SECONDS = int(os.getenv("MOCK_SESSION_TTL_SECONDS", str(3 * 3600)))
+MOCK_PREFETCH_WORKERS = int(os.getenv("MOCK_PREFETCH_WORKERS", "4"))
+MOCK_PREFETCH_AHEAD = int(os.getenv("MOCK_PREFETCH_AHEAD", "4"))
+# How long a request waits for an item another worker is still generating.
+MOCK_ITEM_WAIT_SECONDS = float(os.getenv("MOCK_ITEM_WAIT_SECONDS", "20"))
+MOCK_GENERATION_LOCK_TTL = 120
+POLL_SECONDS = 0.25
+
+APTITUDE_COUNT = 20
+CODING_TOPICS = ["Basic", "Mix (DSA)"]
+LANGUAGES = ("python", "java")
+
+# kind -> number of items; rounds run in this order
+ROUND_ITEMS = {"aptitude": APTITUDE_COUNT, "topic": 1, "coding": len(CODING_TOPICS)}
+# Every item in the order the test shows them.
+SEQUENCE = [(kind, index) for kind, count in ROUND_ITEMS.items() for index in range(count)]
+
+_executor = ThreadPoolExecutor(max_workers=MOCK_PREFETCH_WORKERS, thread_name_prefix="mock-prefetch")
+_pending = {}   # item key -> Future of its prefetch queued in this worker
+_pending_lock = threading.Lock()
+
+
+class SessionNotFound(Exception):
+    pass
+
+
+def _session_key(session_id):
+    return f"mock:{session_id}"
+
+
+def _item_key(session_id, kind, index):
+    return f"mock:{session_id}:{kind}:{index}"
+
+
+def _generate(meta, kind, index):
+    if kind == "aptitude":
+        return get_aptitude_question("Mix")
+    if kind == "coding":
+        return get_technical_question(CODING_TOPICS[index], meta["language"])
+    return generate_communication_topic()
+
+
+def _fill(app, session_id, meta, kind, index, force=False):
+    """Generate one item into the store unless it's there or another worker is on it (force: regardless)."""
+    with app.app_context():
+        key = _item_key(session_id, kind, index)
+        existing = shared_store.get(key)
+        if existing and existing["status"] == "ready":
+            return
+        lock_key = f"{key}:lock"
+        locked = shared_store.add(lock_key, os.getpid(), MOCK_GENERATION_LOCK_TTL)
+        if not locked and not force:
+            return
+        start = time.perf_counter()
+        try:
+            data = _generate(meta, kind, index)
+            if "error" in data:
+                metrics.incr("mock_prefetch_errors", kind=kind)
+                item = {"status": "error", "error": data["error"]}
+            else:
+                item = {"status": "ready", "data": data}
+            shared_store.put(key, item, MOCK_SESSION_TTL_SECONDS)
+            metrics.observe("mock_generate_seconds", time.perf_counter() - start, kind=kind)
+        finally:
+            if locked:
+                shared_store.delete(lock_key)
+
+
+def _fill_quietly(app, session_id, meta, kind, index):
+    try:
+        _fill(app, session_id, meta, kind, index)
+    except Exception as e:
+        logger.warning("Mock test prefetch failed for %s[%d] of %s: %s", kind, index, session_id, e)
+
+
+def _schedule(app, session_id, meta, items):
+    for kind, index in items:
+        key = _item_key(session_id, kind, index)
+        # Mark it queued so readers wait for it instead of generating inline;
+        # something already queued, generating or ready isn't queued again.
+        if not shared_store.add(key, {"status": "queued"}, MOCK_SESSION_TTL_SECONDS):
+            item = shared_store.get(key)
+            if item is None or item["status"] != "error":
+                continue
+            shared_store.put(key, {"status": "queued"}, MOCK_SESSION_TTL_SECONDS)
+        # Run in a copy of the caller's context so prefetch logs carry its request ID.
+        future = _executor.submit(contextvars.copy_context().run, _fill_quietly, app, session_id, meta, kind, index)
+        with _pending_lock:
+            _pending[key] = future
+        future.add_done_callback(lambda _f, key=key: _forget(key, _f))
+
+
+def _forget(key, future):
+    with _pending_lock:
+        if _pending.get(key) is future:
+            del _pending[key]
+
+
+def _cancel_queued(key):
+    """Cancel this worker's prefetch of `key` if it hasn't started yet. True if it was cancelled."""
+    with _pending_lock:
+        future = _pending.get(key)
+    return future is not None and future.cancel()
+
+
+def _upcoming(session_id, kind, index):
+    """The next MOCK_PREFETCH_AHEAD items after (kind, index) that aren't ready yet."""
+    position = SEQUENCE.index((kind, index)) + 1
+    items = []
+    for next_kind, next_index in SEQUENCE[position:position + MOCK_PREFETCH_AHEAD]:
+        item = shared_store.get(_item_key(session_id, next_kind, next_index))
+        if not item or item["status"] != "ready":
+            items.append((next_kind, next_index))
+    return items
+
+
+def start(app, owner, language):
+    """Create a session and queue generation of its first items. Returns the session id."""
+    if language not in LANGUAGES:
+        language = "python"
+    session_id = uuid.uuid4().hex
+    meta = {"owner": owner, "language": language, "created_at": time.time()}
+    shared_store.put(_session_key(session_id), meta, MOCK_SESSION_TTL_SECONDS)
+
+    _schedule(app, session_id, meta, SEQUENCE[:MOCK_PREFETCH_AHEAD])
+    metrics.incr("mock_sessions_started")
+    return session_id
+
+
+def load(session_id, owner):
+    meta = shared_store.get(_session_key(session_id))
+    if meta is None or meta["owner"] != owner:
+        raise SessionNotFound(session_id)
+    return meta
+
+
+def _wait_for_item(session_id, kind, index):
+    """Poll while the item is queued or being generated; returns whatever is stored when that stops or time runs out."""
+    key = _item_key(session_id, kind, index)
+    # Leave at least half of the request's remaining budget for generating it inline.
+    remaining = deadlines.remaining()
+    wait = MOCK_ITEM_WAIT_SECONDS if remaining is None else min(MOCK_ITEM_WAIT_SECONDS, remaining / 2)
+    deadline = time.monotonic() + wait
+    while True:
+        item = shared_store.get(key)
+        if item and item["status"] == "ready":
+            return item
+        generating = shared_store.get(f"{key}:lock") is not None
+        if item and item["status"] == "queued" and not generating and _cancel_queued(key):
+            return item   # still waiting in our queue: generating it now is no slower
+        pending = (item and item["status"] == "queued") or generating
+        if not pending or time.monotonic() > deadline:
+            return item
+        time.sleep(POLL_SECONDS)
+
+
+def get_item(app, session_id, owner, kind, index):
+    """
+    Serve one prefetched item, generating it inline if it isn't ready.
+    Returns (data, None) or (None, error message).
+    """
+    meta = load(session_id, owner)
+    if kind not in ROUND_ITEMS or not 0 <= index < ROUND_ITEMS[kind]:
+        raise SessionNotFound(f"{session_id}/{kind}/{index}")
+
+    item = _wait_for_item(session_id, kind, index)
+    if item and item["status"] == "ready":
+        metrics.incr("mock_items_served", kind=kind, source="prefetch")
+    else:
+        metrics.incr("mock_items_served", kind=kind, source="inline")
+        _fill(app, session_id, meta, kind, index, force=True)
+        item = shared_store.get(_item_key(session_id, kind, index))
+
+    # Keep the next few items in preparation (also re-queues failed prefetches).
+    _schedule(app, session_id, meta, _upcoming(session_id, kind, index))
+
+    if item is None or item["status"] != "ready":
+        return None, (item or {}).get("error", "The AI failed to generate this item. Please try again.")
+    return item["data"], None
@@ -0,0 +1,101 @@
+import zlib
+from datetime import datetime, timezone
+from flask_login import UserMixin
+from extensions import db
+
+
+# ⭐️ --- UPDATED DATABASE MODELS (to work with Flask-Login) --- ⭐️
+class User(db.Model, UserMixin):
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    password_hash = db.Column(db.String(128), nullable=False) # Password is now required
+    username = db.Column(db.String(80), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f'<User {self.username}>'
+# ⭐️ --- END UPDATED DATABASE MODELS --- ⭐️
+
+
+def utcnow():
+    """Naive UTC timestamp (SQLite and Postgres `timestamp` columns store no zone)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class Report(db.Model):
+    """
+    A saved interview / mock-test report. The markdown body is stored
+    zlib-compressed; the numbers we filter and chart on are extracted into
+    their own columns so history pages never need to decompress bodies.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    round_type = db.Column(db.String(32), nullable=False, default='general')
+    score = db.Column(db.Integer, nullable=True)          # from the "SCORE: X%" line
+    wpm = db.Column(db.Integer, nullable=True)
+    filler_count = db.Column(db.Integer, nullable=True)
+    body_size = db.Column(db.Integer, nullable=False)     # uncompressed bytes
+    body_compressed = db.Column(db.LargeBinary, nullable=False)
+
+    # Keyset pagination walks (user_id, created_at, id) newest-first
+    __table_args__ = (
+        db.Index('ix_report_user_created', 'user_id', 'created_at', 'id'),
+    )
+
+    @property
+    def markdown(self):
+        return zlib.decompress(self.body_compressed).decode('utf-8')
+
+    @markdown.setter
+    def markdown(self, text):
+        raw = text.encode('utf-8')
+        self.body_size = len(raw)
+        self.body_compressed = zlib.compress(raw, 6)
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "created_at": self.created_at.isoformat() + "Z",
+            "round_type": self.round_type,
+            "score": self.score,
+            "wpm": self.wpm,
+            "filler_count": self.filler_count,
+        }
+
+    def __repr__(self):
+        return f'<Report {self.id} user={self.user_id}>'
+
+
+class ProgressAggregate(db.Model):
+    """
+    Materialized per-user rolling aggregate, one row per (user, metric, dimension),
+    e.g. ('aptitude_accuracy', 'Logical') or ('wpm', 'hr'). Each event updates
+    its row in place, so the dashboard never re-reads reports.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    metric = db.Column(db.String(32), nullable=False)
+    dimension = db.Column(db.String(64), nullable=False, default='')
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    ewma = db.Column(db.Float, nullable=False, default=0.0)      # recent trend
+    last_value = db.Column(db.Float, nullable=False, default=0.0)
+    min_value = db.Column(db.Float, nullable=False, default=0.0)
+    max_value = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+
+    # Leading user_id makes this the index for "all of one user's aggregates"
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'metric', 'dimension', name='uq_progress_user_metric_dimension'),
+    )
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "average": round(self.total / self.count, 4) if self.count else None,
+            "trend": round(self.ewma, 4),
+            "last": self.last_value,
+            "min": self.min_value,
+            "max": self.max_value,
+            "updated_at": self.updated_at.isoformat() + "Z",
+        }
@@ -0,0 +1,179 @@
+import logging
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, CancelledError, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- OFF-THREAD PASSWORD HASHING ---
+# bcrypt is deliberately slow (~250 ms at cost 12). Running it inline lets a
+# login storm starve every other route on the worker, so hashes run in a small
+# per-worker process pool. When the pool and its queue are full we refuse
+# immediately (the route answers 429) instead of queueing unbounded work. A
+# pool whose child died is replaced and the hash retried once.
+BCRYPT_POOL_SIZE = int(os.getenv("BCRYPT_POOL_SIZE", "2"))
+BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", "8"))
+BCRYPT_TIMEOUT_SECONDS = float(os.getenv("BCRYPT_TIMEOUT_SECONDS", "10"))
+# Cost factor: fixed via BCRYPT_LOG_ROUNDS, or calibrated (by the readiness
+# warm-up, else at first use) so one hash takes about BCRYPT_TARGET_MS on this
+# hardware. Defaults to 12 (Flask-Bcrypt's default).
+BCRYPT_LOG_ROUNDS = os.getenv("BCRYPT_LOG_ROUNDS")
+BCRYPT_TARGET_MS = os.getenv("BCRYPT_TARGET_MS")
+MIN_ROUNDS, MAX_ROUNDS, DEFAULT_ROUNDS = 10, 15, 12
+
+RETRY_AFTER_SECONDS = 2
+
+
+class PoolSaturated(Exception):
+    """Raised when the hashing pool has no free slot (or a hash timed out in it); callers should answer 429."""
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(BCRYPT_POOL_SIZE + BCRYPT_MAX_QUEUE)
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+_rounds = None
+_rounds_lock = threading.Lock()
+
+
+# --- functions executed in the pool processes ---
+def _hash_in_pool(password, rounds):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _check_in_pool(password, hashed):
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+def _calibrate_in_pool(target_ms):
+    """Smallest cost whose hash time reaches target_ms (clamped to MIN..MAX)."""
+    for rounds in range(MIN_ROUNDS, MAX_ROUNDS + 1):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration-password", bcrypt.gensalt(rounds))
+        if (time.perf_counter() - start) * 1000 >= target_ms:
+            return rounds
+    return MAX_ROUNDS
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # 'spawn' keeps pool processes free of the worker's sockets, DB
+            # connections and (under gevent) the patched event loop.
+            _executor = ProcessPoolExecutor(
+                max_workers=BCRYPT_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def _reset_executor(broken):
+    """Drop a broken pool (e.g. a child was OOM-killed); the next call starts a new one."""
+    global _executor
+    with _executor_lock:
+        # Another caller may already have replaced it; never shut down the new pool.
+        if _executor is broken:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _track_in_flight(delta):
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += delta
+        metrics.set_gauge("bcrypt_in_flight", _in_flight)
+
+
+def _run(fn, *args):
+    """Run fn(*args) in the pool. Raises PoolSaturated when it is full, too slow or keeps breaking."""
+    try:
+        return _run_once(fn, *args)
+    except BrokenProcessPool:
+        metrics.incr("bcrypt_pool_restarts")
+        logger.warning("bcrypt pool broke (a child process died); restarting it and retrying once")
+    try:
+        return _run_once(fn, *args)
+    except BrokenProcessPool:
+        logger.error("bcrypt pool broke again; answering busy")
+        raise PoolSaturated() from None
+
+
+def _run_once(fn, *args):
+    if not _slots.acquire(blocking=False):
+        metrics.incr("bcrypt_rejected")
+        raise PoolSaturated()
+    _track_in_flight(1)
+    start = time.perf_counter()
+
+    def release(_future=None):
+        # The slot is held until the child is done with the hash, even if we stopped waiting.
+        _track_in_flight(-1)
+        metrics.observe("bcrypt_seconds", time.perf_counter() - start, op=fn.__name__)
+        _slots.release()
+
+    executor = _get_executor()
+    try:
+        future = executor.submit(fn, *args)
+    except BrokenProcessPool:
+        release()
+        _reset_executor(executor)
+        raise
+    except BaseException:
+        release()
+        raise
+    future.add_done_callback(release)
+    try:
+        return future.result(timeout=BCRYPT_TIMEOUT_SECONDS)
+    except FutureTimeout:
+        metrics.incr("bcrypt_timeouts")
+        logger.warning("bcrypt %s took over %ss; answering busy", fn.__name__, BCRYPT_TIMEOUT_SECONDS)
+        raise PoolSaturated() from None
+    except CancelledError:
+        # Queued behind a crash: the broken pool was shut down before our turn.
+        raise BrokenProcessPool("cancelled by the shutdown of a broken pool") from None
+    except BrokenProcessPool:
+        _reset_executor(executor)
+        raise
+
+
+def current_rounds():
+    """The configured (or calibrated) bcrypt cost factor. Raises PoolSaturated if calibration can't run."""
+    global _rounds
+    if _rounds is None:
+        with _rounds_lock:
+            if _rounds is None:
+                if BCRYPT_LOG_ROUNDS:
+                    _rounds = int(BCRYPT_LOG_ROUNDS)
+                elif BCRYPT_TARGET_MS:
+                    _rounds = _run(_calibrate_in_pool, float(BCRYPT_TARGET_MS))
+                    logger.info("bcrypt cost calibrated to %d for ~%s ms per hash", _rounds, BCRYPT_TARGET_MS)
+                else:
+                    _rounds = DEFAULT_ROUNDS
+    return _rounds
+
+
+def hash_rounds(hashed):
+    """Cost factor stored in a '$2b$12$...' hash."""
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def hash_password(password):
+    return _run(_hash_in_pool, password, current_rounds())
+
+
+def check_password(password, hashed):
+    return _run(_check_in_pool, password, hashed)
+
+
+def needs_rehash(hashed):
+    return hash_rounds(hashed) < current_rounds()
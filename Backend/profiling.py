@@ -0,0 +1,237 @@
+import os
+import sys
+import hmac
+import time
+import hashlib
+import threading
+import contextvars
+from collections import Counter, OrderedDict, deque
+
+# --- PER-REQUEST TIMINGS AND ON-DEMAND PROFILING ---
+# Every request collects a per-stage timing breakdown: body parse, upload
+# save, PDF, ffmpeg decode, ASR, LLM providers, Judge0 and response
+# serialization. Stages are timed by deadlines.stage(), which reports into
+# record(). The breakdown goes out in a Server-Timing header and into a
+# per-worker ring of recent requests.
+# A request can also be run under a sampling profiler. The client sends a
+# signed X-Profile-Token header, or an admin arms the next N requests to a
+# path via /api/admin/profiling. The sampler is a real OS thread that
+# reads the request's stack every PROFILE_INTERVAL_MS, including the frame a
+# gevent greenlet is parked in while it waits on the network. Profiles are
+# kept with the timings under the request ID.
+# Without PROFILING_SECRET only the timings are available.
+PROFILING_SECRET = os.getenv("PROFILING_SECRET")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "120"))
+PROFILE_TOP_FRAMES = 40
+TIMINGS_KEPT = int(os.getenv("TIMINGS_KEPT", "500"))
+PROFILES_KEPT = int(os.getenv("PROFILES_KEPT", "20"))
+
+_current = contextvars.ContextVar("request_timing", default=None)
+_recent = deque(maxlen=TIMINGS_KEPT)
+_profiles = OrderedDict()   # request id -> profile
+_armed = {}                 # path -> remaining profiled requests
+_lock = threading.Lock()
+
+
+# --- access control ---
+def make_token(ttl_seconds=600):
+    """A header value that enables profiling until it expires (needs PROFILING_SECRET)."""
+    expires = int(time.time() + ttl_seconds)
+    signature = hmac.new(PROFILING_SECRET.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+def token_valid(token):
+    if not PROFILING_SECRET or not token or "." not in token:
+        return False
+    expires, _, signature = token.partition(".")
+    expected = hmac.new(PROFILING_SECRET.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected) and expires.isdigit() and int(expires) > time.time()
+
+
+def arm(path, count):
+    """Admin toggle: profile the next `count` requests to `path` on this worker (0 disarms)."""
+    with _lock:
+        if count > 0:
+            _armed[path] = count
+        else:
+            _armed.pop(path, None)
+        return dict(_armed)
+
+
+def _take_armed(path):
+    with _lock:
+        left = _armed.get(path, 0)
+        if not left:
+            return False
+        if left == 1:
+            del _armed[path]
+        else:
+            _armed[path] = left - 1
+        return True
+
+
+# --- sampling profiler ---
+def _original(module, name):
+    """`module.name` as it was before gevent patched it (the sampler is a real OS thread, not a greenlet)."""
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched(module):
+            return monkey.get_original(module, name)
+    except ImportError:
+        pass
+    return getattr(__import__(module), name)
+
+
+def _os_thread_starter():
+    # Under gevent, threading is patched into greenlets, which can't sample
+    # a busy request. Use the original OS thread primitive instead.
+    return _original("_thread", "start_new_thread")
+
+
+def _os_lock():
+    # A real OS lock: a patched lock would not work across the sampler thread.
+    return _original("_thread", "allocate_lock")()
+
+
+class Sampler:
+    def __init__(self):
+        self.thread_id = threading.get_ident()
+        try:
+            import gevent
+            self.greenlet = gevent.getcurrent()
+        except ImportError:
+            self.greenlet = None
+        self.stacks = Counter()
+        self.samples = 0
+        self.stopped = False
+        self.lock = _os_lock()   # guards stacks/samples/stopped between the sampler thread and stop()
+        # Patched sleep() in a plain OS thread would build (and leak) a gevent
+        # hub there, and can deadlock on gevent's import lock doing so.
+        self.sleep = _original("time", "sleep")
+        self.monotonic = _original("time", "monotonic")
+
+    def _frame(self):
+        # A parked greenlet keeps its frame in gr_frame; a running one is the thread's current frame.
+        frame = getattr(self.greenlet, "gr_frame", None)
+        return frame if frame is not None else sys._current_frames().get(self.thread_id)
+
+    def _run(self):
+        deadline = self.monotonic() + PROFILE_MAX_SECONDS
+        interval = PROFILE_INTERVAL_MS / 1000
+        while not self.stopped and self.monotonic() < deadline:
+            frame = self._frame()
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                with self.lock:
+                    if self.stopped:
+                        break
+                    self.stacks[";".join(reversed(stack))] += 1
+                    self.samples += 1
+            self.sleep(interval)
+
+    def start(self):
+        _os_thread_starter()(self._run, ())
+        return self
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+            stacks, samples = Counter(self.stacks), self.samples
+        own, total = Counter(), Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        return {
+            "interval_ms": PROFILE_INTERVAL_MS,
+            "samples": samples,
+            "top_self": own.most_common(PROFILE_TOP_FRAMES),
+            "top_total": total.most_common(PROFILE_TOP_FRAMES),
+            # Collapsed stacks ("a;b;c count"), ready for flamegraph tools.
+            "collapsed": [f"{stack} {count}" for stack, count in stacks.most_common()],
+        }
+
+
+# --- request lifecycle ---
+class RequestTiming:
+    def __init__(self, profile):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.sampler = Sampler().start() if profile else None
+
+    def record(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+
+def begin(path, token=None):
+    """Start timing the current request; profile it if the token is valid or the path is armed."""
+    profile = bool(PROFILING_SECRET) and (token_valid(token) or _take_armed(path))
+    return _current.set(RequestTiming(profile))
+
+
+def record(stage, seconds):
+    timing = _current.get()
+    if timing is not None:
+        timing.record(stage, seconds)
+
+
+def finish(request_id, method, path, status):
+    """Stop timing; store the entry and return the Server-Timing header value."""
+    timing = _current.get()
+    if timing is None:
+        return None
+    total_ms = (time.perf_counter() - timing.started) * 1000
+    stages_ms = {name: round(seconds * 1000, 1) for name, seconds in timing.stages.items()}
+    entry = {
+        "request_id": request_id,
+        "method": method,
+        "path": path,
+        "status": status,
+        "at": time.time(),
+        "total_ms": round(total_ms, 1),
+        "stages_ms": stages_ms,
+        "profiled": timing.sampler is not None,
+    }
+    with _lock:
+        _recent.append(entry)
+        if timing.sampler is not None:
+            _profiles[request_id] = dict(entry, profile=timing.sampler.stop())
+            while len(_profiles) > PROFILES_KEPT:
+                _profiles.popitem(last=False)
+    parts = [f"{name};dur={ms}" for name, ms in stages_ms.items()]
+    parts.append(f"total;dur={round(total_ms, 1)}")
+    return ", ".join(parts)
+
+
+def end(token):
+    _current.reset(token)
+
+
+def recent(limit=50, min_ms=0.0, path=None):
+    with _lock:
+        entries = [e for e in _recent if e["total_ms"] >= min_ms and (path is None or e["path"] == path)]
+    return entries[-limit:][::-1]
+
+
+def get_profile(request_id):
+    with _lock:
+        return _profiles.get(request_id)
+
+
+def stats():
+    with _lock:
+        return {"timings_kept": len(_recent), "profiles_kept": len(_profiles), "armed": dict(_armed)}
+
+
+if __name__ == "__main__":
+    # python profiling.py [ttl_seconds] -> X-Profile-Token value
+    if not PROFILING_SECRET:
+        sys.exit("PROFILING_SECRET is not set")
+    print(make_token(int(sys.argv[1]) if len(sys.argv) > 1 else 600))
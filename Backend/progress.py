@@ -0,0 +1,137 @@
+import logging
+import re
+from sqlalchemy import case
+from sqlalchemy.exc import IntegrityError
+from flask_login import current_user
+from extensions import db
+from models import ProgressAggregate, utcnow
+
+logger = logging.getLogger(__name__)
+
+# --- PER-USER PROGRESS AGGREGATES ---
+# Every completed round turns into a few (metric, dimension, value) events.
+# Each event is one UPDATE of a single materialized row (INSERT the first
+# time), so recording is O(1) and the dashboard is one indexed SELECT.
+EWMA_ALPHA = 0.3
+
+FILLER_PATTERN = r'\b(um|uh|like|so|you know|basically|actually)\b'
+SCORE_PATTERN = re.compile(r'SCORE:\s*\[?\s*(\d{1,3})\s*\]?\s*%', re.IGNORECASE)
+
+
+def current_user_id():
+    """Progress is only tracked for logged-in users."""
+    return current_user.id if current_user.is_authenticated else None
+
+
+def record(user_id, metric, value, dimension=''):
+    """Fold one observation into the user's (metric, dimension) aggregate."""
+    if user_id is None or value is None:
+        return
+    value = float(value)
+    dimension = (dimension or '')[:64]
+    A = ProgressAggregate
+    row = A.__table__.c
+    match = (A.user_id == user_id) & (A.metric == metric) & (A.dimension == dimension)
+    changes = {
+        row.count: row.count + 1,
+        row.total: row.total + value,
+        row.ewma: row.ewma + EWMA_ALPHA * (value - row.ewma),
+        row.last_value: value,
+        row.min_value: case((row.min_value > value, value), else_=row.min_value),
+        row.max_value: case((row.max_value < value, value), else_=row.max_value),
+        row.updated_at: utcnow(),
+    }
+    for _ in range(2):
+        if A.query.filter(match).update(changes, synchronize_session=False):
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.add(A(user_id=user_id, metric=metric, dimension=dimension, count=1,
+                                 total=value, ewma=value, last_value=value,
+                                 min_value=value, max_value=value))
+            return
+        except IntegrityError:
+            continue   # another request inserted the row first; update it instead
+
+
+def _safely(fn, *args):
+    """Progress tracking must never break the route that feeds it."""
+    user_id = current_user_id()
+    if user_id is None:
+        return
+    try:
+        fn(user_id, *args)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning("Progress tracking failed in %s: %s", fn.__name__, e)
+
+
+def speech_stats(transcript, duration_seconds):
+    """(wpm or None, fillers per 100 words or None) for one spoken answer."""
+    words = len(transcript.split())
+    if not words:
+        return None, None
+    fillers = len(re.findall(FILLER_PATTERN, transcript.lower()))
+    wpm = int(words / (duration_seconds / 60.0)) if duration_seconds and duration_seconds > 0 else None
+    return wpm, round(fillers * 100.0 / words, 2)
+
+
+def _record_answer(user_id, round_name, transcript, duration_seconds):
+    wpm, filler_rate = speech_stats(transcript or "", duration_seconds)
+    record(user_id, 'wpm', wpm, round_name)
+    record(user_id, 'filler_rate', filler_rate, round_name)
+
+
+def _record_debrief(user_id, round_name, report_text):
+    match = SCORE_PATTERN.search(report_text or "")
+    if match:
+        record(user_id, 'debrief_score', min(int(match.group(1)), 100), round_name)
+
+
+def _record_aptitude(user_id, results, default_topic):
+    for item in results:
+        if isinstance(item, dict) and 'is_correct' in item:
+            record(user_id, 'aptitude_accuracy', 1 if item['is_correct'] else 0,
+                   item.get('topic') or default_topic)
+
+
+def _record_coding(user_id, passed, language):
+    record(user_id, 'coding_pass_rate', 1 if passed else 0, language or 'unknown')
+
+
+def _record_mock_test(user_id, all_round_results):
+    _record_aptitude(user_id, all_round_results.get('aptitude') or [], 'Mock Test')
+    for item in all_round_results.get('coding') or []:
+        if isinstance(item, dict) and item.get('status'):
+            record(user_id, 'coding_pass_rate', 1 if item['status'] == 'Passed' else 0, 'mock_test')
+
+
+# --- Route-facing helpers (no-ops for anonymous users) ---
+def record_answer(round_name, transcript, duration_seconds):
+    _safely(_record_answer, round_name, transcript, duration_seconds)
+
+
+def record_debrief(round_name, report_text):
+    _safely(_record_debrief, round_name, report_text)
+
+
+def record_aptitude(results, default_topic='Mixed'):
+    _safely(_record_aptitude, results, default_topic)
+
+
+def record_coding(passed, language):
+    _safely(_record_coding, passed, language)
+
+
+def record_mock_test(all_round_results):
+    _safely(_record_mock_test, all_round_results)
+
+
+def dashboard(user_id):
+    """Every aggregate for the user in one query on the (user_id, ...) unique index."""
+    rows = ProgressAggregate.query.filter_by(user_id=user_id).all()
+    result = {}
+    for row in rows:
+        result.setdefault(row.metric, {})[row.dimension or 'all'] = row.to_dict()
+    return result
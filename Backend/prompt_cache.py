@@ -0,0 +1,201 @@
+import logging
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import deadlines
+
+logger = logging.getLogger(__name__)
+
+# --- PROMPT PREFIX CACHE CONFIGURATION ---
+# Large, stable prompt prefixes are registered once with Gemini's explicit
+# context-cache API. Later turns reference the cache by name instead of
+# resending the text. In practice that is the candidate's resume: the round
+# personas and debrief rubrics are far below the minimum and go inline.
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE_ENABLED", "1") == "1"
+PROMPT_CACHE_TTL_SECONDS = int(os.getenv("PROMPT_CACHE_TTL_SECONDS", "900"))
+# Gemini rejects explicit caches below a model-specific token minimum, so we
+# don't waste a round trip on prefixes that are obviously too small.
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024"))
+PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", "256"))
+# Cap on a cache create/refresh call; the request's remaining deadline may cut it shorter.
+PROMPT_CACHE_TIMEOUT_SECONDS = float(os.getenv("PROMPT_CACHE_TIMEOUT_SECONDS", "10"))
+
+# Extend a cache's TTL when it is used with less than this much time left.
+REFRESH_MARGIN_SECONDS = 120
+# After a model refuses caching, go inline for this long before trying again.
+FAILURE_BACKOFF_SECONDS = 300
+
+_entries = OrderedDict()   # key -> {"name": str, "expires_at": float}
+_model_backoff = {}        # model -> timestamp when caching may be retried
+_creating = set()          # keys whose cache one request is creating right now
+_lock = threading.Lock()
+
+stats = {"hits": 0, "misses": 0, "created": 0, "refreshed": 0, "inline": 0, "errors": 0}
+
+
+def estimate_tokens(text):
+    """Cheap local token estimate (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def cacheable(prefix_text):
+    """Whether `prefix_text` is large enough (and caching enabled) to be worth a cache."""
+    return PROMPT_CACHE_ENABLED and estimate_tokens(prefix_text) >= PROMPT_CACHE_MIN_TOKENS
+
+
+def _cache_key(model, prefix_text):
+    digest = hashlib.sha256(prefix_text.encode("utf-8")).hexdigest()
+    return f"{model}:{digest}"
+
+
+def _evict_overflow():
+    """Drop the least recently used entries over the limit; returns their cache names. Caller holds _lock."""
+    evicted = []
+    while len(_entries) > PROMPT_CACHE_MAX_ENTRIES:
+        _, old = _entries.popitem(last=False)
+        evicted.append(old["name"])
+    return evicted
+
+
+def _delete(client, names):
+    for name in names:
+        try:
+            client.caches.delete(name=name)
+        except Exception as e:
+            logger.warning("Prompt cache: failed to delete cache %s: %s", name, e)
+
+
+def _refresh(client, key, entry):
+    with _lock:
+        if entry.get("refreshing"):
+            return entry["name"]   # another request is extending it; it is still valid for now
+        entry["refreshing"] = True
+    try:
+        http_options = deadlines.http_options("prompt_cache", PROMPT_CACHE_TIMEOUT_SECONDS)
+        client.caches.update(
+            name=entry["name"],
+            config={"ttl": f"{PROMPT_CACHE_TTL_SECONDS}s", "http_options": http_options}
+        )
+    except Exception as e:
+        logger.warning("Prompt cache: TTL refresh failed for %s: %s", entry["name"], e)
+        with _lock:
+            entry["refreshing"] = False
+            if _entries.get(key) is entry:
+                _entries.pop(key)
+        return None
+    with _lock:
+        entry["refreshing"] = False
+        entry["expires_at"] = time.time() + PROMPT_CACHE_TTL_SECONDS
+        stats["refreshed"] += 1
+    return entry["name"]
+
+
+def get_cached_prefix(client, model, prefix_text):
+    """
+    Return the name of a Gemini cached-content resource holding `prefix_text`
+    as its system instruction, creating it on first use.
+    Returns None whenever the prefix should be sent inline instead.
+    """
+    if not cacheable(prefix_text):
+        return None
+
+    now = time.time()
+    key = _cache_key(model, prefix_text)
+    with _lock:
+        if _model_backoff.get(model, 0) > now:
+            return None
+        entry = _entries.get(key)
+        if entry and entry["expires_at"] <= now:
+            _entries.pop(key, None)
+            entry = None
+        if entry:
+            _entries.move_to_end(key)
+            stats["hits"] += 1
+        elif key in _creating:
+            # Another request is creating this cache; go inline rather than create a duplicate.
+            return None
+        else:
+            stats["misses"] += 1
+            _creating.add(key)
+
+    if entry:
+        if entry["expires_at"] - now < REFRESH_MARGIN_SECONDS:
+            return _refresh(client, key, entry)
+        return entry["name"]
+
+    try:
+        http_options = deadlines.http_options("prompt_cache", PROMPT_CACHE_TIMEOUT_SECONDS)
+        cache = client.caches.create(
+            model=model,
+            config={
+                "system_instruction": prefix_text,
+                "ttl": f"{PROMPT_CACHE_TTL_SECONDS}s",
+                "http_options": http_options
+            }
+        )
+    except deadlines.DeadlineExceeded:
+        with _lock:
+            _creating.discard(key)
+        raise
+    except Exception as e:
+        logger.warning("Prompt cache: could not create cache for %s, using inline prompt: %s", model, e)
+        with _lock:
+            _creating.discard(key)
+            stats["errors"] += 1
+            # Only a refusal is worth remembering; a timeout or 5xx may not happen next time.
+            if _refused(e):
+                _model_backoff[model] = now + FAILURE_BACKOFF_SECONDS
+        return None
+
+    with _lock:
+        _creating.discard(key)
+        _entries[key] = {"name": cache.name, "expires_at": now + PROMPT_CACHE_TTL_SECONDS}
+        stats["created"] += 1
+        evicted = _evict_overflow()
+    _delete(client, evicted)
+    return cache.name
+
+
+def _status(error):
+    code = getattr(error, "code", None)   # google.genai.errors.APIError
+    return code if isinstance(code, int) else None
+
+
+def _refused(error):
+    """A 4xx other than 429: Gemini won't cache this (model unsupported, prefix too small, ...)."""
+    status = _status(error)
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+def is_cache_miss(error):
+    """Whether a call failed because its cached content is gone (expired, deleted or unknown)."""
+    status = _status(error)
+    return status in (400, 403, 404) and "cache" in str(error).lower()
+
+
+def invalidate(client, model, prefix_text):
+    """Forget a cached prefix (e.g. after Gemini reports it expired or missing) and delete it remotely."""
+    with _lock:
+        entry = _entries.pop(_cache_key(model, prefix_text), None)
+    if entry:
+        _delete(client, [entry["name"]])
+
+
+def build_config(client, model, prefix_text, **config_kwargs):
+    """
+    Build a GenerateContentConfig dict whose stable prefix is either a reference to
+    cached content or, as a fallback, the same text as an inline system instruction.
+    """
+    cache_name = get_cached_prefix(client, model, prefix_text)
+    if cache_name:
+        return dict(config_kwargs, cached_content=cache_name)
+    return inline_config(prefix_text, **config_kwargs)
+
+
+def inline_config(prefix_text, **config_kwargs):
+    """The fallback: send the prefix inline as a system instruction."""
+    with _lock:
+        stats["inline"] += 1
+    return dict(config_kwargs, system_instruction=prefix_text)
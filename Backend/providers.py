@@ -0,0 +1,90 @@
+import logging
+import os
+import time
+import threading
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- LAZY PROVIDER REGISTRY ---
+# SDK clients (google-genai, huggingface_hub, ...) are slow to import and to
+# construct, and most requests a freshly woken instance serves (ping, static
+# files, login) need none of them. Each provider is registered with a factory
+# that does its own imports; the client is built on first get() and then
+# shared by the whole worker.
+
+_factories = {}
+_instances = {}
+_init_seconds = {}
+_lock = threading.Lock()
+
+
+def register(name, factory):
+    """Register `factory()` as the builder for provider `name`."""
+    _factories[name] = factory
+
+
+def get(name):
+    """Return the provider's client, building it on first use."""
+    try:
+        return _instances[name]
+    except KeyError:
+        pass
+    with _lock:
+        if name not in _instances:
+            start = time.perf_counter()
+            _instances[name] = _factories[name]()
+            elapsed = time.perf_counter() - start
+            _init_seconds[name] = elapsed
+            metrics.observe("provider_init_seconds", elapsed, provider=name)
+            logger.info("Provider '%s' initialized in %.0f ms", name, elapsed * 1000)
+        return _instances[name]
+
+
+def is_loaded(name):
+    return name in _instances
+
+
+def stats():
+    return {
+        name: {"loaded": name in _instances, "init_ms": round(_init_seconds[name] * 1000, 1) if name in _init_seconds else None}
+        for name in _factories
+    }
+
+
+# --- built-in providers ---
+def _gemini():
+    from google import genai
+    # GEMINI_BASE_URL points the SDK at another endpoint, e.g. the local stand-in in fake_providers.py.
+    base_url = os.getenv("GEMINI_BASE_URL")
+    return genai.Client(api_key=os.getenv("GEMINI_API_KEY"), http_options={"base_url": base_url} if base_url else None)
+
+
+def _huggingface():
+    token = os.getenv("HF_API_KEY")
+    if not token:
+        logger.warning("HF_API_KEY not set. Hugging Face inference is unavailable.")
+        return None
+    from huggingface_hub import InferenceClient
+    # Same per-attempt budget the LLM failover chain uses (llm.py).
+    return InferenceClient(token=token, timeout=float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "40")))
+
+
+def _local_asr():
+    # Optional fallback for AssemblyAI (see ai_logic.transcribe_audio_to_text);
+    # needs the faster-whisper package, which isn't in requirements.txt.
+    model = os.getenv("LOCAL_ASR_MODEL")
+    if not model:
+        return None
+    try:
+        from faster_whisper import WhisperModel
+    except ImportError:
+        logger.warning("LOCAL_ASR_MODEL is set but faster-whisper is not installed.")
+        return None
+    return WhisperModel(model, device="cpu", compute_type="int8")
+
+
+register("gemini", _gemini)
+register("huggingface", _huggingface)
+# "http" (the shared AssemblyAI / Judge0 client) is registered by http_client.py.
+register("local_asr", _local_asr)
@@ -0,0 +1,68 @@
+import os
+import random
+import threading
+from collections import deque
+from functools import wraps
+import metrics
+
+# --- POOLED QUESTIONS ---
+# Every question the model generates is also kept in a small per-worker pool
+# keyed by kind and arguments (topic, language). When generation fails (the
+# Gemini breaker is open, every provider is down) the generator serves a
+# pooled question instead, so practice rounds keep working through an outage.
+QUESTION_POOL_SIZE = int(os.getenv("QUESTION_POOL_SIZE", "50"))
+
+_pools = {}   # (kind, *args) -> deque of questions
+_lock = threading.Lock()
+
+
+def remember(key, question):
+    with _lock:
+        _pools.setdefault(key, deque(maxlen=QUESTION_POOL_SIZE)).append(question)
+
+
+def size(key):
+    with _lock:
+        return len(_pools.get(key, ()))
+
+
+def draw(key):
+    """A random pooled question for `key`, or None."""
+    with _lock:
+        pool = _pools.get(key)
+        return random.choice(pool) if pool else None
+
+
+def pooled(kind):
+    """
+    Decorator for question generators that return a dict with "error" on
+    failure. Good results are pooled; failures (including an exception such
+    as CircuitOpen) are answered from the pool when it has a question.
+    """
+    def decorator(generate):
+        @wraps(generate)
+        def wrapper(*args):
+            key = (kind, *args)
+            try:
+                data = generate(*args)
+            except Exception:
+                fallback = draw(key)
+                if fallback is None:
+                    raise
+                metrics.incr("question_pool_served", kind=kind)
+                return fallback
+            if "error" not in data:
+                remember(key, data)
+                return data
+            fallback = draw(key)
+            if fallback is None:
+                return data
+            metrics.incr("question_pool_served", kind=kind)
+            return fallback
+        return wrapper
+    return decorator
+
+
+def stats():
+    with _lock:
+        return {"keys": len(_pools), "questions": sum(len(pool) for pool in _pools.values())}
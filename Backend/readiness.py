@@ -0,0 +1,189 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
+from extensions import db
+import metrics
+import http_client
+
+# --- READINESS PROBE AND WARM-UP ---
+# /api/ping only says the process is up. /api/ready warms the worker the first
+# time it is called (DB pool connections, TLS to each provider, the outage
+# fallbacks: question pools, the local ASR model and the fallback LLM client,
+# bcrypt calibration, compressed assets) and reports per-dependency readiness
+# and latency, so a load balancer pointed at it only routes to warm instances.
+# Only required dependencies gate readiness: a Gemini, Judge0 or AssemblyAI
+# outage affects every instance alike, so it is reported (degraded) but
+# doesn't pull them all out of rotation.
+READINESS_CHECK_TIMEOUT = float(os.getenv("READINESS_CHECK_TIMEOUT", "5"))
+READINESS_RECHECK_SECONDS = int(os.getenv("READINESS_RECHECK_SECONDS", "60"))
+# While not ready, probes re-run the checks this often instead.
+READINESS_RETRY_SECONDS = int(os.getenv("READINESS_RETRY_SECONDS", "5"))
+# Pool connections opened up front (Flask-SQLAlchemy's default pool size is 5).
+READINESS_DB_CONNECTIONS = int(os.getenv("READINESS_DB_CONNECTIONS", "5"))
+
+_checks = {}   # name -> (fn, required)
+_state = {"ready": False, "degraded": False, "checked_at": 0.0, "checks": {}}
+_run_lock = threading.Lock()
+
+
+def register_check(name, fn, required=False):
+    """`fn()` warms/probes one dependency; it raises on failure and may return a detail string."""
+    _checks[name] = (fn, required)
+
+
+class Skipped(Exception):
+    """The dependency isn't configured on this instance."""
+
+
+def _run_check(app, name, fn, required):
+    start = time.perf_counter()
+    result = {"required": required}
+    try:
+        with app.app_context():
+            detail = fn()
+        result["status"] = "ok"
+        if detail:
+            result["detail"] = detail
+    except Skipped as e:
+        result["status"] = "skipped"
+        result["detail"] = str(e)
+    except Exception as e:
+        result["status"] = "error"
+        result["detail"] = f"{type(e).__name__}: {e}"
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    metrics.observe("readiness_check_seconds", result["latency_ms"] / 1000, check=name)
+    return name, result
+
+
+def run_checks(app):
+    """Run every check concurrently and update the cached readiness state."""
+    with ThreadPoolExecutor(max_workers=max(1, len(_checks))) as pool:
+        futures = [pool.submit(_run_check, app, name, fn, required) for name, (fn, required) in _checks.items()]
+        checks = dict(f.result() for f in futures)
+    ready = all(c["status"] == "ok" for c in checks.values() if c["required"])
+    # Ready but with an optional dependency failing: serve, and let dashboards show it.
+    degraded = any(c["status"] == "error" for c in checks.values() if not c["required"])
+    _state.update(ready=ready, degraded=degraded, checked_at=time.time(), checks=checks)
+    metrics.set_gauge("ready", int(ready))
+    return dict(_state)
+
+
+def _is_stale():
+    interval = READINESS_RECHECK_SECONDS if _state["ready"] else READINESS_RETRY_SECONDS
+    return time.time() - _state["checked_at"] > interval
+
+
+def status(app):
+    """Cached readiness; the first caller after it goes stale re-runs the checks."""
+    if _is_stale() and _run_lock.acquire(blocking=not _state["checked_at"]):
+        try:
+            # Re-test under the lock: a concurrent first probe may have just finished.
+            if _is_stale():
+                return run_checks(app)
+        finally:
+            _run_lock.release()
+    return dict(_state)
+
+
+# --- built-in checks ---
+def _check_database():
+    # Check out several connections at once so the pool is already full
+    # (and any TLS to a managed Postgres done) when real traffic arrives.
+    connections = []
+    try:
+        for _ in range(READINESS_DB_CONNECTIONS):
+            connection = db.engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+    return f"{len(connections)} connections"
+
+
+def _check_gemini():
+    import ai_logic
+    if not ai_logic.GEMINI_API_KEY:
+        raise RuntimeError("GEMINI_API_KEY not set")
+    # Model metadata is free; it validates the key and opens the SDK's connection.
+    ai_logic.gemini_client().models.get(
+        model="gemini-2.5-flash",
+        config={"http_options": {"timeout": int(READINESS_CHECK_TIMEOUT * 1000)}}
+    )
+
+
+def _check_assemblyai():
+    import ai_logic
+    key = os.getenv("ASSEMBLYAI_API_KEY")
+    if not key:
+        raise Skipped("ASSEMBLYAI_API_KEY not set")
+    response = http_client.get(
+        f"{ai_logic.ASSEMBLYAI_BASE_URL}/v2/transcript", "assemblyai",
+        params={"limit": 1}, headers={"authorization": key}, timeout=READINESS_CHECK_TIMEOUT
+    )
+    response.raise_for_status()
+
+
+def _check_judge0():
+    import ai_logic
+    if not ai_logic.JUDGE0_API_KEY:
+        raise Skipped("JUDGE0_API_KEY not set")
+    response = http_client.get(
+        f"{ai_logic.JUDGE0_BASE_URL}/about", "judge0",
+        headers={"X-RapidAPI-Key": ai_logic.JUDGE0_API_KEY, "X-RapidAPI-Host": "judge0-ce.p.rapidapi.com"},
+        timeout=READINESS_CHECK_TIMEOUT
+    )
+    response.raise_for_status()
+
+
+def _check_question_pool():
+    import ai_logic
+    if not ai_logic.GEMINI_API_KEY:
+        raise Skipped("GEMINI_API_KEY not set")
+    filled, total = ai_logic.warm_question_pools()
+    if filled < total:
+        raise RuntimeError(f"only {filled}/{total} question pools primed")
+    return f"{filled}/{total} question pools primed"
+
+
+def _check_local_asr():
+    import providers
+    # Loads the faster-whisper model now, not on the first request of an AssemblyAI outage.
+    if providers.get("local_asr") is None:
+        raise Skipped("LOCAL_ASR_MODEL not set or faster-whisper not installed")
+    return os.getenv("LOCAL_ASR_MODEL")
+
+
+def _check_llm_fallback():
+    import providers
+    if providers.get("huggingface") is None:
+        raise Skipped("HF_API_KEY not set")
+
+
+def _check_bcrypt():
+    import password_hashing
+    # With BCRYPT_TARGET_MS set, calibrate the cost factor now rather than during the first login.
+    return f"cost {password_hashing.current_rounds()}"
+
+
+def _check_static_assets():
+    from flask import current_app
+    manifest = current_app.extensions.get('static_assets')
+    if manifest is None:
+        raise Skipped("no frontend folder")
+    for asset in manifest.assets.values():
+        asset.ensure_brotli()
+    return f"{len(manifest.assets)} assets"
+
+
+register_check("database", _check_database, required=True)
+register_check("gemini", _check_gemini)
+register_check("assemblyai", _check_assemblyai)
+register_check("judge0", _check_judge0)
+register_check("question_pool", _check_question_pool)
+register_check("local_asr", _check_local_asr)
+register_check("llm_fallback", _check_llm_fallback)
+register_check("bcrypt", _check_bcrypt)
+register_check("static_assets", _check_static_assets)
@@ -0,0 +1,333 @@
+"""
+Replay captured traffic traces (trace_capture.py) against a test deployment.
+
+Traces are the JSON lines a worker writes with TRACE_CAPTURE_DIR set. Each
+line holds a request's shape: route, session hash, arrival time, upload
+sizes, topic/language and turn counts. Nothing the user said or wrote is in
+them. The replayer rebuilds a request of the same shape, with a silent WAV
+of the recorded size, a placeholder PDF, conversation histories with the
+recorded number of turns and so on. It then sends each session's requests in
+order on its own cookie session, at the recorded offsets divided by --speed.
+Bursts, long uploads, the topic mix and the route sequences of the
+conversation and mock-test flows therefore look like production, only
+compressed in time.
+
+Without --target it starts the provider stand-ins (fake_providers.py) and a
+local gunicorn pointed at them, as bench_routes.py does. With --target it
+only sends traffic, so point that deployment at stand-ins yourself. Routes
+that need a logged-in account (reports, progress, save_report) and the
+auth/admin routes are skipped: the replay runs as guests.
+
+Usage (from Backend/):
+    python replay_traces.py traces/*.jsonl --summary
+    python replay_traces.py traces/*.jsonl [--speed 10] [--target http://staging:8000] [--by-route]
+                            [--workers 2] [--gemini-latency 0.8:2.5] ...
+
+Requests a session sent while an earlier one was still running go out in
+parallel; the others wait for their predecessor, as the user did. Reports
+per-route p50/p95/p99 and status counts like bench_routes.py, plus the
+scheduling lag: how late requests went out compared to the compressed
+timeline. Lag builds up when a session's requests take longer than their
+compressed gaps, because the server is slower than it was in production or
+--speed squeezes think time below request time.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import bench_routes
+import fake_providers
+
+SKIPPED_ROUTES = {
+    "/api/signup", "/api/login", "/api/logout", "/api/save_report", "/api/reports",
+    "/api/reports/<int:report_id>", "/api/progress", "/api/metrics",
+}
+SKIPPED_PREFIXES = ("/api/admin/",)
+# The chatbot's traffic is dominated by a few questions; rotate through typical ones.
+CHAT_PROMPTS = [
+    "How does scoring work?", "What is the STAR method?", "How long should my answers be?",
+    "How do I prepare for the HR round?", "What does the mock test include?",
+    "How is my speaking pace measured?", "Can I retake the aptitude test?", "What languages can I code in?",
+]
+WAV_BYTES_PER_SECOND = 32000   # 16 kHz mono 16-bit, as bench_routes.make_audio writes
+
+
+def load(patterns):
+    entries = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path, encoding="utf-8") as f:
+                entries.extend(json.loads(line) for line in f if line.strip())
+    entries.sort(key=lambda e: e["t"])
+    return entries
+
+
+def _skipped(route):
+    return route in SKIPPED_ROUTES or route.startswith(SKIPPED_PREFIXES)
+
+
+# --- synthetic payloads ---
+def make_pdf(size):
+    """A one-page PDF with a line of text, padded with comments to about `size` bytes."""
+    stream = b"BT /F1 12 Tf 72 720 Td (Software engineer, 3 years of Python and SQL.) Tj ET"
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    padding = max(0, size - 700)
+    while padding > 0:
+        line = min(padding, 1000)
+        out += b"%" + b"x" * (line - 2) + b"\n"
+        padding -= line
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+class Payloads:
+    """Builds request bodies of the recorded shape; uploads are cached by size."""
+
+    def __init__(self):
+        self.audio = {}
+        self.pdfs = {}
+        self.lock = threading.Lock()
+
+    def audio_file(self, size):
+        seconds = max(1, round(size / WAV_BYTES_PER_SECOND))
+        with self.lock:
+            if seconds not in self.audio:
+                self.audio[seconds] = bench_routes.make_audio(seconds)
+        return ("answer.webm", self.audio[seconds], "audio/webm")
+
+    def pdf_file(self, size):
+        bucket = max(1, round(size / 10000)) * 10000
+        with self.lock:
+            if bucket not in self.pdfs:
+                self.pdfs[bucket] = make_pdf(bucket)
+        return ("resume.pdf", self.pdfs[bucket], "application/pdf")
+
+    @staticmethod
+    def history(turns):
+        messages = []
+        for i in range(turns or 0):
+            role = "model" if i % 2 == 0 else "user"
+            text = "Tell me about a project you led." if role == "model" else "I led a small team through a migration."
+            messages.append({"role": role, "parts": [{"text": text}]})
+        return json.dumps(messages)
+
+    def build(self, entry, state):
+        """(method, path, kwargs) for one trace entry, or None if it can't be rebuilt."""
+        route, fields, counts, files = entry["route"], entry.get("fields", {}), entry.get("counts", {}), entry.get("files", {})
+        method = entry["method"]
+        language = fields.get("language", "python")
+
+        if route == "/api/mock-test/<session_id>/<kind>/<int:index>":
+            if "mock_session" not in state:
+                return None
+            args = entry.get("view_args", {})
+            return method, f"/api/mock-test/{state['mock_session']}/{args.get('kind', 'aptitude')}/{args.get('index', 0)}", {}
+        if "<" in route:
+            return None
+
+        if route == "/api/gemini":
+            prompt = CHAT_PROMPTS[int(hashlib.md5(f"{entry['session']}{entry['t']}".encode()).hexdigest(), 16) % len(CHAT_PROMPTS)]
+            return method, route, {"json": {"prompt": prompt}, "stream": True}
+        if route == "/run-code":
+            cases = [{"stdin": "", "expected_output": "15"}] * max(1, counts.get("test_cases") or 1)
+            code = f"# run {uuid.uuid4().hex}\n" + "print(15)\n".ljust(max(10, counts.get("user_code_chars") or 0))
+            return method, route, {"json": {"user_code": code, "language": language, "test_cases": cases}}
+        if route == "/aptitude-feedback":
+            results = [{"topic": fields.get("topic", "Mixed"), "question": f"Q{i}", "user_answer": "A", "is_correct": i % 3 != 0,
+                        "time_taken_seconds": 40} for i in range(counts.get("results") or 10)]
+            return method, route, {"json": {"results": results}}
+        if route == "/generate-final-report":
+            return method, route, {"json": {"all_round_results": {
+                "aptitude": [{"topic": "Mock Test", "user_answer": "A", "is_correct": True}] * 20,
+                "communication": "Clear, structured answer with a few fillers.",
+                "coding": [{"question": "Problem 1", "status": "Passed"}, {"question": "Problem 2", "status": "Failed"}],
+            }}}
+        if route in ("/upload-resume", "/upload-practice-resume"):
+            return method, route, {"files": {"resume_file": self.pdf_file(files.get("resume_file", 30000))}}
+        if route in ("/interview", "/communication-feedback"):
+            return method, route, {"files": {"audio_file": self.audio_file(files.get("audio_file", 320000))},
+                                   "data": {"question": fields.get("topic", "Tell me about yourself."), "expressions": "[]"}}
+        if route.endswith("-conversation"):
+            data = {"conversation_history": self.history(counts.get("conversation_history")), "expressions": "[]"}
+            if route == "/resume-conversation":
+                data["resume_text"] = "Software engineer with Python and SQL experience. ".ljust(counts.get("resume_text_chars") or 500, "x")
+            upload = {"audio_file": self.audio_file(files["audio_file"])} if "audio_file" in files else None
+            return method, route, {"data": data, "files": upload}
+        if method == "GET":
+            return method, route, {}
+        body = {name: fields[name] for name in ("topic", "language") if name in fields}
+        return method, route, {"json": body}
+
+
+# --- replay ---
+class Replay:
+    def __init__(self, base, entries, speed):
+        self.base = base
+        self.speed = speed
+        self.recorder = bench_routes.Recorder()
+        self.payloads = Payloads()
+        self.lags = []
+        self.skipped = Counter()
+        self.lock = threading.Lock()
+        self.sessions = defaultdict(list)
+        for entry in entries:
+            if _skipped(entry["route"]):
+                self.skipped[entry["route"]] += 1
+            else:
+                self.sessions[entry["session"]].append(entry)
+        self.t0 = entries[0]["t"] if entries else 0
+
+    def _due(self, entry):
+        return self.start + (entry["t"] - self.t0) / self.speed
+
+    def _send(self, client, state, entry, request):
+        response = client.call(request[0], request[1], route=entry["route"], **request[2])
+        if entry["route"] == "/api/mock-test/start":
+            started = bench_routes._json(response, {})
+            if "session_id" in started:
+                state["mock_session"] = started["session_id"]
+
+    def _run_session(self, entries):
+        client = bench_routes.Client(self.base, self.recorder)
+        state = {}
+        overlapping = []
+        previous_end = None
+        for entry in entries:
+            request = self.payloads.build(entry, state)
+            if request is None:
+                with self.lock:
+                    self.skipped[entry["route"]] += 1
+                continue
+            delay = self._due(entry) - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with self.lock:
+                self.lags.append(max(0.0, -delay))
+            # Requests the browser sent while the previous one was still running go out in parallel;
+            # the rest wait for their predecessor, as the user did.
+            concurrent = previous_end is not None and entry["t"] < previous_end
+            previous_end = max(previous_end or 0, entry["t"] + entry["duration_ms"] / 1000)
+            if concurrent:
+                thread = threading.Thread(target=self._send, args=(client, state, entry, request), daemon=True)
+                thread.start()
+                overlapping.append(thread)
+            else:
+                self._send(client, state, entry, request)
+        for thread in overlapping:
+            thread.join()
+        with self.recorder.lock:
+            self.recorder.scenarios += 1
+
+    def run(self):
+        self.start = time.perf_counter()
+        # Start each session's thread when its first request is due, so idle sessions don't hold threads.
+        threads = []
+        for entries in sorted(self.sessions.values(), key=lambda e: e[0]["t"]):
+            delay = self._due(entries[0]) - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            thread = threading.Thread(target=self._run_session, args=(entries,), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - self.start
+
+
+def summarize_traces(entries):
+    if not entries:
+        print("No trace entries.")
+        return
+    span = entries[-1]["t"] - entries[0]["t"]
+    sessions = {e["session"] for e in entries}
+    print(f"{len(entries)} requests, {len(sessions)} sessions over {span / 60:.1f} min")
+    per_minute = Counter(int((e["t"] - entries[0]["t"]) // 60) for e in entries)
+    print(f"requests/min: mean {len(entries) / max(1, len(per_minute)):.1f}, peak {max(per_minute.values())}")
+    print("route mix:")
+    routes = Counter(e["route"] for e in entries)
+    for route, n in routes.most_common():
+        latencies = [e["duration_ms"] / 1000 for e in entries if e["route"] == route]
+        print(f"    {route:<48} {n:6d}  {100 * n / len(entries):5.1f}%  "
+              f"p50 {bench_routes.percentile(latencies, 0.5):6.2f} s  p95 {bench_routes.percentile(latencies, 0.95):6.2f} s")
+    uploads = [size for e in entries for size in e.get("files", {}).values()]
+    if uploads:
+        print(f"uploads: {len(uploads)}, p50 {bench_routes.percentile(uploads, 0.5) / 1e6:.2f} MB, "
+              f"p95 {bench_routes.percentile(uploads, 0.95) / 1e6:.2f} MB, max {max(uploads) / 1e6:.2f} MB")
+    topics = Counter(e["fields"]["topic"] for e in entries if "topic" in e.get("fields", {}))
+    if topics:
+        print("topics: " + ", ".join(f"{topic} {n}" for topic, n in topics.most_common(10)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("traces", nargs="+", help="trace files or glob patterns")
+    parser.add_argument("--summary", action="store_true", help="describe the traces instead of replaying them")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression factor (10 = ten times faster)")
+    parser.add_argument("--target", help="base URL of the deployment under test (default: start a local one)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--worker-class", default="gevent", choices=["gevent", "sync"])
+    parser.add_argument("--by-route", action="store_true", help="also print per-route percentiles")
+    fake_providers.add_arguments(parser)
+    args = parser.parse_args()
+
+    entries = load(args.traces)
+    if args.summary:
+        summarize_traces(entries)
+        return
+    if not entries:
+        parser.error("no trace entries found")
+
+    span = entries[-1]["t"] - entries[0]["t"]
+    print(f"Replaying {len(entries)} requests ({span:.0f} s of traffic) at {args.speed:g}x, ~{span / args.speed:.0f} s")
+    server = proc = None
+    with tempfile.TemporaryDirectory() as tmp:
+        base = args.target
+        if not base:
+            server, provider_url = fake_providers.start(**fake_providers.settings_from(args))
+            port = bench_routes.free_port()
+            proc = bench_routes.start_gunicorn(port, args.workers, args.worker_class,
+                                               bench_routes.app_env(provider_url, os.path.join(tmp, "replay.db")))
+            base = f"http://127.0.0.1:{port}"
+        try:
+            replay = Replay(base.rstrip("/"), entries, args.speed)
+            wall = replay.run()
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+            if server is not None:
+                server.shutdown()
+
+    bench_routes.report("replay", len(replay.sessions), replay.recorder, wall, args.by_route)
+    print(f"schedule lag: p50 {bench_routes.percentile(replay.lags, 0.5):.2f} s, "
+          f"p95 {bench_routes.percentile(replay.lags, 0.95):.2f} s, max {max(replay.lags, default=0):.2f} s")
+    if replay.skipped:
+        print("skipped: " + ", ".join(f"{route} {n}" for route, n in replay.skipped.most_common()))
+    if server is not None:
+        print("provider calls:", ", ".join(f"{name} {n}" for name, n in sorted(fake_providers.call_counts().items())))
+
+
+if __name__ == "__main__":
+    main()
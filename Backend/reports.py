@@ -0,0 +1,79 @@
+import re
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_
+from extensions import db
+from models import Report
+
+# --- REPORT PERSISTENCE & HISTORY ---
+REPORT_PAGE_DEFAULT = 20
+REPORT_PAGE_MAX = 100
+
+SCORE_PATTERN = re.compile(r'SCORE:\s*\[?\s*(\d{1,3})\s*\]?\s*%', re.IGNORECASE)
+WPM_PATTERN = re.compile(r'(\d{1,3})\s*WPM', re.IGNORECASE)
+FILLER_PATTERN = re.compile(r'Found\s+(\d+)\s+filler words', re.IGNORECASE)
+
+
+def _first_int(pattern, text):
+    match = pattern.search(text)
+    return int(match.group(1)) if match else None
+
+
+def _as_int(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def save_report(user_id, markdown, round_type=None, wpm=None, fillers=None):
+    """Store a report. Explicit wpm/fillers win over values parsed from the markdown."""
+    score = _first_int(SCORE_PATTERN, markdown)
+    report = Report(
+        user_id=user_id,
+        round_type=(round_type or 'general')[:32],
+        score=min(score, 100) if score is not None else None,
+        wpm=_as_int(wpm) if wpm is not None else _first_int(WPM_PATTERN, markdown),
+        filler_count=_as_int(fillers) if fillers is not None else _first_int(FILLER_PATTERN, markdown),
+    )
+    report.markdown = markdown
+    db.session.add(report)
+    db.session.commit()
+    return report
+
+
+def encode_cursor(report):
+    raw = f"{report.created_at.isoformat()}|{report.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) or raise ValueError for a malformed cursor."""
+    try:
+        created_at, report_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(report_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def list_reports(user_id, cursor=None, limit=REPORT_PAGE_DEFAULT):
+    """
+    One page of a user's reports, newest first, via keyset pagination on the
+    (user_id, created_at, id) index. Cost is independent of how deep the page is.
+    """
+    limit = max(1, min(limit, REPORT_PAGE_MAX))
+    query = Report.query.filter(Report.user_id == user_id)
+    if cursor:
+        created_at, report_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Report.created_at, Report.id) < tuple_(created_at, report_id))
+    # Bodies are deferred: list pages only read the scalar columns
+    rows = (query.options(db.defer(Report.body_compressed))
+                 .order_by(Report.created_at.desc(), Report.id.desc())
+                 .limit(limit + 1)
+                 .all())
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return [r.summary() for r in rows[:limit]], next_cursor
+
+
+def get_report(user_id, report_id):
+    return Report.query.filter_by(id=report_id, user_id=user_id).first()
@@ -0,0 +1,54 @@
+import re
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+# --- RESPONSE SCHEMAS FOR STRUCTURED GEMINI OUTPUT ---
+# These models are sent to Gemini as `response_schema` and reused locally to
+# validate (and lightly normalize) whatever comes back.
+
+
+class AptitudeQuestion(BaseModel):
+    question: str = Field(min_length=1)
+    options: list[str] = Field(min_length=4, max_length=4)
+    correct_answer: str = Field(min_length=1)
+    solution: str = Field(min_length=1)
+
+    @model_validator(mode="after")
+    def correct_answer_is_an_option(self):
+        if self.correct_answer in self.options:
+            return self
+        # Accept "B", "B)" or the bare option text and map it to the full option.
+        answer = self.correct_answer.strip()
+        letter = re.match(r'^([A-Da-d])\)?$', answer)
+        for option in self.options:
+            if letter and option.strip().upper().startswith(letter.group(1).upper() + ")"):
+                self.correct_answer = option
+                return self
+            if re.sub(r'^[A-Da-d]\)\s*', '', option.strip()) == answer:
+                self.correct_answer = option
+                return self
+        raise ValueError("correct_answer must match one of the options")
+
+
+class TestCase(BaseModel):
+    stdin: str
+    expected_output: str
+
+    @field_validator("stdin", "expected_output", mode="before")
+    @classmethod
+    def coerce_to_string(cls, value):
+        # Models sometimes emit numbers for simple I/O, e.g. "expected_output": 15
+        if isinstance(value, (int, float)):
+            return str(value)
+        return value
+
+
+class TechnicalQuestion(BaseModel):
+    question_title: str = Field(min_length=1)
+    problem_statement: str = Field(min_length=1)
+    starter_code: str
+    test_cases: list[TestCase] = Field(min_length=1)
+    model_solution: str = Field(min_length=1)
+
+
+class CommunicationTopic(BaseModel):
+    topic: str = Field(min_length=1)
@@ -0,0 +1,187 @@
+import numpy as np
+
+# --- LOCAL SCORING ENGINE ---
+# Every number in the aptitude and mock-test reports is computed here in one
+# vectorized pass over the raw results: accuracy overall and per topic, time
+# per question, the coding pass matrix, interview answer lengths. The model
+# only receives this compact summary and writes the narrative around it, and
+# the template renderers below produce a complete report with no model at all.
+
+CODING_STATUSES = ("Passed", "Failed", "Incomplete")
+# Qualitative text still sent to the model, clipped to keep prompts small.
+MAX_FEEDBACK_CHARS = 1500
+MAX_ANSWER_CHARS = 600
+
+
+def _round(value, digits=1):
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+def aptitude_summary(results, default_topic="Mixed"):
+    """Score a list of {topic, is_correct, user_answer, time_taken_seconds} dicts."""
+    rows = [r for r in results or [] if isinstance(r, dict)]
+    total = len(rows)
+    if not total:
+        return {"total": 0, "correct": 0, "accuracy": 0.0, "answered": 0, "topics": []}
+
+    correct = np.array([bool(r.get("is_correct")) for r in rows], dtype=float)
+    answered = np.array([r.get("user_answer") is not None for r in rows], dtype=bool)
+    seconds = np.array([r.get("time_taken_seconds", np.nan) or np.nan for r in rows], dtype=float)
+    names, topic_idx = np.unique([r.get("topic") or default_topic for r in rows], return_inverse=True)
+
+    counts = np.bincount(topic_idx, minlength=len(names))
+    hits = np.bincount(topic_idx, weights=correct, minlength=len(names))
+    timed = ~np.isnan(seconds)
+    time_counts = np.bincount(topic_idx[timed], minlength=len(names))
+    time_totals = np.bincount(topic_idx[timed], weights=seconds[timed], minlength=len(names))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        topic_accuracy = hits / counts * 100
+        topic_seconds = time_totals / time_counts
+
+    topics = [
+        {
+            "topic": str(names[i]),
+            "questions": int(counts[i]),
+            "correct": int(hits[i]),
+            "accuracy": _round(topic_accuracy[i]),
+            "avg_seconds": _round(topic_seconds[i]),
+        }
+        for i in np.argsort(-topic_accuracy, kind="stable")
+    ]
+    summary = {
+        "total": total,
+        "correct": int(correct.sum()),
+        "accuracy": _round(correct.mean() * 100),
+        "answered": int(answered.sum()),
+        "avg_seconds": _round(seconds[timed].mean()) if timed.any() else None,
+        "median_seconds": _round(np.median(seconds[timed])) if timed.any() else None,
+        "topics": topics,
+    }
+    if len(topics) > 1:
+        summary["strongest_topic"] = topics[0]["topic"]
+        summary["weakest_topic"] = topics[-1]["topic"]
+    return summary
+
+
+def coding_summary(results):
+    """Pass matrix (question x status) for the mock-test coding round."""
+    rows = [r for r in results or [] if isinstance(r, dict)]
+    status_idx = np.array(
+        [CODING_STATUSES.index(r["status"]) if r.get("status") in CODING_STATUSES else 2 for r in rows],
+        dtype=int
+    )
+    matrix = np.zeros((len(rows), len(CODING_STATUSES)), dtype=int)
+    matrix[np.arange(len(rows)), status_idx] = 1
+    totals = matrix.sum(axis=0)
+    return {
+        "questions": [
+            {"question": r.get("question") or f"Problem {i + 1}", "status": CODING_STATUSES[status_idx[i]]}
+            for i, r in enumerate(rows)
+        ],
+        **{status.lower(): int(totals[j]) for j, status in enumerate(CODING_STATUSES)},
+    }
+
+
+def _message_text(message):
+    parts = message.get("parts") or []
+    return " ".join(p.get("text", "") for p in parts if isinstance(p, dict)) or message.get("text", "")
+
+
+def interview_summary(history):
+    """Answer count/length statistics plus the (clipped) answers themselves for the narrative."""
+    messages = [m for m in history or [] if isinstance(m, dict)]
+    answers = [_message_text(m) for m in messages if m.get("role") == "user"]
+    words = np.array([len(a.split()) for a in answers], dtype=float)
+    return {
+        "questions_asked": sum(1 for m in messages if m.get("role") in ("model", "ai")),
+        "answers": len(answers),
+        "avg_answer_words": _round(words.mean()) if len(words) else 0,
+        "shortest_answer_words": int(words.min()) if len(words) else 0,
+        "longest_answer_words": int(words.max()) if len(words) else 0,
+        "answer_texts": [a[:MAX_ANSWER_CHARS] for a in answers],
+    }
+
+
+def _communication_feedback(communication):
+    """The round's feedback text, or a neutral placeholder when it was skipped or failed."""
+    if not isinstance(communication, str) or not communication.strip():
+        return "Not attempted."
+    # mock_test.js stores a failed round as "Error: ..."; that is not feedback on the candidate.
+    if communication.lstrip().startswith("Error:"):
+        return "Not evaluated (the round could not be scored)."
+    return communication[:MAX_FEEDBACK_CHARS]
+
+
+def mock_test_summary(all_round_results):
+    results = all_round_results or {}
+    return {
+        "aptitude": aptitude_summary(results.get("aptitude"), default_topic="Mock Test"),
+        "communication_feedback": _communication_feedback(results.get("communication")),
+        "coding": coding_summary(results.get("coding")),
+        "interview": interview_summary(results.get("interview")),
+    }
+
+
+# --- LLM-free template reports ---
+def _topic_line(topic):
+    return f"{topic['topic']}: {topic['correct']}/{topic['questions']} correct ({topic['accuracy']}%)"
+
+
+def render_aptitude_report(summary):
+    """Same four sections as the model's aptitude feedback, from numbers alone."""
+    if not summary["total"]:
+        return "### OVERALL SUMMARY\nNo questions were answered in this session."
+    topics = summary["topics"]
+    strongest, weakest = topics[0], topics[-1]
+    pace = f" at an average of {summary['avg_seconds']}s per question" if summary.get("avg_seconds") else ""
+    lines = [
+        "### OVERALL SUMMARY",
+        f"You answered {summary['correct']} of {summary['total']} questions correctly "
+        f"({summary['accuracy']}%){pace}.",
+        "",
+        "### STRONGEST TOPIC",
+        _topic_line(strongest),
+        "",
+        "### WEAKEST TOPIC",
+        _topic_line(weakest) if len(topics) > 1 else "Practice more topics to compare your performance.",
+        "",
+        "### KEY TAKEAWAY",
+    ]
+    if summary["accuracy"] >= 80:
+        lines.append("Strong result. Increase the difficulty or time yourself more strictly.")
+    else:
+        lines.append(f"Review the solutions for {weakest['topic']} and retry a focused set on that topic.")
+    return "\n".join(lines)
+
+
+def render_final_report(summary):
+    """A complete mock-test report without any model call."""
+    aptitude, coding, interview = summary["aptitude"], summary["coding"], summary["interview"]
+    lines = [
+        "Here is your comprehensive mock test report:",
+        "",
+        "## Overall Summary",
+        f"Aptitude {aptitude['correct']}/{aptitude['total']} correct, "
+        f"coding {coding['passed']}/{len(coding['questions'])} passed, "
+        f"{interview['answers']} interview answers given.",
+        "",
+        "## Round-by-Round Breakdown",
+        f"**Aptitude Test:** {aptitude['correct']}/{aptitude['total']} correct ({aptitude['accuracy']}%).",
+    ]
+    lines += [f"* {_topic_line(t)}" for t in aptitude["topics"]]
+    lines += [
+        "",
+        f"**Communication Test:** {summary['communication_feedback']}",
+        "",
+        f"**Coding Test:** {coding['passed']} passed, {coding['failed']} failed, {coding['incomplete']} incomplete.",
+    ]
+    lines += [f"* {q['question']}: {q['status']}" for q in coding["questions"]]
+    lines += [
+        "",
+        f"**Live Interview:** {interview['answers']} answers, {interview['avg_answer_words']} words on average "
+        f"(shortest {interview['shortest_answer_words']}, longest {interview['longest_answer_words']}).",
+        "",
+        "## Final Encouragement",
+        "Every round you complete builds the habits interviews reward. Keep going!",
+    ]
+    return "\n".join(lines)
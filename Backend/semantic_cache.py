@@ -0,0 +1,193 @@
+import os
+import re
+import time
+import zlib
+import threading
+import metrics
+import providers
+
+# --- SEMANTIC ANSWER CACHE FOR THE CHATBOT (/api/gemini) ---
+# Users ask the chatbot the same few dozen questions ("how does scoring
+# work", "what is the STAR method", ...) in slightly different words. Each
+# prompt becomes a TF-IDF vector on the CPU: unigrams and bigrams of its
+# non-stopwords, hashed into CHAT_CACHE_DIMENSIONS buckets, sublinear tf.
+# The vector is compared against the prompts whose answers are cached, using
+# one NumPy matrix product. A prompt whose cosine similarity to a cached prompt is at
+# least CHAT_CACHE_THRESHOLD gets that answer replayed as the same SSE
+# chunks, without calling Gemini.
+# Only complete, error-free answers to short prompts are stored (long prompts
+# are specific to one user), and only after sanitize() has stripped them to
+# the tags the chatbot is told to use, since every user can be served them. The cache is per worker and holds at most
+# CHAT_CACHE_MAX_ENTRIES answers. Entries expire after CHAT_CACHE_TTL_SECONDS
+# and the least recently used one is evicted when the cache is full.
+# NumPy is imported on first use (providers registry), not at startup.
+CHAT_CACHE_ENABLED = os.getenv("CHAT_CACHE_ENABLED", "1") == "1"
+CHAT_CACHE_THRESHOLD = float(os.getenv("CHAT_CACHE_THRESHOLD", "0.8"))
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "512"))
+CHAT_CACHE_TTL_SECONDS = float(os.getenv("CHAT_CACHE_TTL_SECONDS", "21600"))
+CHAT_CACHE_MAX_PROMPT_CHARS = int(os.getenv("CHAT_CACHE_MAX_PROMPT_CHARS", "300"))
+CHAT_CACHE_DIMENSIONS = 4096
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Function words carry no topic; without them "how does scoring work" and "how
+# does the scoring work" meet on "scoring work", while "HR round" and
+# "technical round" stay apart. Negations are kept.
+_STOPWORDS = frozenset(
+    "a an the is are was were be been am do does did i me my you your we our it its of to in on for with "
+    "and or can could should would will may might this that these those there please about tell explain s".split()
+)
+# Question words decide what is being asked ("why does scoring work" is not
+# "how does scoring work"), so they never count towards similarity. A cached
+# answer is only considered for a prompt with exactly the same set of them.
+_QUESTION_WORDS = {"how": "how", "what": "what", "whats": "what", "why": "why", "when": "when",
+                   "where": "where", "which": "which", "who": "who", "whom": "who", "whose": "whose"}
+# Answers are shown with innerHTML, so only these tags (without attributes) are
+# cached; anything else a prompt-injected answer contains is removed or escaped.
+ALLOWED_TAGS = ("strong", "br", "ul", "li")
+_TAG = re.compile(r"<\s*/?\s*[a-zA-Z!][^<>]*>")
+_ALLOWED_TAG = re.compile(r"<\s*(/?)\s*(" + "|".join(ALLOWED_TAGS) + r")\b[^<>]*>", re.IGNORECASE)
+stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0, "expired": 0}
+
+
+class SemanticIndex:
+    def __init__(self, capacity, dimensions):
+        import numpy as np
+        self.np = np
+        self.dimensions = dimensions
+        self.tf = np.zeros((capacity, dimensions), dtype=np.float32)   # sublinear term frequencies per slot
+        self.df = np.zeros(dimensions, dtype=np.float32)               # document frequency over cached prompts
+        self.used = np.zeros(capacity, dtype=bool)
+        self.entries = [None] * capacity   # slot -> {"prompt", "chunks", "created", "last_used", "hits"}
+        self.lock = threading.Lock()
+
+    def vectorize(self, text):
+        words = [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS and w not in _QUESTION_WORDS]
+        grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        counts = self.np.zeros(self.dimensions, dtype=self.np.float32)
+        for gram in grams:
+            counts[zlib.crc32(gram.encode()) % self.dimensions] += 1
+        return self.np.log1p(counts)
+
+    def _best(self, vector, kind):
+        """(slot, similarity) of the closest cached prompt asking the same `kind` of question, or (None, 0.0). Caller holds the lock."""
+        np = self.np
+        slots = np.flatnonzero(self.used)
+        slots = slots[[self.entries[s]["kind"] == kind for s in slots]] if len(slots) else slots
+        if not len(slots) or not vector.any():
+            return None, 0.0
+        idf = np.log((1 + len(slots)) / (1 + self.df)) + 1
+        query = vector * idf
+        rows = self.tf[slots] * idf
+        norms = np.linalg.norm(rows, axis=1) * np.linalg.norm(query)
+        similarity = rows @ query / np.maximum(norms, 1e-9)
+        best = int(similarity.argmax())
+        return int(slots[best]), float(similarity[best])
+
+    def _free(self, slot):
+        self.df -= self.tf[slot] > 0
+        self.used[slot] = False
+        self.entries[slot] = None
+
+    def lookup(self, prompt):
+        vector = self.vectorize(prompt)
+        kind = question_kind(prompt)
+        now = time.time()
+        with self.lock:
+            slot, similarity = self._best(vector, kind)
+            if slot is None or similarity < CHAT_CACHE_THRESHOLD:
+                return None, similarity
+            entry = self.entries[slot]
+            if now - entry["created"] > CHAT_CACHE_TTL_SECONDS:
+                self._free(slot)
+                stats["expired"] += 1
+                return None, similarity
+            entry["last_used"] = now
+            entry["hits"] += 1
+            return entry["chunks"], similarity
+
+    def store(self, prompt, chunks):
+        vector = self.vectorize(prompt)
+        if not vector.any():
+            return
+        kind = question_kind(prompt)
+        now = time.time()
+        with self.lock:
+            slot, similarity = self._best(vector, kind)
+            if slot is not None and similarity >= CHAT_CACHE_THRESHOLD:
+                return   # a concurrent request already cached an answer to this question
+            free = self.np.flatnonzero(~self.used)
+            if len(free):
+                slot = int(free[0])
+            else:
+                slot = min(range(len(self.entries)), key=lambda s: self.entries[s]["last_used"])
+                self._free(slot)
+                stats["evicted"] += 1
+            self.tf[slot] = vector
+            self.df += vector > 0
+            self.used[slot] = True
+            self.entries[slot] = {"prompt": prompt, "kind": kind, "chunks": list(chunks),
+                                  "created": now, "last_used": now, "hits": 0}
+            stats["stored"] += 1
+
+    def size(self):
+        with self.lock:
+            return int(self.used.sum())
+
+
+def question_kind(text):
+    """The question words in `text`, e.g. frozenset({"how"})."""
+    return frozenset(_QUESTION_WORDS[w] for w in _WORD.findall(text.lower()) if w in _QUESTION_WORDS)
+
+
+def sanitize(html):
+    """Keep ALLOWED_TAGS (attributes dropped), remove every other tag and escape stray angle brackets."""
+    def keep_allowed(match):
+        allowed = _ALLOWED_TAG.fullmatch(match.group(0))
+        if not allowed:
+            return ""
+        closing, name = allowed.group(1), allowed.group(2).lower()
+        return "\0" + f"{closing}{name}" + "\1"   # placeholders survive the escaping below
+
+    text = _TAG.sub(keep_allowed, html.replace("\0", "").replace("\1", ""))
+    text = text.replace("<", "&lt;").replace(">", "&gt;")
+    return text.replace("\0", "<").replace("\1", ">")
+
+
+def _rechunk(text, count):
+    """Split sanitized text into about `count` chunks at spaces (kept tags contain no spaces)."""
+    words = text.split(" ")
+    size = max(1, -(-len(words) // max(1, count)))
+    return [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "") for i in range(0, len(words), size)]
+
+
+providers.register("chat_cache", lambda: SemanticIndex(CHAT_CACHE_MAX_ENTRIES, CHAT_CACHE_DIMENSIONS))
+
+
+def _cacheable(prompt):
+    return CHAT_CACHE_ENABLED and len(prompt) <= CHAT_CACHE_MAX_PROMPT_CHARS
+
+
+def lookup(prompt):
+    """The cached answer chunks for a near-duplicate prompt, or None."""
+    if not _cacheable(prompt):
+        return None
+    chunks, similarity = providers.get("chat_cache").lookup(prompt)
+    stats["hits" if chunks is not None else "misses"] += 1
+    metrics.incr("chat_cache_requests", result="hit" if chunks is not None else "miss")
+    if chunks is not None:
+        metrics.observe("chat_cache_hit_similarity", similarity)
+    return chunks
+
+
+def store(prompt, chunks):
+    """Cache a complete answer (the text of each streamed chunk), reduced to ALLOWED_TAGS."""
+    if _cacheable(prompt) and chunks:
+        providers.get("chat_cache").store(prompt, _rechunk(sanitize("".join(chunks)), len(chunks)))
+
+
+def cache_stats():
+    lookups = stats["hits"] + stats["misses"]
+    data = dict(stats, hit_rate=round(stats["hits"] / lookups, 3) if lookups else None)
+    if providers.is_loaded("chat_cache"):
+        data["entries"] = providers.get("chat_cache").size()
+    return data
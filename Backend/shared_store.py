@@ -0,0 +1,162 @@
+import logging
+import os
+import json
+import zlib
+import random
+import secrets
+from datetime import timedelta
+from flask import session
+from flask_login import current_user
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import utcnow
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except ImportError:  # optional: the database backend works everywhere
+    redis = None
+
+# --- SHARED, TTL-BOUNDED KEY/VALUE STORE ---
+# State that must be visible to every gunicorn worker and every instance
+# (uploaded resume text, locks, prefetched content) lives here instead of in
+# module globals. Redis is used when REDIS_URL is set, otherwise a table in
+# the app's own database. Values are size-capped and always expire.
+REDIS_URL = os.getenv("REDIS_URL")
+SHARED_STORE_MAX_VALUE_BYTES = int(os.getenv("SHARED_STORE_MAX_VALUE_BYTES", str(256 * 1024)))
+SHARED_STORE_MAX_ENTRIES = int(os.getenv("SHARED_STORE_MAX_ENTRIES", "10000"))
+# Fraction of writes that also sweep expired rows / enforce the entry cap (SQL backend).
+SWEEP_PROBABILITY = 0.05
+
+
+class ValueTooLarge(ValueError):
+    pass
+
+
+class SharedState(db.Model):
+    key = db.Column(db.String(200), primary_key=True)
+    value = db.Column(db.LargeBinary, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+def _encode(value):
+    data = zlib.compress(json.dumps(value).encode("utf-8"))
+    if len(data) > SHARED_STORE_MAX_VALUE_BYTES:
+        raise ValueTooLarge(f"Shared value is {len(data)} bytes (limit {SHARED_STORE_MAX_VALUE_BYTES}).")
+    return data
+
+
+def _decode(data):
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+class SqlBackend:
+    def get(self, key):
+        row = db.session.get(SharedState, key)
+        if row is None or row.expires_at <= utcnow():
+            return None
+        return row.value
+
+    def set(self, key, data, ttl):
+        db.session.merge(SharedState(key=key, value=data, expires_at=utcnow() + timedelta(seconds=ttl)))
+        db.session.commit()
+        if random.random() < SWEEP_PROBABILITY:
+            self.sweep()
+
+    def add(self, key, data, ttl):
+        """Set only if absent (or expired). Returns True if this call created it."""
+        now = utcnow()
+        SharedState.query.filter(SharedState.key == key, SharedState.expires_at <= now).delete()
+        db.session.add(SharedState(key=key, value=data, expires_at=now + timedelta(seconds=ttl)))
+        try:
+            db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()
+            return False
+
+    def delete(self, key):
+        SharedState.query.filter_by(key=key).delete()
+        db.session.commit()
+
+    def sweep(self):
+        """Drop expired rows, then the soonest-to-expire rows beyond the entry cap."""
+        SharedState.query.filter(SharedState.expires_at <= utcnow()).delete()
+        overflow = SharedState.query.count() - SHARED_STORE_MAX_ENTRIES
+        if overflow > 0:
+            oldest = (db.session.query(SharedState.key)
+                      .order_by(SharedState.expires_at)
+                      .limit(overflow)
+                      .subquery())
+            SharedState.query.filter(SharedState.key.in_(db.select(oldest.c.key))).delete(synchronize_session=False)
+        db.session.commit()
+
+
+class RedisBackend:
+    """Entry count is bounded by TTLs and the server's maxmemory policy."""
+
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, data, ttl):
+        self.client.set(key, data, ex=int(ttl))
+
+    def add(self, key, data, ttl):
+        return bool(self.client.set(key, data, ex=int(ttl), nx=True))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def sweep(self):
+        pass
+
+
+_backend = None
+
+
+def backend():
+    global _backend
+    if _backend is None:
+        if REDIS_URL and redis is not None:
+            _backend = RedisBackend(REDIS_URL)
+        else:
+            if REDIS_URL:
+                logger.warning("REDIS_URL is set but the redis package is missing. Using the database for shared state.")
+            _backend = SqlBackend()
+    return _backend
+
+
+def get(key):
+    data = backend().get(key)
+    return _decode(data) if data is not None else None
+
+
+def put(key, value, ttl):
+    backend().set(key, _encode(value), ttl)
+
+
+def add(key, value, ttl):
+    return backend().add(key, _encode(value), ttl)
+
+
+def delete(key):
+    backend().delete(key)
+
+
+def owner_key(create=True):
+    """
+    Stable owner id for per-user state: the user id, or a random per-session id
+    for guests. With create=False a guest without a session id gets None
+    instead of a new id (and a Set-Cookie).
+    """
+    if current_user.is_authenticated:
+        return f"user:{current_user.id}"
+    if 'sid' not in session:
+        if not create:
+            return None
+        session['sid'] = secrets.token_urlsafe(16)
+    return f"session:{session['sid']}"
@@ -0,0 +1,179 @@
+import logging
+import os
+import re
+import json
+import gzip
+import hashlib
+import mimetypes
+from flask import Response
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is always available
+    brotli = None
+
+# --- STATIC ASSET MANIFEST ---
+# The whole frontend (~8 MB including the face-api model shards) is read once
+# at startup into an in-memory manifest. Text assets are gzip-compressed up
+# front and brotli-compressed on first request (brotli at quality 9 would
+# otherwise add ~0.3 s to every cold start), every asset gets a content hash, and HTML / weight manifests are rewritten to
+# reference fingerprinted URLs that can be cached forever. Serving a file
+# never touches the filesystem.
+ASSET_BROTLI_QUALITY = int(os.getenv("ASSET_BROTLI_QUALITY", "9"))
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_BYTES = 1024
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+# src="x.js" / href="x.css" with a relative, local target
+_HTML_REF = re.compile(r'''(\b(?:src|href)=["'])([^"':?#]+)(["'])''')
+
+
+def fingerprinted_name(path, digest):
+    """style.css -> style.<hash>.css, models/x-shard1 -> models/x-shard1.<hash>"""
+    root, ext = os.path.splitext(path)
+    if not ext or "/" in ext:
+        return f"{path}.{digest}"
+    return f"{root}.{digest}{ext}"
+
+
+class Asset:
+    def __init__(self, path, body, mimetype):
+        self.path = path
+        self.mimetype = mimetype
+        self.set_body(body)
+
+    def set_body(self, body):
+        self.body = body
+        self.digest = hashlib.sha256(body).hexdigest()[:12]
+        self.hashed_path = fingerprinted_name(self.path, self.digest)
+        self.encodings = {}
+        self.brotli_pending = False
+
+    def compress(self):
+        if len(self.body) < MIN_COMPRESS_BYTES or not self.mimetype.startswith(COMPRESSIBLE_TYPES):
+            return
+        gz = gzip.compress(self.body, compresslevel=9, mtime=0)
+        if len(gz) < len(self.body) * 0.9:
+            self.encodings["gzip"] = gz
+        self.brotli_pending = brotli is not None
+
+    def ensure_brotli(self):
+        """Build the brotli variant the first time a client asks for it."""
+        if not self.brotli_pending:
+            return
+        br = brotli.compress(self.body, quality=ASSET_BROTLI_QUALITY)
+        if len(br) < len(self.body) * 0.9:
+            self.encodings["br"] = br
+        self.brotli_pending = False
+
+
+class AssetManifest:
+    def __init__(self, folder):
+        self.folder = folder
+        self.assets = {}     # logical path -> Asset
+        self.by_hash = {}    # fingerprinted path -> Asset
+
+    @classmethod
+    def build(cls, folder):
+        manifest = cls(folder)
+        for dirpath, _, filenames in os.walk(folder):
+            for filename in filenames:
+                full = os.path.join(dirpath, filename)
+                path = os.path.relpath(full, folder).replace(os.sep, "/")
+                mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                with open(full, "rb") as f:
+                    manifest.assets[path] = Asset(path, f.read(), mimetype)
+
+        # Rewrite references after every referenced asset has its final hash:
+        # weight manifests point at shards, HTML points at scripts/styles.
+        for asset in manifest.assets.values():
+            if asset.path.endswith("-weights_manifest.json"):
+                manifest._rewrite_weights_manifest(asset)
+        for asset in manifest.assets.values():
+            if asset.mimetype == "text/html":
+                manifest._rewrite_html(asset)
+
+        for asset in manifest.assets.values():
+            asset.compress()
+            manifest.by_hash[asset.hashed_path] = asset
+
+        total = sum(len(a.body) for a in manifest.assets.values())
+        logger.info("Static assets: %d files (%.1f MB) loaded from %s", len(manifest.assets), total / 1e6, folder)
+        return manifest
+
+    def _resolve(self, base_path, ref):
+        if ref.startswith("/"):
+            path = ref.lstrip("/")
+        else:
+            path = os.path.join(os.path.dirname(base_path), ref)
+        return self.assets.get(os.path.normpath(path).replace(os.sep, "/"))
+
+    def _rewrite_weights_manifest(self, asset):
+        groups = json.loads(asset.body)
+        directory = os.path.dirname(asset.path)
+        for group in groups:
+            new_paths = []
+            for shard in group.get("paths", []):
+                target = self.assets.get(f"{directory}/{shard}" if directory else shard)
+                new_paths.append(os.path.basename(target.hashed_path) if target else shard)
+            group["paths"] = new_paths
+        asset.set_body(json.dumps(groups, separators=(",", ":")).encode("utf-8"))
+
+    def _rewrite_html(self, asset):
+        def replace(match):
+            ref = match.group(2)
+            target = self._resolve(asset.path, ref)
+            if target is None or target.mimetype == "text/html":
+                return match.group(0)   # links between pages keep their stable URLs
+            prefix = "/" if ref.startswith("/") else ""
+            return f"{match.group(1)}{prefix}{target.hashed_path}{match.group(3)}"
+
+        html = asset.body.decode("utf-8")
+        asset.set_body(_HTML_REF.sub(replace, html).encode("utf-8"))
+
+    def lookup(self, path):
+        """Return (asset, is_fingerprinted) for a request path, or (None, False)."""
+        if path in self.by_hash:
+            return self.by_hash[path], True
+        return self.assets.get(path), False
+
+
+def _pick_encoding(asset, request):
+    # Ranges always apply to the identity representation.
+    if request.range is not None:
+        return None
+    accepted = request.accept_encodings
+    if accepted["br"] > 0:
+        asset.ensure_brotli()
+    for encoding in ("br", "gzip"):
+        if encoding in asset.encodings and accepted[encoding] > 0:
+            return encoding
+    return None
+
+
+def asset_response(asset, fingerprinted, request):
+    """Build a cacheable response with ETag/304, Range and Accept-Encoding support."""
+    encoding = _pick_encoding(asset, request)
+    body = asset.encodings[encoding] if encoding else asset.body
+
+    response = Response(body, mimetype=asset.mimetype)
+    response.set_etag(f"{asset.digest}-{encoding}" if encoding else asset.digest)
+    response.headers["Cache-Control"] = IMMUTABLE_CACHE if fingerprinted else REVALIDATE_CACHE
+    if asset.encodings or asset.brotli_pending:
+        response.vary.add("Accept-Encoding")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+        return response.make_conditional(request)
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(body))
+
+
+def find_frontend_folder(basedir):
+    """The checkout uses 'Frontend'; accept a lowercase folder on case-sensitive hosts too."""
+    for name in ("Frontend", "frontend"):
+        folder = os.path.abspath(os.path.join(basedir, "..", name))
+        if os.path.isdir(folder):
+            return folder
+    return None
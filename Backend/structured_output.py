@@ -0,0 +1,74 @@
+import logging
+import os
+import re
+import json
+from pydantic import ValidationError
+import metrics
+import llm
+
+logger = logging.getLogger(__name__)
+
+# --- SCHEMA-CONSTRAINED GENERATION ---
+# Generators ask the LLM chain (Gemini's JSON mode first) for JSON matching
+# a pydantic schema, validate it locally, try a cheap local repair when the
+# text is almost-JSON, and only then spend another model call. The user never sees a malformed response.
+STRUCTURED_MAX_ATTEMPTS = int(os.getenv("STRUCTURED_MAX_ATTEMPTS", "2"))
+
+
+def repair_json(text):
+    """
+    Best-effort repair of almost-JSON model output: code fences, leading or
+    trailing prose, smart quotes and trailing commas. Returns a dict or raises ValueError.
+    """
+    candidate = text.strip()
+    candidate = re.sub(r'^```(?:json)?\s*|\s*```$', '', candidate)
+    start, end = candidate.find('{'), candidate.rfind('}')
+    if start == -1 or end <= start:
+        raise ValueError("No JSON object found in response")
+    candidate = candidate[start:end + 1]
+    candidate = candidate.replace('“', '"').replace('”', '"')
+    candidate = re.sub(r',\s*([}\]])', r'\1', candidate)
+    try:
+        # strict=False accepts raw newlines inside strings, a common slip in code fields
+        data = json.loads(candidate, strict=False)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Unrepairable JSON: {e}") from e
+    if not isinstance(data, dict):
+        raise ValueError("Response JSON is not an object")
+    return data
+
+
+def parse_structured(text, schema):
+    """Validate `text` against `schema`. Returns (instance, was_repaired)."""
+    try:
+        return schema.model_validate_json(text), False
+    except (ValidationError, ValueError):
+        pass
+    return schema.model_validate(repair_json(text)), True
+
+
+def generate_structured(model, prompt, schema, name):
+    """
+    Generate one object of `schema` (Gemini `model` in JSON mode, or a failover provider).
+    Returns a plain dict, or None if every attempt was invalid.
+    """
+    for attempt in range(1, STRUCTURED_MAX_ATTEMPTS + 1):
+        metrics.incr("structured_output_requests", schema=name)
+        if attempt > 1:
+            metrics.incr("structured_output_retries", schema=name)
+
+        text = llm.generate(prompt, gemini_model=model, schema=schema)
+        try:
+            result, repaired = parse_structured(text, schema)
+        except (ValidationError, ValueError) as e:
+            metrics.incr("structured_output_invalid", schema=name)
+            logger.warning("Invalid %s JSON from the model (attempt %d/%d): %s", name, attempt, STRUCTURED_MAX_ATTEMPTS, e)
+            continue
+
+        if repaired:
+            metrics.incr("structured_output_repaired", schema=name)
+        metrics.incr("structured_output_ok", schema=name)
+        return result.model_dump()
+
+    metrics.incr("structured_output_failed", schema=name)
+    return None
@@ -0,0 +1,167 @@
+import logging
+import os
+import json
+import hmac
+import time
+import queue
+import atexit
+import hashlib
+import threading
+from flask import request
+import shared_store
+
+logger = logging.getLogger(__name__)
+
+# --- ANONYMIZED TRAFFIC TRACES (for replay_traces.py) ---
+# With TRACE_CAPTURE_DIR set, each worker appends one JSON line per API
+# request to <dir>/trace-<pid>.jsonl. A line records the shape of the request
+# and nothing the user said or wrote:
+# - when it arrived, the route template, status, latency and body sizes
+# - upload sizes per file (never the audio or PDF itself)
+# - a few fields picked from fixed menus (topic, language, mock-test round)
+# - counts, e.g. conversation turns or aptitude results
+# Sessions show up only as a keyed hash, so a session's route sequence can be
+# replayed without knowing who it was. Requests without a session (a guest's
+# first request) are not captured, so capture never sets a cookie.
+# TRACE_SAMPLE_RATE picks whole sessions, never single requests. Lines are
+# written by a background thread and dropped (and counted) when the queue is full.
+TRACE_CAPTURE_DIR = os.getenv("TRACE_CAPTURE_DIR")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "5000"))
+# Fields copied from JSON bodies and forms. Their values come from the UI's
+# fixed choices; anything longer is replaced by its length.
+TRACE_FIELDS = ("topic", "language", "kind", "index")
+TRACE_MAX_FIELD_CHARS = 40
+# Fields recorded only as a count: items (or JSON-encoded turns), or characters for free text.
+TRACE_COUNTED_FIELDS = ("conversation_history", "results", "test_cases", "all_round_results")
+TRACE_LENGTH_FIELDS = ("prompt", "user_code", "resume_text")
+
+_queue = queue.Queue(maxsize=TRACE_QUEUE_SIZE)
+_writer = None
+_writer_lock = threading.Lock()
+stats = {"written": 0, "dropped": 0, "skipped": 0, "sessionless": 0}
+
+
+def enabled():
+    return bool(TRACE_CAPTURE_DIR)
+
+
+def session_hash(secret):
+    """
+    Keyed hash of the user or guest session; the same on every worker, not
+    reversible without SECRET_KEY. None for a guest with no session yet:
+    capture must not hand out session ids (and cookies) of its own.
+    """
+    owner = shared_store.owner_key(create=False)
+    if owner is None:
+        return None
+    return hmac.new(secret.encode(), f"trace:{owner}".encode(), hashlib.sha256).hexdigest()[:16]
+
+
+def _sampled(session_id):
+    return int(session_id[:8], 16) / 0xFFFFFFFF < TRACE_SAMPLE_RATE
+
+
+def _count(value):
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    return len(value) if isinstance(value, (list, dict)) else None
+
+
+def _shape_fields():
+    data = request.get_json(silent=True) if request.is_json else None
+    source = data if isinstance(data, dict) else request.form
+    fields, counts = {}, {}
+    for name in TRACE_FIELDS:
+        value = source.get(name)
+        if value is not None:
+            fields[name] = value if len(str(value)) <= TRACE_MAX_FIELD_CHARS else f"<{len(str(value))} chars>"
+    for name in TRACE_COUNTED_FIELDS:
+        if source.get(name) is not None:
+            counts[name] = _count(source.get(name))
+    for name in TRACE_LENGTH_FIELDS:
+        if isinstance(source.get(name), str):
+            counts[f"{name}_chars"] = len(source[name])
+    return fields, counts
+
+
+def record(secret, started, response):
+    """Queue the trace line for the current request (call from an after_request hook)."""
+    session_id = session_hash(secret)
+    if session_id is None:
+        stats["sessionless"] += 1
+        return
+    if not _sampled(session_id):
+        stats["skipped"] += 1
+        return
+    fields, counts = _shape_fields()
+    entry = {
+        "t": round(started, 3),
+        "session": session_id,
+        "method": request.method,
+        "route": request.url_rule.rule if request.url_rule else request.path,
+        "view_args": {k: v for k, v in (request.view_args or {}).items() if k in TRACE_FIELDS},
+        "fields": fields,
+        "counts": counts,
+        "files": {name: _file_size(f) for name, f in request.files.items()},
+        "request_bytes": request.content_length or 0,
+        "status": response.status_code,
+        # Streamed responses have no length yet and their duration ends at the first chunk.
+        "response_bytes": response.content_length,
+        "duration_ms": round((time.time() - started) * 1000, 1),
+    }
+    _start_writer()
+    try:
+        _queue.put_nowait(entry)
+    except queue.Full:
+        stats["dropped"] += 1
+
+
+def _file_size(storage):
+    stream = storage.stream
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+
+def _write_loop(path):
+    with open(path, "a", encoding="utf-8") as f:
+        while True:
+            entry = _queue.get()
+            if entry is None:
+                break
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            stats["written"] += 1
+            if _queue.empty():
+                f.flush()
+
+
+def _stop():
+    try:
+        _queue.put_nowait(None)
+    except queue.Full:
+        pass
+
+
+def _start_writer():
+    global _writer
+    if _writer is not None:
+        return
+    with _writer_lock:
+        if _writer is not None:
+            return
+        os.makedirs(TRACE_CAPTURE_DIR, exist_ok=True)
+        path = os.path.join(TRACE_CAPTURE_DIR, f"trace-{os.getpid()}.jsonl")
+        _writer = threading.Thread(target=_write_loop, args=(path,), daemon=True, name="trace-writer")
+        _writer.start()
+        atexit.register(_stop)
+        logger.info("Trace capture: writing to %s (sampling %.0f%% of sessions)", path, TRACE_SAMPLE_RATE * 100)
+
+
+def queue_stats():
+    return dict(stats, pending=_queue.qsize())
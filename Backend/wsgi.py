@@ -0,0 +1,36 @@
+# --- COOPERATIVE (GEVENT) ENTRY POINT ---
+# Every request spends most of its life waiting on Gemini, AssemblyAI or Judge0.
+# With gevent, those waits yield to other requests instead of pinning an OS
+# worker, so one worker can hold hundreds of in-flight AI requests.
+# Patching must happen before anything imports socket/ssl/requests/httpx.
+from gevent import monkey
+monkey.patch_all()
+
+# gevent hides select.epoll, but some provider SDK dependencies (trio, via
+# huggingface_hub) reference it at import time. We never run their event
+# loops, so exposing the original is safe and keeps those imports working.
+import select
+if not hasattr(select, "epoll"):
+    try:
+        select.epoll = monkey.get_original("select", "epoll")
+    except AttributeError:
+        pass  # not Linux, nothing to restore
+
+try:
+    # Make psycopg2 (Postgres) queries cooperative too.
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+    psycopg_patched = True
+except ImportError:
+    psycopg_patched = False
+
+import logging
+
+# app.py builds the application at import time; reuse it rather than
+# building (and loading the asset manifest) a second time.
+from app import app
+
+logger = logging.getLogger(__name__)
+# Logged once app.py has configured logging, so it goes through the usual handlers.
+if not psycopg_patched:
+    logger.warning("psycogreen not installed. Postgres queries will block the gevent worker.")
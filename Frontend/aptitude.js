@@ -388,6 +388,7 @@ document.addEventListener("DOMContentLoaded", () => {
         try {
             const resp = await fetch("https://prepmateai-project-production.up.railway.app/aptitude-feedback", {
                 method: "POST",
+                credentials: "include",
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify({ results: practiceResults }),
             });
@@ -261,6 +261,7 @@ function initializeApp() {
         "https://prepmateai-project-production.up.railway.app/communication-feedback",
         {
           method: "POST",
+          credentials: "include",
           body: formData,
         }
       );
@@ -259,6 +259,7 @@ function initializeApp() {
       try {
         const response = await fetch("https://prepmateai-project-production.up.railway.app/hr-conversation", {
           method: "POST",
+          credentials: "include",
           body: formData, 
         });
         
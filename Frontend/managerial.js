@@ -258,6 +258,7 @@ function initializeApp() {
       try {
         const response = await fetch("https://prepmateai-project-production.up.railway.app/managerial-conversation", {
           method: "POST",
+          credentials: "include",
           body: formData, 
         });
         
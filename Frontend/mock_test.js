@@ -50,6 +50,8 @@ document.addEventListener("DOMContentLoaded", () => {
     let testState = {
         resumeText: null,
         codingLanguage: "python",
+        mockSessionId: null,
+        mockSessionPromise: null,
         currentRound: 0, 
         warnings: 0,
         masterTimerInterval: null,
@@ -60,6 +62,7 @@ document.addEventListener("DOMContentLoaded", () => {
             nextQuestionPromise: null,
             isFetching: false,
             currentIndex: 0, 
+            fetchIndex: 0,
             selectedAnswer: null,
             ui: { /* ... */ }
         },
@@ -120,6 +123,8 @@ document.addEventListener("DOMContentLoaded", () => {
     startTestBtn.addEventListener("click", () => {
         setupScreen.classList.add("hidden");
         readyScreen.classList.remove("hidden");
+        // The server starts generating every round's content while the user reads the instructions
+        startMockSession();
     });
     beginTestBtn.addEventListener("click", startTest);
 
@@ -167,8 +172,43 @@ document.addEventListener("DOMContentLoaded", () => {
         startTestBtn.disabled = false;
     }
 
+    // --- Mock Test Session (server-side prefetching) ---
+    function startMockSession() {
+        testState.mockSessionPromise = fetch("https://prepmateai-project-production.up.railway.app/api/mock-test/start", {
+            method: "POST",
+            credentials: "include",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ language: testState.codingLanguage }),
+        })
+            .then(response => response.json())
+            .then(data => {
+                testState.mockSessionId = data.session_id || null;
+                return testState.mockSessionId;
+            })
+            .catch(error => {
+                console.warn("Mock test session unavailable, fetching content on demand.", error);
+                return null;
+            });
+        return testState.mockSessionPromise;
+    }
+
+    // Serve an item from the session's prefetched buffer; fall back to the
+    // on-demand endpoint if there is no session (or it expired).
+    async function fetchMockItem(kind, index, fallbackUrl, fallbackOptions) {
+        const sessionId = await testState.mockSessionPromise;
+        if (sessionId) {
+            const response = await fetch(`https://prepmateai-project-production.up.railway.app/api/mock-test/${sessionId}/${kind}/${index}`, {
+                credentials: "include",
+            });
+            if (response.status !== 404) return response.json();
+        }
+        const response = await fetch(fallbackUrl, { credentials: "include", ...fallbackOptions });
+        return response.json();
+    }
+
     // --- 4. Proctoring & Fullscreen Logic ---
     async function startTest() {
+        if (!testState.mockSessionPromise) startMockSession();
         readyScreen.classList.add("hidden");
         testEnvironment.classList.remove("hidden");
         mainNavbar.classList.add("hidden");
@@ -275,6 +315,7 @@ document.addEventListener("DOMContentLoaded", () => {
         try {
             const response = await fetch("https://prepmateai-project-production.up.railway.app/generate-final-report", {
                 method: "POST",
+                credentials: "include",
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify({ all_round_results: testState.allRoundResults })
             });
@@ -329,13 +370,13 @@ document.addEventListener("DOMContentLoaded", () => {
     async function fetchNextAptitudeQuestion() {
         if (testState.aptitude.isFetching) return null;
         testState.aptitude.isFetching = true;
+        const index = testState.aptitude.fetchIndex++;
         try {
-            const response = await fetch("https://prepmateai-project-production.up.railway.app/aptitude-question", {
+            const data = await fetchMockItem("aptitude", index, "https://prepmateai-project-production.up.railway.app/aptitude-question", {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify({ topic: "Mix" }),
             });
-            const data = await response.json();
             testState.aptitude.isFetching = false;
             if (data.error) {
                 alert(`Error fetching next question: ${data.error}`);
@@ -524,8 +565,7 @@ document.addEventListener("DOMContentLoaded", () => {
         loadCommunicationUI();
         testState.communication.isSubmitting = false;
         try {
-            const response = await fetch("https://prepmateai-project-production.up.railway.app/communication-topic");
-            const data = await response.json();
+            const data = await fetchMockItem("topic", 0, "https://prepmateai-project-production.up.railway.app/communication-topic", {});
             if (data.error) throw new Error(data.error);
             testState.communication.currentTopic = data.topic;
             testState.communication.ui.topicBox.innerText = data.topic;
@@ -646,6 +686,7 @@ document.addEventListener("DOMContentLoaded", () => {
         try {
             const response = await fetch("https://prepmateai-project-production.up.railway.app/communication-feedback", {
                 method: "POST",
+                credentials: "include",
                 body: formData, 
             });
             const data = await response.json();
@@ -729,11 +770,12 @@ document.addEventListener("DOMContentLoaded", () => {
         };
         testState.coding.ui.runBtn.addEventListener("click", handleCodingActionClick);
     }
-    async function fetchCodingQuestion(topic) {
+    async function fetchCodingQuestion(index) {
         if (testState.coding.isFetching) return null;
         testState.coding.isFetching = true;
+        const topic = (index === 0) ? "Basic" : "Mix (DSA)";
         try {
-            const response = await fetch("https://prepmateai-project-production.up.railway.app/technical-question", {
+            const data = await fetchMockItem("coding", index, "https://prepmateai-project-production.up.railway.app/technical-question", {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify({ 
@@ -741,7 +783,6 @@ document.addEventListener("DOMContentLoaded", () => {
                     language: testState.codingLanguage
                 }),
             });
-            const data = await response.json();
             testState.coding.isFetching = false;
             if (data.error) {
                 alert(`Error: ${data.error}. Please try again.`);
@@ -774,7 +815,7 @@ document.addEventListener("DOMContentLoaded", () => {
         ui.content.style.display = "none";
         ui.loadingSpinner.style.display = "flex";
         ui.loadingText.innerText = `Loading problem ${index + 1} of 2... (${topic})`;
-        testState.coding.currentQuestionData = await fetchCodingQuestion(topic);
+        testState.coding.currentQuestionData = await fetchCodingQuestion(index);
         ui.loadingSpinner.style.display = "none";
         ui.content.style.display = "block";
         if (!testState.coding.currentQuestionData) {
@@ -784,7 +825,7 @@ document.addEventListener("DOMContentLoaded", () => {
         }
         displayCodingQuestion(testState.coding.currentQuestionData);
         if (index === 0) {
-            testState.coding.nextQuestionPromise = fetchCodingQuestion("Mix (DSA)");
+            testState.coding.nextQuestionPromise = fetchCodingQuestion(1);
             testState.coding.nextQuestionPromise.then(q => { testState.coding.nextQuestion = q; });
         }
     }
@@ -805,6 +846,7 @@ document.addEventListener("DOMContentLoaded", () => {
             try {
                 const response = await fetch("https://prepmateai-project-production.up.railway.app/run-code", {
                     method: "POST",
+                    credentials: "include",
                     headers: { "Content-Type": "application/json" },
                     body: JSON.stringify({
                         user_code: userCode,
@@ -1188,6 +1230,7 @@ document.addEventListener("DOMContentLoaded", () => {
         try {
             const response = await fetch(`https://prepmateai-project-production.up.railway.app${endpoint}`, {
                 method: "POST",
+                credentials: "include",
                 body: formData, 
             });
             
@@ -283,6 +283,7 @@ function initializeApp() {
       try {
         const response = await fetch("https://prepmateai-project-production.up.railway.app/resume-conversation", {
           method: "POST",
+          credentials: "include",
           body: formData, 
         });
         
@@ -82,6 +82,7 @@ function initializeApp() {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ "topic": topic }),
+        credentials: "include",
       });
       const data = await response.json();
       
@@ -255,6 +256,7 @@ function initializeApp() {
     try {
       const response = await fetch("https://prepmateai-project-production.up.railway.app/interview", {
         method: "POST",
+        credentials: "include",
         body: formData, 
       });
       const data = await response.json();
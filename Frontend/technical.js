@@ -247,6 +247,7 @@ function initializeApp() {
         try {
             const response = await fetch("https://prepmateai-project-production.up.railway.app/run-code", {
                 method: "POST",
+                credentials: "include",
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify({
                     user_code: userCode,